@@ -0,0 +1,67 @@
+"""
+Per-operation cost of the `furniture.geometry` value types, i.e.
+`python benchmarks/geometry.py`
+"""
+import timeit
+from furniture.geometry import Rect, Point, Edge, RectArray, RectIndex, bounds
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def bench(label, stmt, number=200000, **env):
+    t = min(timeit.repeat(stmt, globals=env, number=number, repeat=5))
+    print("{:<32} {:>8.3f} µs/op".format(label, t / number * 1e6))
+
+
+if __name__ == "__main__":
+    r = Rect((0, 0, 1920, 1080))
+    p = Point((100, 200))
+    env = dict(r=r, p=p, Rect=Rect, Point=Point,
+        minx=Edge.MinX, maxx=Edge.MaxX, miny=Edge.MinY, centerx=Edge.CenterX)
+
+    bench("Rect((x, y, w, h))", "Rect((0, 0, 100, 100))", **env)
+    bench("Rect.take", "r.take(100, minx)", **env)
+    bench("Rect.take (str edge)", "r.take(100, 'maxy')", **env)
+    bench("Rect.take (percent)", "r.take(0.5, miny)", **env)
+    bench("Rect.divide", "r.divide(100, minx)", **env)
+    bench("Rect.divide (center)", "r.divide(100, centerx)", **env)
+    bench("Rect.subtract", "r.subtract(100, maxx)", **env)
+    bench("Rect.inset", "r.inset(10, 20)", **env)
+    bench("Rect.offset", "r.offset(10, 20)", **env)
+    bench("Rect.scale", "r.scale(0.5)", **env)
+    bench("Rect.square", "r.square()", **env)
+    bench("Rect.subdivide(10)", "r.subdivide(10, minx)", number=20000, **env)
+    bench("Rect.grid(10, 10)", "r.grid(10, 10)", number=2000, **env)
+    bench("unpack x, y, w, h = r", "x, y, w, h = r", **env)
+    bench("Point.offset", "p.offset(1, 2)", **env)
+    bench("unpack x, y = p", "x, y = p", **env)
+
+    if np is not None:
+        ra = RectArray([r] * 1000)
+        env.update(ra=ra, RectArray=RectArray)
+        bench("Rect.grid(100, 100)", "r.grid(100, 100)", number=20, **env)
+        bench("RectArray.grid(100, 100)", "RectArray([r]).grid(100, 100)", number=20, **env)
+        bench("RectArray.grid(...).rects()", "RectArray([r]).grid(100, 100).rects()", number=20, **env)
+        bench("1000x Rect.inset", "[x.inset(10) for x in rs]", number=200, rs=[r] * 1000)
+        bench("RectArray(1000).inset", "ra.inset(10)", number=2000, **env)
+        bench("1000x Rect.subdivide(10)", "[x.subdivide(10, minx) for x in rs]", number=20, rs=[r] * 1000, minx=Edge.MinX)
+        bench("RectArray(1000).subdivide(10)", "ra.subdivide(10, minx)", number=200, **env)
+
+    cells = r.grid(100, 100)
+    index = RectIndex(cells)
+    env.update(cells=cells, index=index, q=Rect((500, 500, 50, 50)), RectIndex=RectIndex)
+    bench("scan 10000 for intersects", "[c for c in cells if c.intersects(q)]", number=20, **env)
+    bench("RectIndex(10000).query", "index.query(q)", number=20000, **env)
+    bench("scan 10000 for contains", "[c for c in cells if c.contains((510, 510))]", number=20, **env)
+    bench("RectIndex(10000).at", "index.at((510, 510))", number=20000, **env)
+    bench("RectIndex(10000).nearest", "index.nearest((2500, 510))", number=2000, **env)
+    bench("RectIndex(10000)", "RectIndex(cells)", number=5, **env)
+    env.update(bounds=bounds)
+    bench("fold 10000 with +", "functools.reduce(Rect.union, cells)", number=20, functools=__import__("functools"), **env)
+    bench("bounds(10000)", "bounds(cells)", number=20, **env)
+    if np is not None:
+        env.update(ca=RectArray(cells))
+        bench("RectArray(10000).bounds", "ca.bounds()", number=2000, **env)
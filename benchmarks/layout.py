@@ -0,0 +1,101 @@
+"""
+A `furniture.layout` tree, compared against the same layout as a chain of
+`divide` calls — first for equality, then for speed, building the tree,
+solving a freshly built tree from scratch (the first frame), solving again
+with nothing changed, and solving again with one box changed (as when only
+one thing animates), i.e. `python benchmarks/layout.py`
+"""
+import time
+import timeit
+from furniture.geometry import Rect
+from furniture.layout import Box
+
+COLUMNS = 40
+
+
+def imperative(page, header, sidebar):
+    top, rest = page.divide(header, "maxy")
+    rects = [top]
+    for k in range(COLUMNS):
+        if k < COLUMNS - 1:
+            column, rest = rest.divide(1 / (COLUMNS - k), "minx")
+            _, rest = rest.divide(4, "minx", forcePixel=True)
+        else:
+            column = rest
+        title, body = column.divide(40, "maxy")
+        side, main = body.divide(sidebar, "minx")
+        rects.extend([column, title, body, side, main])
+    return rects
+
+
+def declarative():
+    columns = [Box(1 / (COLUMNS - k), edge="maxy", children=[
+        Box(40),
+        Box(edge="minx", children=[Box(0.3, name="side" if k == 0 else None), Box()])])
+        for k in range(COLUMNS)]
+    columns[-1].size = None
+    return Box(edge="maxy", children=[
+        Box(100, name="header"),
+        Box(edge="minx", leading=4, children=columns)])
+
+
+def docstring_example(page):
+    # the example in furniture.layout’s docstring, both ways
+    left, rest = page.divide(200, "minx")
+    _, rest = rest.divide(20, "minx", forcePixel=True)
+    middle, right = rest.divide(0.5, "minx")
+    layout = Box(edge="minx", leading=[20, 0], children=[
+        Box(200, name="left"),
+        Box(0.5, name="middle"),
+        Box(name="right")])
+    layout.solve(page)
+    return [r.rect() for r in (left, middle, right)], [layout[name].rect() for name in ("left", "middle", "right")]
+
+
+def solved(layout):
+    rects = [layout.children[0].rect]
+    for column in layout.children[1].children:
+        title, body = column.children
+        side, main = body.children
+        rects.extend([column.rect, title.rect, body.rect, side.rect, main.rect])
+    return rects
+
+
+def bench(label, stmt, number=200, **env):
+    t = min(timeit.repeat(stmt, globals=env, number=number, repeat=5))
+    print("{:<40} {:>10.1f} µs".format(label, t / number * 1e6))
+
+
+def bench_cold(label, page, number=200):
+    # every solve gets a tree of its own, built outside the timing
+    times = []
+    for _ in range(5):
+        trees = [declarative() for _ in range(number)]
+        t = time.perf_counter()
+        for tree in trees:
+            tree.solve(page)
+        times.append(time.perf_counter() - t)
+    print("{:<40} {:>10.1f} µs".format(label, min(times) / number * 1e6))
+
+
+if __name__ == "__main__":
+    page = Rect((0, 0, 1920, 1080))
+    layout = declarative().solve(page)
+    assert [r.rect() for r in solved(layout)] == [r.rect() for r in imperative(page, 100, 0.3)]
+    chain, tree = docstring_example(Rect((0, 0, 1000, 500)))
+    assert chain == tree, (chain, tree)
+    print("identical rects")
+
+    side = layout.find("side")
+    state = dict(i=0)
+
+    def animate():
+        state["i"] += 1
+        side.size = 0.2 + (state["i"] % 10) / 100
+        layout.solve(page)
+
+    bench("divide chain", "imperative(page, 100, 0.3)", imperative=imperative, page=page)
+    bench("Box tree, built", "declarative()", declarative=declarative)
+    bench_cold("Box tree, solved from scratch", page)
+    bench("Box tree, solved again (no change)", "layout.solve(page)", layout=layout, page=page)
+    bench("Box tree, solved again (one box changed)", "animate()", animate=animate)
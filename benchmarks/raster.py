@@ -0,0 +1,64 @@
+"""
+Per-frame cost of the raster backend, for a typical frame — a background,
+a few `frame.bps`-style paths, and the burn-in box — at the default 1920x1080,
+i.e. `python benchmarks/raster.py`, or `python benchmarks/raster.py 1920 1080
+Mono.ttf` to draw the burn-in counter in a font file, shaped by `furniture.textcache`
+"""
+import sys
+import time
+from furniture import backend
+from furniture.geometry import Rect
+from furniture.raster import RasterBackend
+
+
+def frame(b, i, w, h, font=None):
+    b.newDrawing()
+    b.newPage(w, h)
+    page = Rect((0, 0, w, h))
+    b.fill(1)
+    b.rect(*page)
+    for k in range(3):
+        bp = b.BezierPath()
+        bp.oval(*page.inset(200 + k * 80 + i, 120 + k * 40))
+        bp.rect(*page.take(60, "miny").inset(k * 300 + i, 10))
+        with b.savedState():
+            b.fill(k / 3, 0.2, 1 - k / 3, 0.8)
+            b.drawPath(bp)
+    with b.savedState():
+        b.stroke(0)
+        b.strokeWidth(4)
+        b.fill(None)
+        b.rotate(i, center=page.point("C"))
+        b.rect(*page.inset(400, 300))
+    box = page.take(64, "miny").take(120, "maxx").offset(-24, 24)
+    b.fill(0, 0.8)
+    b.rect(*box.inset(-14, -14).offset(0, 2))
+    b.fill(1)
+    b.fontSize(20)
+    b.lineHeight(20)
+    b.font(font or "Menlo-Bold")
+    b.textBox("{:07.2f}\n{:04d}\n00:00:00".format(i / 30, i), box, align="center")
+
+
+def bench(label, fn, number=20):
+    times = []
+    for i in range(number):
+        t = time.perf_counter()
+        fn(i)
+        times.append(time.perf_counter() - t)
+    times.sort()
+    print("{:<32} {:>8.2f} ms/frame (median) {:>8.2f} ms (max)".format(label, times[len(times) // 2] * 1e3, times[-1] * 1e3))
+
+
+if __name__ == "__main__":
+    w, h = [int(d) for d in sys.argv[1:3]] if len(sys.argv) > 2 else (1920, 1080)
+    font = sys.argv[3] if len(sys.argv) > 3 else None
+    b = RasterBackend()
+    backend.use(b)
+
+    bench("record", lambda i: frame(b, i, w, h, font))
+    bench("rasterize", lambda i: b.rasterize())
+    canvas = b.rasterize()
+    bench("png (level 1)", lambda i: canvas.png(1))
+    bench("pixels", lambda i: b.pixels())
+    bench("record + rasterize + png", lambda i: (frame(b, i, w, h, font), b.rasterize().png(1)))
@@ -0,0 +1,110 @@
+"""
+A sharded render on this machine: a `furniture coordinate` and a few
+`furniture work` processes (headless, saving display lists), started workers
+first, so they have to wait for the coordinator — then one worker is killed
+mid-chunk (its chunk should time out & go to someone else) and the
+coordinator itself is killed & restarted (the workers should ride that out,
+retrying, and carry on with the new one) — and at the end every frame’s file
+should be there, i.e. `python benchmarks/shard.py`
+"""
+import os
+import sys
+import time
+import socket
+import signal
+import tempfile
+import subprocess
+
+WORKERS = 3
+FRAMES = 120
+
+SOURCE = """
+import time
+from furniture.animation import Animation
+
+def draw(frame):
+    time.sleep(0.1) # slow enough to kill things mid-chunk
+    rect(*frame.page.inset(10, 10))
+
+animation = Animation(draw, {frames}, dimensions=(100, 100), fmt="json", layers=["fg"])
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start(args, log):
+    env = dict(os.environ, FURNITURE_BACKEND="headless", PYTHONUNBUFFERED="1")
+    return subprocess.Popen([sys.executable, "-m", "furniture.renderer"] + args, env=env,
+        stdout=log, stderr=subprocess.STDOUT)
+
+
+def frames(folder):
+    return len([f for f in os.listdir(folder + "/fg") if f.endswith(".json")]) if os.path.exists(folder + "/fg") else 0
+
+
+def logged(log, text):
+    with open(log.name) as f:
+        return sum(text in line for line in f)
+
+
+def wait_for(condition, timeout=60):
+    started = time.monotonic()
+    while not condition():
+        if time.monotonic() - started > timeout:
+            raise Exception("timed out")
+        time.sleep(0.1)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "shard.py")
+        with open(path, "w") as f:
+            f.write(SOURCE.format(frames=FRAMES))
+        folder = os.path.join(tmp, "frames")
+        address = "127.0.0.1:{}".format(free_port())
+        coordinate = ["coordinate", path, "-f", folder, "-ad", address, "-ch", "5", "-to", "3", "-a", "f"]
+
+        t = time.perf_counter()
+        logs = [open(os.path.join(tmp, f"worker{k}.log"), "w+") for k in range(WORKERS)]
+        workers = [start(["work", "-ad", address, "-v", "f"], log) for log in logs]
+        time.sleep(2) # nothing to connect to yet
+
+        coordinator_log = open(os.path.join(tmp, "coordinator.log"), "w+")
+        coordinator = start(coordinate, coordinator_log)
+        wait_for(lambda: frames(folder) >= 5)
+        workers[0].send_signal(signal.SIGKILL)
+        print("killed worker 0 at {} frames".format(frames(folder)))
+
+        # its chunk has to time out before it goes to anyone else
+        wait_for(lambda: logged(coordinator_log, "timed out on"))
+        print("worker 0’s chunk timed out at {} frames".format(frames(folder)))
+        wait_for(lambda: frames(folder) >= FRAMES // 2)
+        coordinator.send_signal(signal.SIGKILL)
+        coordinator.wait()
+        print("killed the coordinator at {} frames".format(frames(folder)))
+        time.sleep(3) # long enough for the workers to notice, & back off
+        coordinator = start(coordinate, coordinator_log)
+
+        returncode = coordinator.wait(timeout=120)
+        for worker in workers[1:]:
+            worker.wait(timeout=60)
+        wall = time.perf_counter() - t
+
+        timed_out = logged(coordinator_log, "timed out on")
+        retries = [logged(log, "retrying") for log in logs]
+        missing = [i for i in range(FRAMES) if not os.path.exists(f"{folder}/fg/{i}.json")]
+
+        print("{} frames in {:.2f}s, {} missing, coordinator exited {}".format(FRAMES, wall, len(missing), returncode))
+        print("chunks timed out:", timed_out)
+        print("retries by worker:", ", ".join(map(str, retries)))
+        print("surviving workers exited:", ", ".join(str(w.returncode) for w in workers[1:]))
+        assert not missing and returncode == 0 and timed_out
+        assert all(w.returncode == 0 for w in workers[1:])
+        # every survivor waited for the first coordinator, and for the second
+        assert all(n >= 2 for n in retries[1:])
+        for log in logs + [coordinator_log]:
+            log.close()
@@ -0,0 +1,66 @@
+"""
+How long the `furniture` command takes to start, i.e. for `-h`, for `info`
+on a small animation, and for handing a render to a running server — with
+what `python -X importtime` says the time went on, & whether any of the slow
+imports (numpy, defcon, fontTools, drawBot) snuck in,
+i.e. `python benchmarks/startup.py`
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+HEAVY = ["numpy", "defcon", "fontTools", "drawBot"]
+
+SOURCE = """
+from furniture.animation import Animation
+
+def draw(frame):
+    rect(*frame.page.inset(100, 100))
+
+animation = Animation(draw, 60)
+"""
+
+
+def run(args, number=5):
+    """
+    Best wall time of `number` runs, and the `-X importtime` of the last one,
+    as {module: (self µs, cumulative µs)}
+    """
+    env = dict(os.environ, FURNITURE_BACKEND="headless")
+    times = []
+    for i in range(number):
+        t = time.perf_counter()
+        out = subprocess.run([sys.executable, "-X", "importtime", "-m", "furniture.renderer"] + args,
+            env=env, capture_output=True, text=True)
+        times.append(time.perf_counter() - t)
+    imports = {}
+    for line in out.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "self" not in line:
+            us, cumulative, name = line[len("import time:"):].split("|")
+            imports[name.strip()] = (int(us), int(cumulative))
+    return min(times), imports
+
+
+def report(label, args):
+    best, imports = run(args)
+    total = sum(us for us, _ in imports.values())
+    print("{:<16} {:>8.1f} ms wall {:>8.1f} ms importing {:>4} modules".format(label, best * 1e3, total / 1e3, len(imports)))
+    top = [(c, name) for name, (_, c) in imports.items() if name.startswith("furniture")]
+    for cumulative, name in sorted(top, reverse=True)[:4]:
+        print("    {:<28} {:>8.1f} ms".format(name, cumulative / 1e3))
+    heavy = [name for name in HEAVY if name in imports]
+    print("    heavy imports: " + (", ".join(heavy) if heavy else "none"))
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "startup.py")
+        with open(path, "w") as f:
+            f.write(SOURCE)
+        report("-h", ["-h"])
+        report("info", ["info", path])
+        # no server is running, so this fails to connect, but only after
+        # the client has been imported, which is what's being measured
+        report("render --server", ["render", path, "--server", os.path.join(tmp, "nothing.sock")])
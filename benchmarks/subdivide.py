@@ -0,0 +1,80 @@
+"""
+`subdivide` & `subdivide_with_leadings`, compared against the original
+implementations (repeated `divide` calls on a shrinking remainder) — first
+for equality on representative layouts, then for speed, up to 10,000 pieces,
+i.e. `python benchmarks/subdivide.py`
+"""
+import timeit
+from furniture.geometry import Rect, Edge, divide, txt_to_edge
+
+
+def iterative_subdivide(rect, count, edge):
+    r = rect
+    subs = []
+    if hasattr(count, "__iter__"):
+        for a in count:
+            s, r = divide(r, a, edge)
+            subs.append(s)
+    else:
+        i = count
+        while i > 1:
+            s, r = divide(r, 1/i, edge)
+            subs.append(s)
+            i -= 1
+    subs.append(r)
+    return subs
+
+
+def iterative_subdivide_with_leadings(rect, count, leadings, edge):
+    edge = txt_to_edge(edge)
+    leadings = leadings + [0]
+    full = rect.w if edge == Edge.MinX or edge == Edge.MaxX else rect.h
+    unit = (full - sum(leadings)) / count
+    amounts = [val for pair in zip([unit] * count, leadings)
+               for val in pair][:-1]
+    return iterative_subdivide(rect.rect(), amounts, edge)[::2]
+
+
+def check():
+    edges = [Edge.MinX, Edge.MaxX, Edge.MinY, Edge.MaxY]
+    for rect in [Rect((0, 0, 1920, 1080)), Rect((100, 50, 1000, 1000)), Rect((-20, 10, 640, 480))]:
+        for edge in edges:
+            # evenly-divisible counts, as in most grid/column layouts
+            for count in [1, 2, 4, 5, 8, 10, 16, 20, 40]:
+                expected = iterative_subdivide(rect.rect(), count, edge)
+                assert [r.rect() for r in rect.subdivide(count, edge)] == expected, (rect, count, edge)
+            # explicit amounts (pixels & percentages) are reproduced exactly
+            for amounts in [[100, 200], [0.25, 0.5, 33.3], [10] * 12]:
+                expected = iterative_subdivide(rect.rect(), amounts, edge)
+                assert [r.rect() for r in rect.subdivide(amounts, edge)] == expected, (rect, amounts, edge)
+            for count, leadings in [(3, [20, 20]), (5, [12.5] * 4), (4, [10, 30, 7])]:
+                expected = iterative_subdivide_with_leadings(rect, count, leadings, edge)
+                assert [r.rect() for r in rect.subdivide_with_leadings(count, leadings, edge)] == expected, (rect, count, edge)
+
+    # non-divisible counts differ only by the drift the iterative version accumulates
+    for count in [3, 7, 333, 10000]:
+        new = Rect((0, 0, 1000, 10)).subdivide(count, Edge.MinX)
+        old = iterative_subdivide([0, 0, 1000, 10], count, Edge.MinX)
+        drift = max(abs(a.x - b[0]) for a, b in zip(new, old))
+        print("count {:>5}: max drift of iterative version {:.2e}".format(count, drift))
+
+
+def bench(label, stmt, number, **env):
+    t = min(timeit.repeat(stmt, globals=env, number=number, repeat=3))
+    print("{:<40} {:>10.1f} µs".format(label, t / number * 1e6))
+
+
+if __name__ == "__main__":
+    check()
+    print("(all representative inputs identical)")
+
+    r = Rect((0, 0, 1920, 1080))
+    env = dict(r=r, rr=r.rect(), Edge=Edge, minx=Edge.MinX,
+        iterative_subdivide=iterative_subdivide,
+        iterative_subdivide_with_leadings=iterative_subdivide_with_leadings)
+    for count in [10, 100, 1000, 10000]:
+        number = max(1, 10000 // count)
+        bench(f"iterative subdivide({count})", f"iterative_subdivide(rr, {count}, minx)", number, **env)
+        bench(f"Rect.subdivide({count})", f"r.subdivide({count}, minx)", number, **env)
+        bench(f"iterative subdivide_with_leadings({count})", f"iterative_subdivide_with_leadings(r, {count}, [0] * {count - 1}, minx)", number, **env)
+        bench(f"Rect.subdivide_with_leadings({count})", f"r.subdivide_with_leadings({count}, [0] * {count - 1}, minx)", number, **env)
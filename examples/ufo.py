@@ -1,21 +1,19 @@
 from furniture.animation import Animation
-from furniture.vfont import scaledFontVariations
+from furniture.timeline import Timeline
+from furniture.textcache import text
 #from drawBot import *
 
 def draw(frame):
-    bp = BezierPath()
     for layer, fontName, fillColor in [["default", "HobeauxRococeaux-Regular", (1, 0, 0.5)], ["bg", "HobeauxRococeaux-Background", (0, 0.5, 1)]]:
         if layer in frame.layers:
-            fs = FormattedString(font=fontName, fontSize=1000)
-            if frame.doneness > 0.66:
-                fs.append("C")
-            elif frame.doneness > 0.33:
-                fs.append("B")
-            else:
-                fs.append("A")
-            bp.text(fs, (100, -100))
+            # shaped once per clip, not once per frame
+            text(frame.bps[layer].bp, frame.timeline.current(), fontName, 1000, (100, -100))
             frame.bps[layer].fill = fillColor
-            bp.drawToPen(frame.bps[layer].bp)
 
-animation = Animation(draw, 60, dimensions=(1000, 1000), fmt="ufo", layers=["bg", "default"])
+timeline = Timeline()
+timeline.clip("A", 0, 20)
+timeline.clip("B", 20, 40)
+timeline.clip("C", 40, 60)
+
+animation = Animation(draw, 60, dimensions=(1000, 1000), fmt="ufo", layers=["bg", "default"], timeline=timeline)
 animation.storyboard(0, 59)
\ No newline at end of file
@@ -1,22 +1,282 @@
 import sys
+import types
 import time
 import os
 import json
-import tempfile
 import datetime
-import drawBot as db
-import drawBot.context.baseContext
+import math
+import hashlib
+import contextlib
+import multiprocessing
+import queue
+import shlex
+import subprocess
+import tempfile
+import threading
+from furniture import backend
 from furniture.geometry import Rect, Edge
+from furniture.paths import ArrayPath
+from furniture.timeline import Timeline
+from furniture.framedata import FrameData, open_frame_data
+from furniture.ufo import GlyphWriter
+from furniture.ttf import TTFWriter, build_ttfs
+
+# defcon & fontTools (slow to import) are only imported when rendering ufos
+
+
+def load_animation(path, name=None):
+    """
+    Load a source file the way the DrawBot app would (i.e. with
+    `from drawBot import *` already in scope, or the drawing functions of
+    `furniture.backend` when headless) and return the `Animation`
+    defined in it — the one called `name` if given, otherwise the last one
+    """
+    src_path = os.path.realpath(path)
+    with open(src_path, "r", encoding="utf-8") as f:
+        code = compile(f.read(), src_path, "exec")
+
+    # act like the app (or, headlessly, the closest thing to it), by running
+    # the file itself, with those names already in its globals
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    src = types.ModuleType("_furniture_" + "".join(c if c.isalnum() else "_" for c in stem))
+    src.__file__ = src_path
+    src.__dict__.update(_app_globals())
+    sys.modules[src.__name__] = src
+    exec(code, src.__dict__)
+
+    animation = None
+    for k, obj in src.__dict__.items():
+        if isinstance(obj, Animation):
+            if name is None or obj.name == name or animation is None:
+                animation = obj
+    return animation
+
+
+def _app_globals():
+    # what `from drawBot import *` (or `from furniture.backend import *`) gives
+    if backend.current().name == "drawbot":
+        import drawBot as module
+    else:
+        module = backend
+    names = getattr(module, "__all__", None) or [n for n in dir(module) if not n.startswith("_")]
+    return {n: getattr(module, n) for n in names}
+
+
+def _is_font(fmt):
+    if isinstance(fmt, (GlyphWriter, TTFWriter)):
+        return True
+    # nothing can be a defcon font if defcon hasn’t even been imported
+    defcon = sys.modules.get("defcon")
+    return defcon is not None and isinstance(fmt, defcon.Font)
+
+
+def _save_fonts(fonts):
+    # ttfs are built all at once, each in its own process
+    build_ttfs([f for f in fonts.values() if isinstance(f, TTFWriter)])
+    for font in fonts.values():
+        if not isinstance(font, TTFWriter):
+            font.save()
+
+
+# per-process state for parallel rendering: the animations each worker has
+# loaded, by source & name, along with the source’s mtime when loaded
+_worker_animations = {}
+
+
+def _worker_animation(source, name):
+    """
+    The animation in `source`, loaded once per worker process, and reloaded
+    only if the file has changed since — so a pool of workers can be kept
+    warm across renders (see `furniture.server`)
+    """
+    mtime = os.path.getmtime(source)
+    cached = _worker_animations.get((source, name))
+    if cached and cached[0] == mtime:
+        return cached[1]
+    animation = load_animation(source, name)
+    if not animation:
+        raise Exception("No furniture.animation.Animation object found in " + source)
+    animation.precomputeTimeline()
+    _worker_animations[(source, name)] = (mtime, animation)
+    return animation
+
+
+def _init_worker(source, name):
+    _worker_animation(source, name)
+
+
+def _render_chunk(job):
+    """
+    Render a chunk of frames in a worker process; for ufos, the glyphs are
+    either written straight into the ufo (with `streamGlyphs`) or sent back
+    as `ArrayPath`s (i.e. as bytes), to be merged into each layer's font by the parent
+    process (as are any manifest updates, for incremental renders)
+    """
+    from furniture.stats import RenderStats
+
+    source, name, data, layers, indices, folder, fmt, singlePass, incremental, hashes, timed, profile, log, streamGlyphs = job
+    animation = _worker_animation(source, name)
+    stats = RenderStats(profile) if timed else None
+    fonts, writers = {}, {}
+    if fmt == "ttf":
+        writers = {layer: animation.ttfWriter(folder + "/ttfs", layer) for layer in layers}
+    elif fmt == "ufo" and streamGlyphs:
+        writers = {layer: animation.glyphWriter(folder + "/ufos", layer) for layer in layers}
+    elif fmt == "ufo":
+        import defcon
+        fonts = {layer: defcon.Font() for layer in layers}
+    manifests = {}
+    if incremental:
+        manifests = {layer: animation.manifest(folder, layer, fmt, writers.get(layer)) for layer in layers}
+
+    animation._render_frames(layers, indices, folder, writers or fonts or fmt, singlePass, data, manifests, hashes, stats, log)
+
+    glyphs = []
+    for layer, font in fonts.items():
+        for i in indices:
+            name = "frame_" + str(i)
+            if name in font:
+                g = font[name]
+                path = ArrayPath()
+                g.draw(path)
+                glyphs.append((layer, g.name, g.unicode, g.width, path))
+    for layer, writer in writers.items():
+        if isinstance(writer, TTFWriter):
+            for name, (unicode, width, recording) in writer.glyphs.items():
+                glyphs.append((layer, name, unicode, width, recording))
+    updates = {layer: m.updates for layer, m in manifests.items()}
+    if not stats:
+        return glyphs, updates, [], None
+    profiled = stats.dump_profile(f"{folder}/render.{os.getpid()}.{indices[0]}.prof")
+    return glyphs, updates, stats.records, profiled
+
+
+def _hash(*values):
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class RenderManifest():
+    """
+    A per-layer record of the last render of each frame — a hash of what
+    went into the frame and of what came out — kept as json next to the
+    layer’s frames folder, so unchanged frames can be skipped on re-render;
+    `exists` is a function of a frame index that checks the output is still there
+    """
+    def __init__(self, path, exists):
+        self.path = path
+        self.exists = exists
+        self.updates = {}
+        try:
+            with open(path, "r") as f:
+                self.frames = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.frames = {}
+
+    def unchanged(self, i, **hashes):
+        entry = self.frames.get(str(i))
+        if not entry:
+            return False
+        for k, v in hashes.items():
+            if v is None or entry.get(k) != v:
+                return False
+        return self.exists(i)
+
+    def record(self, i, **hashes):
+        self.frames[str(i)] = hashes
+        self.updates[str(i)] = hashes
+
+    def save(self):
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self.frames, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+FFMPEG_PIPE = "ffmpeg -y -loglevel error -f rawvideo -pix_fmt rgba -s {width}x{height} -r {fps} -i - -c:v libx264 -pix_fmt yuv420p {folder}/{name}_{layer}.mp4"
+
+
+class FramePipe():
+    """
+    Streams raw RGBA frames into the stdin of a subprocess (i.e. an encoder
+    like ffmpeg), instead of saving a file per frame; frames go through a
+    bounded queue to a writer thread, so rendering gets ahead of the encoder
+    by at most `buffer` frames, and then blocks until it catches up; if the
+    subprocess exits before it’s been sent every frame, the render fails
+    with its exit code and whatever it printed to stderr
+    """
+    def __init__(self, cmd, buffer=8):
+        self.cmd = cmd
+        self.buffer = buffer
+        self.process = None
+        self.error = None
+
+    def __enter__(self):
+        # stderr goes to a file, not a pipe, so a chatty encoder can’t block on it
+        self.stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(self.cmd, stdin=subprocess.PIPE, stderr=self.stderr)
+        self.queue = queue.Queue(maxsize=self.buffer)
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.queue.put(None)
+        self.thread.join()
+        try:
+            self.process.stdin.close()
+        except BrokenPipeError:
+            pass
+        returncode = self.process.wait()
+        said = self._stderr()
+        if type is None:
+            if self.error:
+                raise self.error
+            if returncode != 0:
+                raise self._exited()
+        if said and not self.error and returncode == 0:
+            print(said, file=sys.stderr)
+
+    def _stderr(self):
+        self.stderr.seek(0)
+        return self.stderr.read().decode("utf-8", "replace").strip()
+
+    def _exited(self):
+        # the error for a subprocess that’s gone, which is its exit code (and
+        # what it said), rather than the broken pipe it left behind
+        returncode = self.process.wait()
+        said = self._stderr()
+        early = " before it was sent every frame" if returncode == 0 else ""
+        return Exception(f"Frame pipe `{' '.join(self.cmd)}` exited with {returncode}{early}" + (":\n" + said if said else ""))
+
+    def _write(self):
+        while True:
+            data = self.queue.get()
+            if data is None:
+                return
+            if self.error:
+                continue # drain, so write() never blocks forever
+            try:
+                self.process.stdin.write(data)
+            except BrokenPipeError:
+                self.error = self._exited()
+            except Exception as e:
+                self.error = e
+
+    def write(self, data):
+        if self.error:
+            raise self.error
+        self.queue.put(data)
 
-try:
-    import defcon
-except:
-    pass
 
 class RichBezier():
-    def __init__(self):
+    def __init__(self, compact=False):
         self.fill = (0, 0, 0, 1)
-        self.bp = db.BezierPath()
+        # a furniture.paths.ArrayPath, rather than the backend’s BezierPath
+        self.bp = ArrayPath() if compact else backend.BezierPath()
 
 
 class AnimationFrame():
@@ -28,65 +288,199 @@ class AnimationFrame():
         self.data = None
         self.layers = None
         self.bps = {}
+        self.timeline = self.animation.timeline.at(i) if self.animation.timeline else None
+        self.timer = None
 
     def __repr__(self):
         return "<furniture.AnimationFrame {:04d}, {:04.2f}s, {:06.4f}%>".format(self.i, self.time, self.doneness)
 
-    def draw(self, saving=False, saveTo=None, fmt="pdf", layers=[], fill=None):
-        savingToFont = isinstance(fmt, defcon.Font)
+    def timed(self, phase):
+        # time a phase of drawing the frame, if it’s being timed (see furniture.stats)
+        return self.timer.phase(phase) if self.timer else contextlib.nullcontext()
+
+    def draw(self, saving=False, saveTo=None, fmt="pdf", layers=[], fill=None, manifest=None, hashes=None, log=True):
+        savingToFont = _is_font(fmt)
+        inputs = self.inputHash(layers, hashes)
+        if saving and manifest and manifest.unchanged(self.i, input=inputs):
+            if log:
+                print("(unchanged)", self)
+            if self.timer:
+                self.timer.skipped = True
+            return
+
         if saving:
-            db.newDrawing()
+            backend.newDrawing()
             self.saving = True
         else:
             self.saving = False
 
-        db.newPage(*self.animation.dimensions)
+        backend.newPage(*self.animation.dimensions)
         self.page = Rect.page()
 
         self.bps = {}
         for l in layers:
-            self.bps[l] = RichBezier()
+            self.bps[l] = RichBezier(self.animation.compactPaths)
 
-        with db.savedState():
+        with backend.savedState():
             if fill and not saveTo:
-                with db.savedState():
-                    db.fill(*fill)
-                    db.rect(*self.page)
+                with backend.savedState():
+                    backend.fill(*fill)
+                    backend.rect(*self.page)
             self.layers = layers
-            self.animation.fn(self)
+            with self.timed("fn"):
+                self.animation.fn(self)
             self.layers = None
         if self.animation.burn:
-            box = self.page.take(64, Edge.MinY).take(
-                120, Edge.MaxX).offset(-24, 24)
-            db.fontSize(20)
-            db.lineHeight(20)
-            db.font("Menlo-Bold")
-            db.fill(0, 0.8)
-            db.rect(*box.inset(-14, -14).offset(0, 2))
-            db.fill(1)
-            db.textBox("{:07.2f}\n{:04d}\n{:%H:%M:%S}".format(
-                self.time, self.i, datetime.datetime.now()), box, align="center")
+            with self.timed("burn"):
+                self.burn()
 
-        for k, bez in self.bps.items():
-            with db.savedState():
-                db.fill(*bez.fill)
-                db.drawPath(bez.bp)
+        with self.timed("bps"):
+            for k, bez in self.bps.items():
+                with backend.savedState():
+                    backend.fill(*bez.fill)
+                    backend.drawPath(bez.bp)
 
         if saving:
-            if savingToFont:
-                for k, bez in self.bps.items():
-                    g = defcon.Glyph()
-                    g.name = "frame_" + str(self.i)
-                    g.unicode = self.i + 48 # to get to 0
-                    g.width = self.animation.dimensions[0]
-                    bez.bp.drawToPen(g.getPen())
-                    fmt.insertGlyph(g)
+            # only a font is made entirely of frame.bps, so only a font
+            # can be skipped based on the hash of frame.bps
+            output = self.outputHash() if manifest else None
+            if savingToFont and manifest and manifest.unchanged(self.i, output=output):
+                pass
+            elif savingToFont:
+                with self.timed("glyphs"):
+                    for k, bez in self.bps.items():
+                        self.insertGlyph(fmt, bez)
+            elif isinstance(fmt, FramePipe):
+                with self.timed("save"):
+                    fmt.write(self.pixels())
             else:
-                db.saveImage(f"{saveTo}/{self.i}.{fmt}")
-            db.endDrawing()
+                with self.timed("save"):
+                    backend.saveImage(f"{saveTo}/{self.i}.{fmt}")
+            if manifest:
+                manifest.record(self.i, input=inputs, output=output)
+            backend.endDrawing()
 
         self.saving = False
 
+    def drawLayers(self, saveTo=None, fmt="pdf", layers=[], manifests={}, hashes=None, log=True):
+        """
+        Single-pass alternative to `draw`: the callback runs once, with all
+        `layers` active, and then each layer’s `RichBezier` is written out
+        on its own, to `saveTo/<layer>`, or into `fmt[layer]` when `fmt` is
+        a dict of `defcon.Font`s or `FramePipe`s — N.B. anything the callback draws directly
+        (i.e. not into `frame.bps`) is not saved in this mode
+        """
+        inputs = self.inputHash(layers, hashes)
+        if manifests and all(manifests[l].unchanged(self.i, input=inputs) for l in layers):
+            if log:
+                print("(unchanged)", self)
+            if self.timer:
+                self.timer.skipped = True
+            return
+
+        backend.newDrawing()
+        self.saving = True
+        backend.newPage(*self.animation.dimensions)
+        self.page = Rect.page()
+
+        self.bps = {}
+        for l in layers:
+            self.bps[l] = RichBezier(self.animation.compactPaths)
+
+        with backend.savedState():
+            self.layers = layers
+            with self.timed("fn"):
+                self.animation.fn(self)
+            self.layers = None
+        backend.endDrawing()
+
+        for layer, bez in self.bps.items():
+            manifest = manifests.get(layer)
+            output = self.outputHash([layer]) if manifest else None
+            if manifest:
+                unchanged = manifest.unchanged(self.i, output=output)
+                manifest.record(self.i, input=inputs, output=output)
+                if unchanged:
+                    continue
+            target = fmt[layer] if isinstance(fmt, dict) else fmt
+            if _is_font(target):
+                with self.timed("glyphs"):
+                    self.insertGlyph(target, bez)
+                continue
+            backend.newDrawing()
+            backend.newPage(*self.animation.dimensions)
+            if self.animation.burn:
+                with self.timed("burn"):
+                    self.burn()
+            with self.timed("bps"), backend.savedState():
+                backend.fill(*bez.fill)
+                backend.drawPath(bez.bp)
+            with self.timed("save"):
+                if isinstance(target, FramePipe):
+                    target.write(self.pixels())
+                else:
+                    backend.saveImage(f"{saveTo}/{layer}/{self.i}.{target}")
+            backend.endDrawing()
+
+        self.saving = False
+
+    def inputHash(self, layers, hashes):
+        """
+        Hash of everything that goes into rendering this frame, given
+        `hashes`, a tuple of the source file’s hash and the hash of this frame’s data
+        """
+        if not hashes or not hashes[0]:
+            return None
+        return _hash(hashes, self.i, layers)
+
+    def outputHash(self, layers=None):
+        """
+        Hash of the frame’s `RichBezier`s (path data and fill), as
+        populated by the callback
+        """
+        from fontTools.pens.recordingPen import RecordingPen
+        values = [self.animation.dimensions, self.animation.burn]
+        for k, bez in self.bps.items():
+            if layers is None or k in layers:
+                if isinstance(bez.bp, ArrayPath):
+                    values.append((k, bez.fill, hashlib.sha1(bez.bp.tobytes()).hexdigest()))
+                    continue
+                pen = RecordingPen()
+                bez.bp.drawToPen(pen)
+                values.append((k, bez.fill, pen.value))
+        return _hash(*values)
+
+    def burn(self):
+        box = self.page.take(64, Edge.MinY).take(
+            120, Edge.MaxX).offset(-24, 24)
+        backend.fontSize(20)
+        backend.lineHeight(20)
+        backend.font(self.animation.burn if isinstance(self.animation.burn, str) else "Menlo-Bold")
+        backend.fill(0, 0.8)
+        backend.rect(*box.inset(-14, -14).offset(0, 2))
+        backend.fill(1)
+        backend.textBox("{:07.2f}\n{:04d}\n{:%H:%M:%S}".format(
+            self.time, self.i, datetime.datetime.now()), box, align="center")
+
+    def pixels(self):
+        """
+        The current page as raw RGBA bytes (premultiplied, top row first),
+        rasterized in memory by the backend rather than via `saveImage`
+        """
+        return backend.pixels()
+
+    def insertGlyph(self, font, bez):
+        if isinstance(font, (GlyphWriter, TTFWriter)):
+            font.write("frame_" + str(self.i), self.i + 48, self.animation.dimensions[0], bez.bp)
+            return
+        import defcon
+        g = defcon.Glyph()
+        g.name = "frame_" + str(self.i)
+        g.unicode = self.i + 48 # to get to 0
+        g.width = self.animation.dimensions[0]
+        bez.bp.drawToPen(g.getPen())
+        font.insertGlyph(g)
+
 
 class Animation():
     def __init__(self, fn,
@@ -100,16 +494,32 @@ class Animation():
             data=None,
             layers=["default"],
             fill=None,
-            name="Animation"):
+            name="Animation",
+            timeline=None,
+            compactPaths=False):
         """
         - `fn` is a callback function that takes a single argument, `frame`
         - `fps` is frames-per-second
         - `dimensions` is the page size, a tuple `(x, y)`
-        - `burn`=True adds a small counter for the current frame and time
+        - `burn`=True adds a small counter for the current frame and time, in
+        Menlo — or in another font, given its name (or, without drawBot, i.e.
+        with the raster backend, the path to a font file) as `burn`
         - `audio` is not currently used
         - `folder` is the folder to which frames are rendered
-        - `fmt` is file type that will be used when rendering
-        - `data` is data you want sent into the callback via `frame.data`
+        - `fmt` is file type that will be used when rendering — or "ufo", or
+        "ttf", to render each layer’s `frame.bps` into a font, a glyph per frame
+        - `data` is data you want sent into the callback via `frame.data` —
+        either a value, a path to a json file (given whole to every frame), or a
+        path to a `.jsonl` or `.fcol` file (or any `furniture.framedata.FrameData`),
+        in which case each frame only reads its own slice of the data
+        - `layers` is a list of layer names, each rendered to its own subfolder (or ufo)
+        - `fill` is a background color, drawn when storyboarding
+        - `name` is used to name ufos, and to find this animation in parallel renders
+        - `timeline` is a `furniture.timeline.Timeline` of clips & keyframes,
+        available in the callback (for the current frame) via `frame.timeline`
+        - `compactPaths`=True makes each layer’s `frame.bps[layer].bp` a
+        `furniture.paths.ArrayPath` instead of a `BezierPath` (which is
+        cheaper to build, hash, and send to a font)
         """
         self.fn = fn
         self.length = length
@@ -123,23 +533,152 @@ class Animation():
         self.layers = layers
         self.fill = fill
         self.name = name
+        self.timeline = timeline
+        self.compactPaths = compactPaths
 
     def storyboard(self, *frames, **kwargs):
+        """
+        Draw some frames (without saving them) — and, with `preview=True`
+        (or "ops" or "tiles"), stream each one to the viewer as it’s drawn
+        (see `furniture.preview`), or to a `PreviewStream` given as `preview`
+        """
         if "frames" in kwargs:
             frames = kwargs["frames"]
-        for i in frames:
-            frame = AnimationFrame(self, i)
-            print("(storyboard)", frame)
-            #frame.data = data
-            frame.draw(saving=False, saveTo=None, layers=self.layers, fill=self.fill)
+        preview = kwargs.get("preview")
+        self.precomputeTimeline()
+        data = open_frame_data(self.data)
+        with contextlib.ExitStack() as stack:
+            if preview and not hasattr(preview, "send"):
+                from furniture.viewer import previewer
+                from furniture.preview import PreviewStream
+                connection = stack.enter_context(previewer())
+                preview = PreviewStream(connection, mode=None if preview is True else preview)
+            for i in frames:
+                frame = AnimationFrame(self, i)
+                print("(storyboard)", frame)
+                frame.data = data[i]
+                frame.draw(saving=False, saveTo=None, layers=self.layers, fill=self.fill)
+                if preview:
+                    preview.send(i)
 
-    def render(self, indicesSlice=None, start=0, end=None, data=None, folder=None, fmt=None, log=True):
-        if not data and self.data:
-            try:
-                with open(self.data, "r") as f:
-                    data = json.loads(f.read())
-            except FileNotFoundError:
-                data = {}
+    def precomputeTimeline(self):
+        """
+        Precompute the timeline for every frame, if it’s a `cache=True` one
+        """
+        if self.timeline and self.timeline.cache:
+            self.timeline.precompute(self.length)
+
+    def fontInfo(self, layer):
+        """
+        The font info of the ufo a given layer is rendered into
+        """
+        return dict(
+            familyName=self.name,
+            styleName=layer,
+            versionMajor=1,
+            versionMinor=0,
+            descender=0,
+            unitsPerEm=1000, # or self.dimensions[0] ?
+            capHeight=self.dimensions[1],
+            ascender=self.dimensions[1],
+            xHeight=int(self.dimensions[1] / 2))
+
+    def ufo(self, ufo_folder, layer):
+        """
+        Open (or create) the ufo a given layer is rendered into
+        """
+        import defcon
+        ufo_path = ufo_folder + "/" + self.name + "_" + layer + ".ufo"
+        try:
+            font = defcon.Font(ufo_path)
+        except:
+            font = defcon.Font()
+            font.save(ufo_path)
+        for k, v in self.fontInfo(layer).items():
+            setattr(font.info, k, v)
+        font.save()
+        return font
+
+    def glyphWriter(self, ufo_folder, layer):
+        """
+        A `furniture.ufo.GlyphWriter` for the ufo a given layer is rendered
+        into, i.e. the same ufo as `ufo`, but written a glyph at a time
+        """
+        return GlyphWriter(ufo_folder + "/" + self.name + "_" + layer + ".ufo", self.fontInfo(layer))
+
+    def ttfWriter(self, ttf_folder, layer):
+        """
+        A `furniture.ttf.TTFWriter` for a given layer, for rendering straight
+        to a ttf (i.e. with `fmt="ttf"`), without a ufo
+        """
+        return TTFWriter(ttf_folder + "/" + self.name + "_" + layer + ".ttf", self.fontInfo(layer))
+
+    def manifest(self, folder, layer, fmt, font=None):
+        """
+        The incremental-render manifest for a layer, kept alongside
+        the layer’s frames folder (or ufo)
+        """
+        if fmt == "ufo" or font is not None:
+            if font is None:
+                import defcon
+                try:
+                    font = defcon.Font(folder + "/ufos/" + self.name + "_" + layer + ".ufo")
+                except:
+                    font = defcon.Font()
+            exists = lambda i: ("frame_" + str(i)) in font
+        else:
+            exists = lambda i: os.path.exists(f"{folder}/{layer}/{i}.{fmt}")
+        return RenderManifest(folder + "/" + layer + ".manifest.json", exists)
+
+    def pipe(self, cmd, folder, layer, buffer=8):
+        """
+        A `FramePipe` for a layer, where `cmd` is a command template with
+        `{width}`, `{height}`, `{fps}`, `{folder}`, `{name}` & `{layer}` fields
+        """
+        if cmd is True or cmd == "ffmpeg":
+            cmd = FFMPEG_PIPE
+        w, h = self.dimensions
+        fields = dict(width=int(w), height=int(h), fps=self.fps, folder=folder, name=self.name, layer=layer)
+        return FramePipe([arg.format(**fields) for arg in shlex.split(cmd)], buffer=buffer)
+
+    def render(self, indicesSlice=None, start=0, end=None, data=None, folder=None, fmt=None, log=True, workers=1, source=None, singlePass=False, incremental=False, cacheInputs=False, pipe=None, pipeBuffer=8, layers=None, pool=None, stats=False, profile=None, streamGlyphs=False, saveFonts=True):
+        """
+        - `log`=False stops each frame being printed as it’s rendered, and the
+        summary of timings at the end
+        - `layers` renders only some of the animation’s layers (all by default)
+        - `workers` is the number of processes to render with; when more than
+        one, each worker process re-imports `source` (by default the file `fn`
+        was defined in) and renders its share of the frames
+        - `singlePass`=True runs `fn` once per frame with all layers active
+        (rather than once per layer), then saves each layer’s `frame.bps`
+        entry separately (see `AnimationFrame.drawLayers`)
+        - `incremental`=True keeps a manifest of per-frame hashes next to each
+        layer’s folder, and doesn’t re-save frames whose `frame.bps` are
+        unchanged (only when saving to ufos, or with `singlePass`, since only
+        then is the output made entirely of `frame.bps`)
+        - `cacheInputs`=True (with `incremental`) also skips calling `fn` at all
+        for frames whose inputs — frame index, the frame’s slice of `data`,
+        and `source` file — are unchanged since they were last rendered
+        - `pipe` streams each layer’s frames, as raw RGBA, into a subprocess
+        instead of saving files — either `"ffmpeg"` (to encode an mp4 per layer
+        into `folder`) or a command template (see `Animation.pipe`); at most
+        `pipeBuffer` frames are held in memory while the encoder catches up
+        - `pool` is an existing (spawn-context) `multiprocessing` pool to
+        render with, instead of starting `workers` new processes
+        - `stats`=True times every frame, phase by phase, and saves the timings
+        into `folder` (see `furniture.stats`)
+        - `profile` is a range (or slice) of frames to run `fn` under
+        cProfile for, saving the profile as `render.prof` in `folder`
+        - `streamGlyphs`=True (for ufos) writes each frame’s glyph straight
+        into its ufo as a `.glif` file (from the worker that drew it, when
+        rendering in parallel), rather than keeping every glyph of the font
+        in memory until the end (see `furniture.ufo`)
+        - `saveFonts`=False (with `streamGlyphs`) only writes the `.glif`s,
+        and not the ufos’ plists, i.e. for when many processes are rendering
+        into the same ufos and something else saves them once at the end
+        (see `furniture.shard`)
+        """
+        data = open_frame_data(data if data else self.data)
         if end == None:
             end = self.length
         indices = list(range(start, end))
@@ -147,41 +686,159 @@ class Animation():
         if indicesSlice:
             indices = list(range(*indicesSlice.indices(self.length)))
 
+        self.precomputeTimeline()
+
         folder = folder if folder else self.folder
         fmt = fmt if fmt else self.fmt
+        layers = layers if layers else self.layers
         ufo_folder = folder + "/ufos"
-        saving_to_font = fmt == "ufo"
-        
-        for layer in self.layers:
-            # a ufo for this layer
-            if saving_to_font:
-                ufo_path = ufo_folder + "/" + self.name + "_" + layer + ".ufo"
-                try:
-                    fmt = defcon.Font(ufo_path)
-                except:
-                    fmt = defcon.Font()
-                    fmt.save(ufo_path)
-                fmt.info.familyName = self.name
-                fmt.info.styleName = layer
-                fmt.info.versionMajor = 1
-                fmt.info.versionMinor = 0
-                fmt.info.descender = 0
-                fmt.info.unitsPerEm = 1000 # or self.dimensions[0] ?
-                fmt.info.capHeight = self.dimensions[1]
-                fmt.info.ascender = self.dimensions[1]
-                fmt.info.xHeight = int(self.dimensions[1] / 2)
-                fmt.save()
-            
-            for i in indices:
-                frame = AnimationFrame(self, i)
-                frame.data = data
-                print(f"(render:layer:{layer})", frame)
-                _folder = folder + "/" + layer
-                frame.draw(saving=True, saveTo=_folder, fmt=fmt, layers=[layer], fill=self.fill)
-            
-            if isinstance(fmt, defcon.Font):
-                fmt.save()
+        if not source:
+            source = self.fn.__globals__.get("__file__")
+
+        timings = None
+        if stats or profile is not None:
+            from furniture.stats import RenderStats
+            timings = RenderStats(profile, self.length)
+        started = time.perf_counter()
+
+        hashes = None
+        if incremental and cacheInputs and source and not pipe:
+            hashes = (_file_hash(source), None)
+
+        if pipe:
+            self._render_pipe(layers, indices, data, folder, pipe, pipeBuffer, workers, singlePass, timings, log)
+        elif pool or (workers and workers > 1):
+            self._render_parallel(layers, indices, data, folder, fmt, ufo_folder, workers, source, singlePass, incremental, hashes, pool, timings, log, streamGlyphs, saveFonts)
+        else:
+            self._render_serial(layers, indices, data, folder, fmt, ufo_folder, singlePass, incremental, hashes, timings, log, streamGlyphs, saveFonts)
+
+        if timings:
+            wall = time.perf_counter() - started
+            timings.save(folder, wall)
+            if log:
+                print(timings.summary(wall))
+                top = timings.top(folder)
+                if top:
+                    print(top)
+
+    def _render_serial(self, layers, indices, data, folder, fmt, ufo_folder, singlePass, incremental, hashes, stats, log, streamGlyphs, saveFonts=True):
+        fonts = {}
+        if fmt == "ttf":
+            fonts = {layer: self.ttfWriter(folder + "/ttfs", layer) for layer in layers}
+        elif fmt == "ufo":
+            fonts = {layer: (self.glyphWriter if streamGlyphs else self.ufo)(ufo_folder, layer) for layer in layers}
+        manifests = {}
+        if incremental:
+            manifests = {layer: self.manifest(folder, layer, fmt, fonts.get(layer)) for layer in layers}
+
+        if singlePass:
+            self._render_frames(layers, indices, folder, fonts or fmt, True, data, manifests, hashes, stats, log)
+        else:
+            for layer in layers:
+                self._render_frames([layer], indices, folder, fonts or fmt, False, data, manifests, hashes, stats, log)
+
+        if saveFonts or not streamGlyphs:
+            _save_fonts(fonts)
+        for manifest in manifests.values():
+            manifest.save()
+
+    def _render_pipe(self, layers, indices, data, folder, cmd, buffer, workers, singlePass, stats, log):
+        # frames have to arrive at the encoder in order, so no parallelism
+        # (and nothing to skip incrementally, since every frame is needed)
+        if workers and workers > 1:
+            raise Exception("Rendering to a pipe can’t be done with multiple workers")
+
+        if singlePass:
+            with contextlib.ExitStack() as stack:
+                pipes = {layer: stack.enter_context(self.pipe(cmd, folder, layer, buffer)) for layer in layers}
+                self._render_frames(layers, indices, folder, pipes, True, data, {}, None, stats, log)
+        else:
+            for layer in layers:
+                with self.pipe(cmd, folder, layer, buffer) as p:
+                    self._render_frames([layer], indices, folder, {layer: p}, False, data, {}, None, stats, log)
+
+    def _render_frames(self, layers, indices, folder, fmt, singlePass, data, manifests, hashes, stats=None, log=True):
+        """
+        Render `indices` for `layers` — all at once if `singlePass`, otherwise
+        `layers` is a single layer; `fmt` is a file extension or a dict of fonts,
+        `data` is a `FrameData`, and each frame is timed into `stats`, a
+        `furniture.stats.RenderStats`, if given
+        """
+        for i in indices:
+            frame = AnimationFrame(self, i)
+            frame.data = data[i]
+            # the data's part of the inputs is just this frame's slice of it
+            frame_hashes = (hashes[0], data.hash(i)) if hashes else None
+            if stats:
+                frame.timer = stats.frame(i, ",".join(layers))
+            if singlePass:
+                if log:
+                    print(f"(render:layers:{','.join(layers)})", frame)
+                frame.drawLayers(saveTo=folder, fmt=fmt, layers=layers, manifests=manifests, hashes=frame_hashes, log=log)
+            else:
+                layer = layers[0]
+                if log:
+                    print(f"(render:layer:{layer})", frame)
+                _fmt = fmt[layer] if isinstance(fmt, dict) else fmt
+                frame.draw(saving=True, saveTo=folder + "/" + layer, fmt=_fmt, layers=layers, fill=self.fill, manifest=manifests.get(layer), hashes=frame_hashes, log=log)
+            if stats:
+                stats.add(frame.timer)
+
+    def _render_parallel(self, layers, indices, data, folder, fmt, ufo_folder, workers, source, singlePass, incremental, hashes, pool=None, stats=None, log=True, streamGlyphs=False, saveFonts=True):
+        if not source:
+            raise Exception("Parallel rendering needs a `source` file to re-import the animation from")
+
+        # small-ish contiguous chunks, so slow frames don't leave workers idle
+        workers = pool._processes if pool else workers
+        size = max(1, math.ceil(len(indices) / (workers * 4)))
+        chunks = [indices[c:c+size] for c in range(0, len(indices), size)]
+        common = (source, self.name, data)
+        timed, profile = stats is not None, stats.profile if stats else None
+        if singlePass:
+            jobs = [common + (layers, chunk, folder, fmt, True, incremental, hashes, timed, profile, log, streamGlyphs) for chunk in chunks]
+        else:
+            jobs = [common + ([layer], chunk, folder, fmt, False, incremental, hashes, timed, profile, log, streamGlyphs) for layer in layers for chunk in chunks]
+
+        fonts = {}
+        if fmt == "ttf":
+            fonts = {layer: self.ttfWriter(folder + "/ttfs", layer) for layer in layers}
+        elif fmt == "ufo" and streamGlyphs:
+            # workers write the glyphs, so this only writes the plists, at the end
+            fonts = {layer: self.glyphWriter(ufo_folder, layer) for layer in layers}
+        elif fmt == "ufo":
+            import defcon
+            for layer in layers:
+                fonts[layer] = self.ufo(ufo_folder, layer)
+        manifests = {}
+        if incremental:
+            manifests = {layer: self.manifest(folder, layer, fmt, fonts.get(layer)) for layer in layers}
+
+        with contextlib.ExitStack() as stack:
+            if not pool:
+                # spawn, not fork, since drawBot (i.e. AppKit) isn't fork-safe
+                ctx = multiprocessing.get_context("spawn")
+                pool = stack.enter_context(ctx.Pool(workers, initializer=_init_worker, initargs=(source, self.name)))
+            # imap keeps results in job order, so glyphs are merged in frame order
+            for glyphs, updates, records, profiled in pool.imap(_render_chunk, jobs):
+                if stats:
+                    stats.merge(records, profiled)
+                for layer, name, unicode, width, recording in glyphs:
+                    if isinstance(fonts[layer], TTFWriter):
+                        fonts[layer].add(name, unicode, width, recording)
+                        continue
+                    g = defcon.Glyph()
+                    g.name = name
+                    g.unicode = unicode
+                    g.width = width
+                    recording.drawToPen(g.getPen())
+                    fonts[layer].insertGlyph(g)
+                for layer, frames in updates.items():
+                    manifests[layer].frames.update(frames)
 
+        if saveFonts or not streamGlyphs:
+            _save_fonts(fonts)
+        for manifest in manifests.values():
+            manifest.save()
 
 if __name__ == "__main__":
     def draw(frame):
@@ -0,0 +1,368 @@
+"""
+Where drawing calls go. Everything furniture draws goes through the
+functions in this module (named & called just like their drawBot
+equivalents), which hand off to the current backend — drawBot itself, or a
+headless backend that just records what’s drawn into a `DisplayList`
+(which is serializable & replayable), so animations can run (and be
+profiled) without drawBot, i.e. on Linux
+
+The backend is picked by `use`, or the `FURNITURE_BACKEND` environment
+variable (which is how parallel workers inherit it), or else it’s drawBot
+if drawBot can be imported, and headless if it can’t
+"""
+import os
+import json
+import zlib
+import math
+import contextlib
+
+# the drawing calls a backend provides
+API = [
+    "newDrawing", "endDrawing", "newPage", "width", "height",
+    "savedState", "save", "restore",
+    "fill", "stroke", "strokeWidth",
+    "rect", "oval", "line", "polygon",
+    "font", "fontSize", "lineHeight", "text", "textBox",
+    "translate", "rotate", "scale",
+    "BezierPath", "drawPath",
+    "saveImage", "pixels",
+]
+
+_current = None
+
+
+class BackendError(Exception):
+    """
+    Something was drawn (or asked for) that the current backend can’t do
+    """
+
+
+def current():
+    global _current
+    if _current is None:
+        name = os.environ.get("FURNITURE_BACKEND")
+        if not name:
+            try:
+                import drawBot
+                name = "drawbot"
+            except ImportError:
+                name = "headless"
+        use(name)
+    return _current
+
+
+def use(backend):
+    """
+    Set the backend, either by name ("drawbot", "headless", or "raster",
+    see `furniture.raster`) or as an instance of a backend class
+    """
+    global _current
+    if isinstance(backend, str):
+        name = backend.lower()
+        if name == "drawbot":
+            backend = DrawBotBackend()
+        elif name == "headless":
+            backend = RecordingBackend()
+        elif name == "raster":
+            from furniture.raster import RasterBackend
+            backend = RasterBackend()
+        else:
+            raise ValueError("Unknown backend " + repr(backend) + ", must be drawbot, headless, or raster")
+        os.environ["FURNITURE_BACKEND"] = name
+    _current = backend
+    return backend
+
+
+def _proxy(name):
+    def call(*args, **kwargs):
+        return getattr(current(), name)(*args, **kwargs)
+    call.__name__ = name
+    return call
+
+
+for _name in API:
+    globals()[_name] = _proxy(_name)
+
+__all__ = list(API)
+
+
+def __getattr__(name):
+    # anything else the current backend has (i.e. the rest of drawBot)
+    if name.startswith("_"):
+        raise AttributeError(name)
+    return getattr(current(), name)
+
+
+class DrawBotBackend():
+    """
+    Drawing with drawBot, i.e. everything is passed straight through
+    """
+    name = "drawbot"
+
+    def __init__(self):
+        import drawBot
+        self.db = drawBot
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def drawPath(self, path=None):
+        # anything else that can draw itself to a pen (i.e. an ArrayPath)
+        # goes through a BezierPath
+        if path is not None and not isinstance(path, self.db.BezierPath):
+            bp = self.db.BezierPath()
+            path.drawToPen(bp)
+            path = bp
+        self.db.drawPath(path)
+
+    def pixels(self):
+        """
+        The current (i.e. last) page as raw RGBA bytes (premultiplied, top
+        row first), rasterized in memory rather than via `saveImage`
+        """
+        import Quartz
+        w, h = int(self.db.width()), int(self.db.height())
+        pdf = self.db.pdfImage()
+        page = pdf.pageAtIndex_(pdf.pageCount() - 1).pageRef()
+        ctx = Quartz.CGBitmapContextCreate(None, w, h, 8, w * 4,
+            Quartz.CGColorSpaceCreateDeviceRGB(), Quartz.kCGImageAlphaPremultipliedLast)
+        Quartz.CGContextDrawPDFPage(ctx, page)
+        image = Quartz.CGBitmapContextCreateImage(ctx)
+        return bytes(Quartz.CGDataProviderCopyData(Quartz.CGImageGetDataProvider(image)))
+
+
+# one-letter codes for path segments in a display list, plus "o" for a
+# qCurveTo of only off-curve points (a whole contour, that ends with None)
+_SEGMENTS = {"moveTo": "m", "lineTo": "l", "curveTo": "c", "qCurveTo": "q", "closePath": "z", "endPath": "e"}
+_SEGMENT_NAMES = {v: k for k, v in _SEGMENTS.items()}
+_SEGMENT_NAMES["o"] = "qCurveTo"
+
+# bezier circle approximation
+_KAPPA = 4 * (math.sqrt(2) - 1) / 3
+
+
+class RecordingPath():
+    """
+    A headless stand-in for drawBot’s `BezierPath`: a pen that records its
+    segments compactly, as `[code, x, y, ...]` lists (see `_SEGMENTS`), and
+    can draw them to any other pen
+    """
+    def __init__(self):
+        self.segments = []
+
+    def moveTo(self, pt):
+        self.segments.append(["m", *pt])
+
+    def lineTo(self, pt):
+        self.segments.append(["l", *pt])
+
+    def curveTo(self, *pts):
+        self.segments.append(["c", *[v for pt in pts for v in pt]])
+
+    def qCurveTo(self, *pts):
+        if pts and pts[-1] is None:
+            self.segments.append(["o", *[v for pt in pts[:-1] for v in pt]])
+        else:
+            self.segments.append(["q", *[v for pt in pts for v in pt]])
+
+    def closePath(self):
+        self.segments.append(["z"])
+
+    def endPath(self):
+        self.segments.append(["e"])
+
+    def addComponent(self, glyphName, transformation):
+        raise BackendError("Components can’t be drawn to a RecordingPath, draw with the drawbot backend (-b drawbot) instead")
+
+    def rect(self, x, y, w, h):
+        self.moveTo((x, y))
+        self.lineTo((x + w, y))
+        self.lineTo((x + w, y + h))
+        self.lineTo((x, y + h))
+        self.closePath()
+
+    def oval(self, x, y, w, h):
+        rx, ry = w / 2, h / 2
+        cx, cy = x + rx, y + ry
+        kx, ky = rx * _KAPPA, ry * _KAPPA
+        self.moveTo((cx, y))
+        self.curveTo((cx + kx, y), (x + w, cy - ky), (x + w, cy))
+        self.curveTo((x + w, cy + ky), (cx + kx, y + h), (cx, y + h))
+        self.curveTo((cx - kx, y + h), (x, cy + ky), (x, cy))
+        self.curveTo((x, cy - ky), (cx - kx, y), (cx, y))
+        self.closePath()
+
+    def text(self, txt, offset=(0, 0), font=None, fontSize=10):
+        """
+        A string in a `font` file at a `fontSize`, shaped (with fontTools)
+        through `furniture.textcache`, like `ArrayPath.text`
+        """
+        if not isinstance(txt, str) or not font or not os.path.exists(font):
+            raise BackendError("Text can only be shaped without drawBot from a string & a font file, draw with the drawbot backend (-b drawbot) instead")
+        from furniture.textcache import cache
+        cache.draw(self, txt, font, fontSize, offset or (0, 0))
+
+    def drawToPen(self, pen):
+        draw_segments(self.segments, pen)
+
+    def bounds(self):
+        xs = [v for code, *vs in self.segments for v in vs[0::2]]
+        ys = [v for code, *vs in self.segments for v in vs[1::2]]
+        if not xs:
+            return None
+        return min(xs), min(ys), max(xs), max(ys)
+
+
+def draw_segments(segments, pen):
+    """
+    Draw `RecordingPath` segments to a pen
+    """
+    for code, *vs in segments:
+        pts = [tuple(vs[k:k+2]) for k in range(0, len(vs), 2)]
+        if code == "o":
+            pts.append(None)
+        getattr(pen, _SEGMENT_NAMES[code])(*pts)
+
+
+def _plain(value):
+    # make drawing arguments (Rects, Points, tuples) json-friendly
+    if isinstance(value, (list, tuple)) or hasattr(value, "__iter__") and not isinstance(value, (str, dict)):
+        return [_plain(v) for v in value]
+    return value
+
+
+class DisplayList():
+    """
+    Everything drawn on a single page, as a list of `[op, args]` — where
+    `op` is the name of a drawing call, & paths are their `RecordingPath`
+    segments — that can be saved (as json, or zlib-compressed json) and
+    replayed onto any backend
+    """
+    def __init__(self, size=(0, 0), ops=None):
+        self.size = tuple(size)
+        self.ops = ops if ops is not None else []
+
+    def __repr__(self):
+        return "<furniture.DisplayList {}x{}, {} ops>".format(*self.size, len(self.ops))
+
+    def record(self, op, args, kwargs=None):
+        if kwargs:
+            self.ops.append([op, _plain(args), kwargs])
+        else:
+            self.ops.append([op, _plain(args)])
+
+    def to_json(self):
+        return json.dumps({"size": list(self.size), "ops": self.ops}, separators=(",", ":"))
+
+    @staticmethod
+    def from_json(txt):
+        d = json.loads(txt)
+        return DisplayList(d["size"], d["ops"])
+
+    def to_bytes(self):
+        return zlib.compress(self.to_json().encode("utf-8"))
+
+    @staticmethod
+    def from_bytes(data):
+        return DisplayList.from_json(zlib.decompress(data).decode("utf-8"))
+
+    def replay(self, backend=None):
+        """
+        Draw the ops onto a backend (by default, the current one) — i.e.
+        a page recorded headlessly can be rendered later with drawBot
+        """
+        backend = backend or current()
+        backend.newPage(*self.size)
+        for op in self.ops:
+            name, args, kwargs = op[0], op[1], op[2] if len(op) > 2 else {}
+            if name == "drawPath":
+                path = backend.BezierPath()
+                draw_segments(args[0], path)
+                backend.drawPath(path)
+            else:
+                getattr(backend, name)(*args, **kwargs)
+
+
+class RecordingBackend():
+    """
+    A headless backend, which records each page into a `DisplayList`;
+    `saveImage` writes the pages as json (to a `.json` path) or compressed
+    json (to a `.fdl` path, i.e. furniture display list)
+    """
+    name = "headless"
+
+    def __init__(self):
+        self.pages = []
+        self.page = None
+
+    def _record(self, op, *args, **kwargs):
+        if self.page is None:
+            self.newPage()
+        self.page.record(op, args, kwargs)
+
+    def newDrawing(self):
+        self.pages = []
+        self.page = None
+
+    def endDrawing(self):
+        pass
+
+    def newPage(self, width=1000, height=1000):
+        self.page = DisplayList((width, height))
+        self.pages.append(self.page)
+
+    def width(self):
+        return self.page.size[0] if self.page else 1000
+
+    def height(self):
+        return self.page.size[1] if self.page else 1000
+
+    @contextlib.contextmanager
+    def savedState(self):
+        self.save()
+        try:
+            yield
+        finally:
+            self.restore()
+
+    def BezierPath(self):
+        return RecordingPath()
+
+    def drawPath(self, path):
+        self._record("drawPath", path.segments)
+
+    def saveImage(self, path):
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                f.write("[" + ",".join(p.to_json() for p in self.pages) + "]")
+        elif path.endswith(".fdl"):
+            with open(path, "wb") as f:
+                f.write(zlib.compress(("[" + ",".join(p.to_json() for p in self.pages) + "]").encode("utf-8")))
+        else:
+            raise ValueError("The headless backend can only save display lists (.json or .fdl), not " + path)
+
+    def pixels(self):
+        raise BackendError("The headless backend doesn’t rasterize, use the raster backend (-b raster) or drawbot instead")
+
+
+def _recorder(op):
+    def record(self, *args, **kwargs):
+        self._record(op, *args, **kwargs)
+    record.__name__ = op
+    return record
+
+
+for _name in ["save", "restore", "fill", "stroke", "strokeWidth", "rect", "oval", "line", "polygon",
+        "font", "fontSize", "lineHeight", "text", "textBox", "translate", "rotate", "scale"]:
+    setattr(RecordingBackend, _name, _recorder(_name))
+
+
+def load_display_lists(path):
+    """
+    The pages saved by `RecordingBackend.saveImage`, as `DisplayList`s
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".fdl"):
+        data = zlib.decompress(data)
+    return [DisplayList(p["size"], p["ops"]) for p in json.loads(data.decode("utf-8"))]
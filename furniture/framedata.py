@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+from array import array
+
+
+class FrameData():
+    """
+    Provides `frame.data` for each frame of an animation; this base class
+    hands every frame the same (whole) value
+
+    Subclasses that read from files open them lazily, and are pickled as just
+    their path, so parallel workers each map the same file (and share its
+    pages via the OS cache) instead of being sent a copy of the data
+    """
+    def __init__(self, value=None):
+        self.value = value
+        self._hash = None
+
+    def __getitem__(self, i):
+        return self.value
+
+    def hash(self, i):
+        """
+        Hash of what frame `i` gets, for incremental rendering
+        """
+        if self._hash is None:
+            self._hash = hashlib.sha1(json.dumps(self.value, sort_keys=True, default=repr).encode("utf-8")).hexdigest()
+        return self._hash
+
+
+class JSONData(FrameData):
+    """
+    A `.json` file, loaded (once, when first needed) and handed whole to every
+    frame; a missing file is treated as `{}`
+    """
+    def __init__(self, path):
+        self.path = path
+        self._value = None
+        self._hash = None
+
+    def __getstate__(self):
+        return {"path": self.path, "_value": None, "_hash": self._hash}
+
+    @property
+    def value(self):
+        if self._value is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._value = json.loads(f.read())
+            except FileNotFoundError:
+                self._value = {}
+        return self._value
+
+    def hash(self, i):
+        if self._hash is None:
+            try:
+                with open(self.path, "rb") as f:
+                    self._hash = hashlib.sha1(f.read()).hexdigest()
+            except FileNotFoundError:
+                self._hash = ""
+        return self._hash
+
+
+def _map(path):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class JSONLinesData(FrameData):
+    """
+    A `.jsonl` file, one json value per line, where line `i` is the data for
+    frame `i`; the file is memory-mapped, and the byte offset of every line is
+    indexed (and cached alongside, as `<path>.idx`), so each frame only reads
+    & parses its own line — frames past the end of the file get `None`
+    """
+    def __init__(self, path):
+        self.path = path
+        self._mm = None
+        self._offsets = None
+
+    def __getstate__(self):
+        return {"path": self.path, "_mm": None, "_offsets": None}
+
+    def _open(self):
+        self._mm = _map(self.path)
+        self._offsets = self._index()
+
+    def _index(self):
+        idx_path = self.path + ".idx"
+        try:
+            if os.path.getmtime(idx_path) >= os.path.getmtime(self.path):
+                offsets = array("Q")
+                with open(idx_path, "rb") as f:
+                    offsets.frombytes(f.read())
+                return offsets
+        except (OSError, ValueError):
+            pass
+
+        mm = self._mm
+        offsets = array("Q")
+        start, end = 0, len(mm)
+        while start < end:
+            offsets.append(start)
+            nl = mm.find(b"\n", start)
+            if nl == -1:
+                break
+            start = nl + 1
+        offsets.append(end)
+        try:
+            with open(idx_path, "wb") as f:
+                f.write(offsets.tobytes())
+        except OSError:
+            pass # read-only location, so just index on every open
+        return offsets
+
+    def __len__(self):
+        if self._mm is None:
+            self._open()
+        return len(self._offsets) - 1
+
+    def line(self, i):
+        if self._mm is None:
+            self._open()
+        if i < 0 or i >= len(self._offsets) - 1:
+            return None
+        return self._mm[self._offsets[i]:self._offsets[i + 1]].rstrip(b"\r\n")
+
+    def __getitem__(self, i):
+        line = self.line(i)
+        if not line:
+            return None
+        return json.loads(line)
+
+    def hash(self, i):
+        return hashlib.sha1(self.line(i) or b"").hexdigest()
+
+
+COLUMNS_MAGIC = b"FURNCOL1"
+
+
+def write_columns(path, columns, types={}):
+    """
+    Write a `.fcol` file (for `ColumnarData`) from a dict of column name to
+    a sequence of per-frame values — either numbers, or same-length tuples of
+    numbers (i.e. x/y tracking data) — all of the same length; `types` maps
+    column names to `array` typecodes (default "d", i.e. 64-bit float)
+
+    The format is the magic bytes, a little-endian uint32 header length, a
+    json header, and then each column’s values, contiguous & 8-byte aligned
+    """
+    header = {"length": None, "byteorder": sys.byteorder, "columns": []}
+    blobs = []
+    offset = 0
+    for name, values in columns.items():
+        values = list(values)
+        if header["length"] is None:
+            header["length"] = len(values)
+        elif len(values) != header["length"]:
+            raise ValueError("Column " + name + " is a different length than the others")
+        width = len(values[0]) if values and isinstance(values[0], (tuple, list)) else 1
+        if width > 1:
+            values = [v for row in values for v in row]
+        blob = array(types.get(name, "d"), values).tobytes()
+        header["columns"].append({"name": name, "type": types.get(name, "d"), "width": width, "offset": offset})
+        blobs.append(blob)
+        offset += len(blob) + (-len(blob) % 8)
+
+    head = json.dumps(header).encode("utf-8")
+    start = len(COLUMNS_MAGIC) + 4 + len(head)
+    with open(path, "wb") as f:
+        f.write(COLUMNS_MAGIC)
+        f.write(struct.pack("<I", len(head)))
+        f.write(head)
+        f.write(b"\0" * (-start % 8))
+        for blob in blobs:
+            f.write(blob)
+            f.write(b"\0" * (-len(blob) % 8))
+
+
+class ColumnarData(FrameData):
+    """
+    A `.fcol` file (see `write_columns`) of per-frame columns, memory-mapped,
+    so frame `i` gets a dict of each column’s value at `i` (or `None` past
+    the end), read straight from the mapped pages; `column(name)` gives a
+    whole column as a memoryview, i.e. for `numpy.frombuffer`
+    """
+    def __init__(self, path):
+        self.path = path
+        self._mm = None
+        self._columns = None
+
+    def __getstate__(self):
+        return {"path": self.path, "_mm": None, "_columns": None}
+
+    def _open(self):
+        mm = _map(self.path)
+        if mm[:len(COLUMNS_MAGIC)] != COLUMNS_MAGIC:
+            raise ValueError(self.path + " is not a furniture columns (.fcol) file")
+        hlen, = struct.unpack_from("<I", mm, len(COLUMNS_MAGIC))
+        start = len(COLUMNS_MAGIC) + 4
+        header = json.loads(bytes(mm[start:start + hlen]))
+        if header["byteorder"] != sys.byteorder:
+            raise ValueError(self.path + " was written on a machine of a different byteorder")
+        base = start + hlen + (-(start + hlen) % 8)
+
+        view = memoryview(mm)
+        self.length = header["length"]
+        self._columns = {}
+        for c in header["columns"]:
+            size = array(c["type"]).itemsize * c["width"] * self.length
+            col = view[base + c["offset"]:base + c["offset"] + size].cast(c["type"])
+            self._columns[c["name"]] = (col, c["width"])
+        self._mm = mm
+
+    def __len__(self):
+        if self._mm is None:
+            self._open()
+        return self.length
+
+    def column(self, name):
+        if self._mm is None:
+            self._open()
+        return self._columns[name][0]
+
+    def __getitem__(self, i):
+        if self._mm is None:
+            self._open()
+        if i < 0 or i >= self.length:
+            return None
+        row = {}
+        for name, (col, width) in self._columns.items():
+            row[name] = col[i] if width == 1 else tuple(col[i * width:(i + 1) * width])
+        return row
+
+    def hash(self, i):
+        if self._mm is None:
+            self._open()
+        h = hashlib.sha1()
+        if 0 <= i < self.length:
+            for name, (col, width) in self._columns.items():
+                h.update(col[i * width:(i + 1) * width].tobytes())
+        return h.hexdigest()
+
+
+def open_frame_data(data):
+    """
+    A `FrameData` for whatever was passed as an animation’s `data`: a path to a
+    `.jsonl`/`.ndjson` or `.fcol` file is read per frame, a path to anything
+    else is loaded as json, and any other value is given as-is to every frame
+    """
+    if isinstance(data, FrameData):
+        return data
+    if isinstance(data, str):
+        if data.endswith(".jsonl") or data.endswith(".ndjson"):
+            return JSONLinesData(data)
+        elif data.endswith(".fcol"):
+            return ColumnarData(data)
+        return JSONData(data)
+    return FrameData(data)
@@ -1,9 +1,20 @@
 from enum import Enum
 import math
-try:
-    import drawBot as db
-except ImportError:
-    db = None
+from furniture import backend
+
+np = None # imported when first needed (i.e. by `RectArray`), see `_numpy`
+
+
+def _numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError(
+                "numpy was not found, so `RectArray` cannot be used")
+        np = numpy
+    return np
 
 YOYO = "ma"
 
@@ -19,6 +30,10 @@ class Edge(Enum):
     CenterX = 6
 
 
+# member lookups on an Enum are slow, so the hot paths below compare against these
+_MAXY, _MAXX, _MINY, _MINX, _CENTERY, _CENTERX = Edge.MaxY, Edge.MaxX, Edge.MinY, Edge.MinX, Edge.CenterY, Edge.CenterX
+
+
 def txt_to_edge(txt):
     if isinstance(txt, str):
         txt = txt.lower()
@@ -53,8 +68,12 @@ def perc_to_pix(rect, amount, edge):
     perc(entage) to pix(els) — where the percentage is a decimal between 0 and 1 — cannot be 0 or 1
     """
     x, y, w, h = rect
+    return _perc_to_pix(w, h, amount, edge)
+
+
+def _perc_to_pix(w, h, amount, edge):
     if amount < 1.0:
-        d = h if edge == Edge.MinY or edge == Edge.MaxY or edge == Edge.CenterY else w
+        d = h if edge is _MINY or edge is _MAXY or edge is _CENTERY else w
         if amount < 0:
             return d + amount
         else:
@@ -118,27 +137,59 @@ def subdivide(rect, count, edge):
     will get you five 100-px wide rectangles, right-to-left
     N.B. Does not support center edges, as that makes no sense
     """
-    r = rect
-    subs = []
+    return _subdivide(rect, count, edge, lambda *r: list(r))
+
+
+def _spans(o, d, count, edge):
+    """
+    The (position, size) of each piece of a `subdivide` along a span of
+    length `d`, starting at `o`, in `edge`-first order. For a count, that’s
+    a direct `d / count` per piece; for a list of amounts, it’s the running
+    sums of the amounts (+ the remainder), calculated in exactly the order
+    a chain of `divide` calls would, so the results are identical
+    """
+    if edge is _CENTERX or edge is _CENTERY:
+        raise ValueError("subdivide does not support center edges")
+    if edge is _MINX:
+        forward = True
+    elif edge is _MAXX:
+        forward = False
+    elif edge is _MINY:
+        forward = not MINYISMAXY
+    else:
+        forward = MINYISMAXY
+
     if hasattr(count, "__iter__"):
-        amounts = count
-        i = len(amounts) + 1
-        a = 0
-        while i > 1:
-            s, r = divide(r, amounts[a], edge)
-            subs.append(s)
-            i -= 1
-            a += 1
-        subs.append(r)
-        return subs
+        spans = []
+        p, r = o, d
+        for a in count:
+            # percentages are of whatever remains, as with `divide`
+            a = _perc_to_pix(r, r, a, edge)
+            if forward:
+                spans.append((p, a))
+                p = p + a
+            else:
+                spans.append((o + r - a, a))
+            r = r - a
+        spans.append((p if forward else o, r))
+        return spans
+
+    n = int(count)
+    if n <= 1:
+        return [(o, d)]
+    unit = d / n
+    if forward:
+        return [(o + k * unit, unit) for k in range(n)]
     else:
-        i = count
-        while i > 1:
-            s, r = divide(r, 1/i, edge)
-            subs.append(s)
-            i -= 1
-        subs.append(r)
-        return subs
+        return [(o + k * unit, unit) for k in range(n - 1, -1, -1)]
+
+
+def _subdivide(rect, count, edge, make):
+    x, y, w, h = rect
+    if edge is _MINY or edge is _MAXY:
+        return [make(x, p, w, s) for p, s in _spans(y, h, count, edge)]
+    else:
+        return [make(p, y, s, h) for p, s in _spans(x, w, count, edge)]
 
 
 def pieces(rect, amount, edge):
@@ -213,16 +264,68 @@ def centerpoint(rect):
     return [x + w/2, y + h/2]
 
 
-def add(rect_a, rect_b):
-    # TODO better/correct implementation!
+def union(rect_a, rect_b):
+    """
+    The smallest rect that contains both rects
+    """
     ax, ay, aw, ah = rect_a
     bx, by, bw, bh = rect_b
-    return [
-        min(ax, bx),
-        min(ay, by),
-        aw + bw,
-        ah
-    ]
+    x, y = min(ax, bx), min(ay, by)
+    return [x, y, max(ax + aw, bx + bw) - x, max(ay + ah, by + bh) - y]
+
+
+def add(rect_a, rect_b):
+    return union(rect_a, rect_b)
+
+
+def bounds(rects):
+    """
+    The smallest `Rect` that contains all of some rects and/or points — as
+    `Rect`s & `Point`s, (x, y, w, h) & (x, y) sequences, a `RectArray`, or
+    an (N, 4) or (N, 2) numpy array (or a single rect or point as a 1-D
+    one), the last two in one vectorized pass — or None if there aren’t any
+    """
+    if isinstance(rects, RectArray):
+        rects = rects.array
+    if hasattr(rects, "shape"):
+        _numpy()
+        rects = np.asarray(rects, dtype=float)
+        if not rects.size:
+            return None
+        rects = np.atleast_2d(rects)
+        # column by column, since reductions over a (N, 2) slice are slow
+        x, y = rects[:, 0], rects[:, 1]
+        if rects.shape[1] == 4:
+            x1, y1 = (x + rects[:, 2]).max(), (y + rects[:, 3]).max()
+        else:
+            x1, y1 = x.max(), y.max()
+        x0, y0 = x.min(), y.min()
+        return _rect(float(x0), float(y0), float(x1 - x0), float(y1 - y0))
+
+    # a single pass, which beats building an array from Python objects
+    inf = float("inf")
+    x0 = y0 = inf
+    x1 = y1 = -inf
+    for r in rects:
+        if isinstance(r, Rect):
+            x, y, w, h = r.x, r.y, r.w, r.h
+        elif isinstance(r, Point):
+            x, y, w, h = r.x, r.y, 0, 0
+        elif len(r) == 2:
+            (x, y), w, h = r, 0, 0
+        else:
+            x, y, w, h = r
+        if x < x0:
+            x0 = x
+        if y < y0:
+            y0 = y
+        if x + w > x1:
+            x1 = x + w
+        if y + h > y1:
+            y1 = y + h
+    if x0 == inf:
+        return None
+    return _rect(x0, y0, x1 - x0, y1 - y0)
 
 
 def scale(rect, s, x_edge=Edge.CenterX, y_edge=Edge.CenterY):
@@ -252,7 +355,30 @@ def edgepoints(rect, edge):
         return (x, y + h/2), (x + w, y + h/2)
 
 
+_new = object.__new__
+
+
+def _point(x, y):
+    # construct a Point without going through __init__’s unpacking
+    p = _new(Point)
+    p.x = x
+    p.y = y
+    return p
+
+
+def _rect(x, y, w, h):
+    # construct a Rect without going through __init__’s unpacking
+    r = _new(Rect)
+    r.x = x
+    r.y = y
+    r.w = w
+    r.h = h
+    return r
+
+
 class Point():
+    __slots__ = ("x", "y")
+
     def __init__(self, point):
         try:
             x, y = point
@@ -276,16 +402,16 @@ class Point():
         return p
 
     def offset(self, dx, dy):
-        return Point((self.x + dx, self.y + dy))
+        return _point(self.x + dx, self.y + dy)
 
     def rect(self, w, h):
-        return Rect((self.x-w/2, self.y-h/2, w, h))
+        return _rect(self.x-w/2, self.y-h/2, w, h)
 
     def xy(self):
         return self.x, self.y
     
     def flip(self, frame):
-        return Point((self.x, frame.h - self.y))
+        return _point(self.x, frame.h - self.y)
     
     def flipSelf(self, frame):
         x, y = self.flip(frame)
@@ -296,7 +422,10 @@ class Point():
         return "<furn-Point" + str(self.xy()) + ">"
 
     def __getitem__(self, key):
-        return self.xy()[key]
+        return (self.x, self.y)[key]
+
+    def __iter__(self):
+        return iter((self.x, self.y))
 
     def __setitem__(self, key, value):
         if key == 0:
@@ -309,9 +438,11 @@ class Point():
 
 
 class Rect():
+    __slots__ = ("x", "y", "w", "h")
+
     def FromCenter(center, w, h):
         x, y = center
-        return Rect((x - w/2, y - h/2, w, h))
+        return _rect(x - w/2, y - h/2, w, h)
 
     def __init__(self, rect):
         x, y, w, h = rect
@@ -341,14 +472,13 @@ class Rect():
         return r
 
     def page():
-        if db:
-            return Rect((0, 0, db.width(), db.height()))
-        else:
-            raise ImportError(
-                "DrawBot was not found, so `page` cannot be called")
+        return Rect((0, 0, backend.width(), backend.height()))
 
     def __getitem__(self, key):
-        return self.rect()[key]
+        return [self.x, self.y, self.w, self.h][key]
+
+    def __iter__(self):
+        return iter((self.x, self.y, self.w, self.h))
 
     def __repr__(self):
         return "<furn-Rect" + str(self.rect()) + ">"
@@ -363,38 +493,102 @@ class Rect():
         return [self.w, self.h]
 
     def square(self):
-        return Rect(centered_square(self.rect()))
+        x, y, w, h = self.x, self.y, self.w, self.h
+        if w > h:
+            return _rect(x + (w - h) / 2, y, h, h)
+        else:
+            return _rect(x, y + (h - w) / 2, w, w)
 
     def divide(self, amount, edge, forcePixel=False):
         edge = txt_to_edge(edge)
-        if edge == Edge.CenterX or edge == Edge.CenterY:
-            a, b, c = divide(self.rect(), amount, edge, forcePixel=forcePixel)
-            return Rect(a), Rect(b), Rect(c)
-        else:
-            a, b = divide(self.rect(), amount, edge, forcePixel=forcePixel)
-            return Rect(a), Rect(b)
+        x, y, w, h = self.x, self.y, self.w, self.h
+        if not forcePixel:
+            amount = _perc_to_pix(w, h, amount, edge)
+
+        if edge is _MAXY:
+            if MINYISMAXY:
+                return _rect(x, y, w, amount), _rect(x, y + amount, w, h - amount)
+            else:
+                return _rect(x, y + h - amount, w, amount), _rect(x, y, w, h - amount)
+        elif edge is _MINY:
+            if MINYISMAXY:
+                return _rect(x, y + h - amount, w, amount), _rect(x, y, w, h - amount)
+            else:
+                return _rect(x, y, w, amount), _rect(x, y + amount, w, h - amount)
+        elif edge is _MINX:
+            return _rect(x, y, amount, h), _rect(x + amount, y, w - amount, h)
+        elif edge is _MAXX:
+            return _rect(x + w - amount, y, amount, h), _rect(x, y, w - amount, h)
+        elif edge is _CENTERX:
+            lw = (w - amount) / 2
+            return _rect(x, y, lw, h), _rect(x + lw, y, amount, h), _rect(x + lw + amount, y, lw, h)
+        elif edge is _CENTERY:
+            lh = (h - amount) / 2
+            return _rect(x, y, w, lh), _rect(x, y + lh, w, amount), _rect(x, y + lh + amount, w, lh)
 
     def subdivide(self, amount, edge):
         edge = txt_to_edge(edge)
-        return [Rect(x) for x in subdivide(self.rect(), amount, edge)]
+        return _subdivide((self.x, self.y, self.w, self.h), amount, edge, _rect)
 
     def subdivide_with_leadings(self, count, leadings, edge):
+        """
+        `count` equal pieces, separated by `leadings` (in pixels), i.e. the
+        even pieces of subdividing by [unit, leading, unit, leading ... unit]
+        """
         edge = txt_to_edge(edge)
-        leadings = leadings + [0]
-        full = self.w if edge == Edge.MinX or edge == Edge.MaxX else self.h
+        vertical = edge is _MINY or edge is _MAXY
+        o, full = (self.y, self.h) if vertical else (self.x, self.w)
         unit = (full - sum(leadings)) / count
-        amounts = [val for pair in zip([unit] * count, leadings)
-                   for val in pair][:-1]
-        return [Rect(x) for x in subdivide(self.rect(), amounts, edge)][::2]
+        gaps = (list(leadings) + [0])[:count]
+        forward = edge is _MINX or (edge is _MINY and not MINYISMAXY) or (edge is _MAXY and MINYISMAXY)
+
+        # running position (or remainder) in the same order of operations
+        # as the equivalent chain of `divide` calls
+        pieces = []
+        p, r = o, full
+        for k, gap in enumerate(gaps):
+            if forward:
+                pieces.append(p)
+                p = p + unit
+            else:
+                pieces.append(o + r - unit)
+            r = r - unit
+            if k < len(gaps) - 1:
+                p = p + gap
+                r = r - gap
+
+        if vertical:
+            return [_rect(self.x, p, self.w, unit) for p in pieces]
+        else:
+            return [_rect(p, self.y, unit, self.h) for p in pieces]
 
     def scale(self, s, x_edge=Edge.CenterX, y_edge=Edge.CenterY):
-        x_edge = txt_to_edge(x_edge)
-        y_edge = txt_to_edge(y_edge)
-        return Rect(scale(self.rect(), s, x_edge, y_edge))
+        return _rect(self.x * s, self.y * s, self.w * s, self.h * s)
 
     def take(self, amount, edge, forcePixel=False):
         edge = txt_to_edge(edge)
-        return Rect(take(self.rect(), amount, edge, forcePixel=forcePixel))
+        x, y, w, h = self.x, self.y, self.w, self.h
+        if not forcePixel:
+            amount = _perc_to_pix(w, h, amount, edge)
+
+        if edge is _MAXY:
+            if MINYISMAXY:
+                return _rect(x, y, w, amount)
+            else:
+                return _rect(x, y + h - amount, w, amount)
+        elif edge is _MINY:
+            if MINYISMAXY:
+                return _rect(x, y + h - amount, w, amount)
+            else:
+                return _rect(x, y, w, amount)
+        elif edge is _MINX:
+            return _rect(x, y, amount, h)
+        elif edge is _MAXX:
+            return _rect(x + w - amount, y, amount, h)
+        elif edge is _CENTERX:
+            return _rect(x + (w - amount) / 2, y, amount, h)
+        elif edge is _CENTERY:
+            return _rect(x, y + (h - amount) / 2, w, amount)
 
     def takeOpposite(self, amount, edge, forcePixel=False):
         edge = txt_to_edge(edge)
@@ -402,7 +596,25 @@ class Rect():
 
     def subtract(self, amount, edge):
         edge = txt_to_edge(edge)
-        return Rect(subtract(self.rect(), amount, edge))
+        x, y, w, h = self.x, self.y, self.w, self.h
+        a = _perc_to_pix(w, h, amount, edge)
+
+        if edge is _MAXY:
+            if MINYISMAXY:
+                return _rect(x, y + a, w, h - a)
+            else:
+                return _rect(x, y, w, h - a)
+        elif edge is _MINY:
+            if MINYISMAXY:
+                return _rect(x, y, w, h - a)
+            else:
+                return _rect(x, y + a, w, h - a)
+        elif edge is _MINX:
+            return _rect(x + a, y, w - a, h)
+        elif edge is _MAXX:
+            return _rect(x, y, w - a, h)
+        else:
+            return Rect(subtract(self.rect(), amount, edge))
 
     def expand(self, amount, edge):
         edge = txt_to_edge(edge)
@@ -411,15 +623,57 @@ class Rect():
     def inset(self, dx, dy=None):
         if dy == None:
             dy = dx
-        return Rect(inset(self.rect(), dx, dy))
+        return _rect(self.x + dx, self.y + dy, self.w - (dx * 2), self.h - (dy * 2))
 
     def offset(self, dx, dy=None):
         if dy == None:
             dy = dx
-        return Rect(offset(self.rect(), dx, dy))
+        if MINYISMAXY:
+            return _rect(self.x + dx, self.y - dy, self.w, self.h)
+        else:
+            return _rect(self.x + dx, self.y + dy, self.w, self.h)
+
+    def intersects(self, other):
+        """
+        Whether this rect & another overlap — rects that only share an edge
+        (like the neighboring pieces of a `divide`) don’t
+        """
+        ox, oy, ow, oh = other
+        return self.x < ox + ow and ox < self.x + self.w and self.y < oy + oh and oy < self.y + self.h
+
+    def intersection(self, other):
+        """
+        The rect where this rect & another overlap, or None if they don’t
+        """
+        ox, oy, ow, oh = other
+        x0, y0 = max(self.x, ox), max(self.y, oy)
+        x1, y1 = min(self.x + self.w, ox + ow), min(self.y + self.h, oy + oh)
+        if x0 < x1 and y0 < y1:
+            return _rect(x0, y0, x1 - x0, y1 - y0)
+        return None
+
+    def contains(self, other):
+        """
+        Whether a point (x, y) is inside this rect — including its min edges
+        but not its max edges, so a point is only ever in one of the pieces
+        of a `divide`/`grid` — or a rect (x, y, w, h) is entirely inside it
+        """
+        if isinstance(other, Point) or (not isinstance(other, Rect) and len(other) == 2):
+            px, py = other
+            return self.x <= px < self.x + self.w and self.y <= py < self.y + self.h
+        ox, oy, ow, oh = other
+        return self.x <= ox and ox + ow <= self.x + self.w and self.y <= oy and oy + oh <= self.y + self.h
+
+    def union(self, other):
+        """
+        The smallest rect that contains this rect & another
+        """
+        ox, oy, ow, oh = other
+        x, y = min(self.x, ox), min(self.y, oy)
+        return _rect(x, y, max(self.x + self.w, ox + ow) - x, max(self.y + self.h, oy + oh) - y)
 
     def __add__(self, another_rect):
-        return Rect(add(self, another_rect))
+        return self.union(another_rect)
 
     def grid(self, rows=2, columns=2):
         xs = [row.subdivide(columns, Edge.MinX)
@@ -428,17 +682,18 @@ class Rect():
 
     def pieces(self, amount, edge):
         edge = txt_to_edge(edge)
-        return [Rect(x) for x in pieces(self.rect(), amount, edge)]
+        d = self.h if edge == Edge.MaxX or edge == Edge.MaxY else self.w
+        return self.subdivide(math.floor(d / amount), edge)
 
     def edge(self, edge):
         edge = txt_to_edge(edge)
         return edgepoints(self.rect(), edge)
 
     def center(self):
-        return centerpoint(self.rect())
+        return [self.x + self.w/2, self.y + self.h/2]
     
     def flip(self, frame):
-        return Rect([self.x, frame.h - self.y - self.h, self.w, self.h])
+        return _rect(self.x, frame.h - self.y - self.h, self.w, self.h)
     
     def flipSelf(self, frame):
         x, y, w, h = self.flip(frame)
@@ -484,7 +739,426 @@ class Rect():
             if ev == Edge.CenterY:
                 py = self.y + self.h/2
 
-            return Point((px, py))
+            return _point(px, py)
+
+
+def _perc_to_pix_array(d, amount):
+    amount = np.asarray(amount, dtype=float)
+    return np.where(amount < 1.0, np.where(amount < 0, d + amount, d * amount), amount)
+
+
+class RectArray():
+    """
+    Many rects at once, held as an (N, 4) numpy array of x, y, w, h rows,
+    with the `Rect` layout methods applied to all of them in a single
+    (vectorized) pass — results of `divide`, `subdivide` & `grid` are
+    ordered rect-by-rect, so `RectArray([r]).grid(...).rects() == r.grid(...)`;
+    amounts can be a single number or one per rect
+    """
+    def __init__(self, rects):
+        _numpy()
+        if isinstance(rects, RectArray):
+            rects = rects.array
+        elif not isinstance(rects, np.ndarray):
+            rects = [[r.x, r.y, r.w, r.h] if isinstance(r, Rect) else r for r in rects]
+        self.array = np.asarray(rects, dtype=float).reshape(-1, 4)
+
+    def from_xywh(x, y, w, h):
+        _numpy()
+        return RectArray(np.stack(np.broadcast_arrays(x, y, w, h), axis=1))
+
+    def rects(self):
+        return [_rect(x, y, w, h) for x, y, w, h in self.array.tolist()]
+
+    def __len__(self):
+        return len(self.array)
+
+    def __iter__(self):
+        return iter(self.rects())
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return _rect(*self.array[key].tolist())
+        return RectArray(self.array[key])
+
+    def __repr__(self):
+        return "<furn-RectArray(" + str(len(self)) + ")>"
+
+    def xywh(self):
+        return self.array[:, 0], self.array[:, 1], self.array[:, 2], self.array[:, 3]
+
+    def _perc_to_pix(self, amount, edge):
+        x, y, w, h = self.xywh()
+        d = h if edge is _MINY or edge is _MAXY or edge is _CENTERY else w
+        return _perc_to_pix_array(d, amount)
+
+    def divide(self, amount, edge, forcePixel=False):
+        edge = txt_to_edge(edge)
+        x, y, w, h = self.xywh()
+        if not forcePixel:
+            amount = self._perc_to_pix(amount, edge)
+        xywh = RectArray.from_xywh
+
+        if edge is _MAXY:
+            if MINYISMAXY:
+                return xywh(x, y, w, amount), xywh(x, y + amount, w, h - amount)
+            else:
+                return xywh(x, y + h - amount, w, amount), xywh(x, y, w, h - amount)
+        elif edge is _MINY:
+            if MINYISMAXY:
+                return xywh(x, y + h - amount, w, amount), xywh(x, y, w, h - amount)
+            else:
+                return xywh(x, y, w, amount), xywh(x, y + amount, w, h - amount)
+        elif edge is _MINX:
+            return xywh(x, y, amount, h), xywh(x + amount, y, w - amount, h)
+        elif edge is _MAXX:
+            return xywh(x + w - amount, y, amount, h), xywh(x, y, w - amount, h)
+        elif edge is _CENTERX:
+            lw = (w - amount) / 2
+            return xywh(x, y, lw, h), xywh(x + lw, y, amount, h), xywh(x + lw + amount, y, lw, h)
+        elif edge is _CENTERY:
+            lh = (h - amount) / 2
+            return xywh(x, y, w, lh), xywh(x, y + lh, w, amount), xywh(x, y + lh + amount, w, lh)
+
+    def take(self, amount, edge, forcePixel=False):
+        edge = txt_to_edge(edge)
+        if edge is _CENTERX or edge is _CENTERY:
+            return self.divide(amount, edge, forcePixel=forcePixel)[1]
+        return self.divide(amount, edge, forcePixel=forcePixel)[0]
+
+    def subdivide(self, amount, edge):
+        """
+        Like `_spans`, but for all the rects at once
+        """
+        edge = txt_to_edge(edge)
+        if edge is _CENTERX or edge is _CENTERY:
+            raise ValueError("subdivide does not support center edges")
+        x, y, w, h = self.xywh()
+        vertical = edge is _MINY or edge is _MAXY
+        o, d = (y, h) if vertical else (x, w)
+        forward = edge is _MINX or (edge is _MINY and not MINYISMAXY) or (edge is _MAXY and MINYISMAXY)
+
+        if hasattr(amount, "__iter__"):
+            ps, ss = [], []
+            p, r = o, d
+            for a in amount:
+                a = np.broadcast_to(_perc_to_pix_array(r, a), r.shape)
+                if forward:
+                    ps.append(p)
+                    p = p + a
+                else:
+                    ps.append(o + r - a)
+                ss.append(a)
+                r = r - a
+            ps.append(p if forward else o)
+            ss.append(r)
+            p, s = np.stack(ps, axis=1), np.stack(ss, axis=1)
+        else:
+            n = int(amount)
+            if n <= 1:
+                return RectArray(self.array.copy())
+            unit = d / n
+            ks = np.arange(n) if forward else np.arange(n - 1, -1, -1)
+            p = o[:, None] + ks[None, :] * unit[:, None]
+            s = np.broadcast_to(unit[:, None], p.shape)
+
+        x = np.broadcast_to(x[:, None], p.shape)
+        y = np.broadcast_to(y[:, None], p.shape)
+        w = np.broadcast_to(w[:, None], p.shape)
+        h = np.broadcast_to(h[:, None], p.shape)
+        if vertical:
+            pieces = np.stack([x, p, w, s], axis=2)
+        else:
+            pieces = np.stack([p, y, s, h], axis=2)
+        # (N, pieces, 4), so each rect's pieces stay together
+        return RectArray(pieces.reshape(-1, 4))
+
+    def grid(self, rows=2, columns=2):
+        return self.subdivide(rows, Edge.MaxY).subdivide(columns, Edge.MinX)
+
+    def inset(self, dx, dy=None):
+        if dy is None:
+            dy = dx
+        x, y, w, h = self.xywh()
+        return RectArray.from_xywh(x + dx, y + dy, w - (np.asarray(dx) * 2), h - (np.asarray(dy) * 2))
+
+    def offset(self, dx, dy=None):
+        if dy is None:
+            dy = dx
+        x, y, w, h = self.xywh()
+        if MINYISMAXY:
+            return RectArray.from_xywh(x + dx, y - dy, w, h)
+        else:
+            return RectArray.from_xywh(x + dx, y + dy, w, h)
+
+    def scale(self, s, x_edge=Edge.CenterX, y_edge=Edge.CenterY):
+        return RectArray(self.array * np.asarray(s, dtype=float).reshape(-1, 1))
+
+    def center(self):
+        """
+        (N, 2) array of centerpoints
+        """
+        x, y, w, h = self.xywh()
+        return np.stack([x + w/2, y + h/2], axis=1)
+
+    def flip(self, frame):
+        x, y, w, h = self.xywh()
+        return RectArray.from_xywh(x, frame.h - y - h, w, h)
+
+    def bounds(self):
+        """
+        The `Rect` that contains all of these rects (see `bounds`)
+        """
+        return bounds(self.array)
+
+
+def _distance(px, py, x, y, w, h):
+    # from a point to the nearest point of a rect (0 inside it)
+    dx = max(x - px, 0, px - (x + w))
+    dy = max(y - py, 0, py - (y + h))
+    return math.hypot(dx, dy)
+
+
+class RectIndex():
+    """
+    A spatial index (a uniform grid, of `cell`-sized (w, h) cells) over a
+    bunch of rects, for "which of these intersect that region / contain that
+    point / are nearest to it" without scanning them all — each rect is kept
+    under a key (its position in `rects`, or whatever key it was `insert`ed
+    with), and queries return keys, i.e.
+
+    `index = RectIndex(cells)`
+    `hits = [cells[k] for k in index.query(region)]`
+
+    `rects` can be a list of `Rect`s (or x, y, w, h sequences) or a
+    `RectArray`, which is bulk-loaded in a single (vectorized) pass; if
+    `cell` isn’t given, it’s the rects’ average size, which suits the
+    similarly-sized pieces of a `grid` or `subdivide`. Rects can be
+    `update`d from frame to frame (which only touches the grid when a rect
+    moves into different cells), `insert`ed and `remove`d
+    """
+    def __init__(self, rects=(), cell=None):
+        if isinstance(rects, RectArray):
+            rows = rects.array
+        else:
+            rows = [[r.x, r.y, r.w, r.h] if isinstance(r, Rect) else list(r) for r in rects]
+        n = len(rows)
+        if cell is None:
+            if isinstance(rows, list):
+                cell = (sum(r[2] for r in rows) / n, sum(r[3] for r in rows) / n) if n else (1, 1)
+            else:
+                cell = (rows[:, 2].mean(), rows[:, 3].mean()) if n else (1, 1)
+        elif not hasattr(cell, "__iter__"):
+            cell = (cell, cell)
+        cw, ch = cell
+        self.cw = cw if cw > 0 else 1
+        self.ch = ch if ch > 0 else 1
+        self.cells = {} # (column, row) -> set of keys
+        self.items = {} # key -> (x, y, w, h, cells spanned)
+        self.extent = None # the (column, row) bounds of the cells in use, when known
+        self.next_key = n
+        if isinstance(rects, RectArray) and n:
+            self._bulk_load(rects.array)
+        else:
+            for k, r in enumerate(rows):
+                self._add(k, *r)
+
+    def _bulk_load(self, array):
+        # every rect’s span of cells at once, then filed away one by one
+        x, y, w, h = array[:, 0], array[:, 1], array[:, 2], array[:, 3]
+        spans = np.stack([
+            np.floor(x / self.cw), np.floor(y / self.ch),
+            np.floor((x + w) / self.cw), np.floor((y + h) / self.ch)], axis=1).astype(int)
+        self.extent = None
+        cells = self.cells
+        for k, (row, span) in enumerate(zip(array.tolist(), map(tuple, spans.tolist()))):
+            self.items[k] = (*row, span)
+            c0, r0, c1, r1 = span
+            for c in range(c0, c1 + 1):
+                for r in range(r0, r1 + 1):
+                    cells.setdefault((c, r), set()).add(k)
+
+    def _span(self, x, y, w, h):
+        return (math.floor(x / self.cw), math.floor(y / self.ch),
+            math.floor((x + w) / self.cw), math.floor((y + h) / self.ch))
+
+    def _add(self, key, x, y, w, h):
+        span = self._span(x, y, w, h)
+        self.items[key] = (x, y, w, h, span)
+        self.extent = None
+        c0, r0, c1, r1 = span
+        cells = self.cells
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                cells.setdefault((c, r), set()).add(key)
+
+    def _discard(self, key):
+        x, y, w, h, (c0, r0, c1, r1) = self.items.pop(key)
+        self.extent = None
+        cells = self.cells
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                keys = cells[(c, r)]
+                keys.discard(key)
+                if not keys:
+                    del cells[(c, r)]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __repr__(self):
+        return "<furn-RectIndex(" + str(len(self)) + ")>"
+
+    def rect(self, key):
+        x, y, w, h, _ = self.items[key]
+        return _rect(x, y, w, h)
+
+    def insert(self, rect, key=None):
+        """
+        Add a rect (under the next free integer key, unless `key` is given),
+        returning its key
+        """
+        if key is None:
+            key = self.next_key
+        if key in self.items:
+            self._discard(key)
+        if isinstance(key, int) and key >= self.next_key:
+            self.next_key = key + 1
+        x, y, w, h = rect
+        self._add(key, x, y, w, h)
+        return key
+
+    def remove(self, key):
+        self._discard(key)
+
+    def update(self, key, rect):
+        """
+        Move a rect that’s already in the index
+        """
+        x, y, w, h = rect
+        span = self._span(x, y, w, h)
+        if self.items[key][4] == span:
+            self.items[key] = (x, y, w, h, span)
+        else:
+            self._discard(key)
+            self._add(key, x, y, w, h)
+
+    def update_all(self, rects):
+        """
+        Move every rect at once, i.e. to this frame’s layout of the same
+        rects the index was built from (keys being positions in `rects`)
+        """
+        if isinstance(rects, RectArray):
+            rects = rects.array.tolist()
+        for key, rect in enumerate(rects):
+            self.update(key, rect)
+
+    def _candidates(self, c0, r0, c1, r1):
+        cells = self.cells
+        if (c1 - c0 + 1) * (r1 - r0 + 1) > len(cells):
+            # a region bigger than the index, so go by what’s there instead
+            return set().union(*(keys for (c, r), keys in cells.items()
+                if c0 <= c <= c1 and r0 <= r <= r1))
+        found = set()
+        for c in range(c0, c1 + 1):
+            for r in range(r0, r1 + 1):
+                keys = cells.get((c, r))
+                if keys:
+                    found.update(keys)
+        return found
+
+    def query(self, rect):
+        """
+        The keys of the rects that intersect `rect` (see `Rect.intersects`),
+        in key order (when the keys are sortable)
+        """
+        qx, qy, qw, qh = rect
+        items = self.items
+        hits = []
+        for key in self._candidates(*self._span(qx, qy, qw, qh)):
+            x, y, w, h, _ = items[key]
+            if x < qx + qw and qx < x + w and y < qy + qh and qy < y + h:
+                hits.append(key)
+        return _sorted(hits)
+
+    def at(self, point):
+        """
+        The keys of the rects that contain `point` (see `Rect.contains`)
+        """
+        px, py = point
+        items = self.items
+        hits = []
+        for key in self.cells.get((math.floor(px / self.cw), math.floor(py / self.ch)), ()):
+            x, y, w, h, _ = items[key]
+            if x <= px < x + w and y <= py < y + h:
+                hits.append(key)
+        return _sorted(hits)
+
+    def nearest(self, point, count=1):
+        """
+        The key of the rect nearest to `point` (by the distance to its
+        nearest edge, so 0 for any rect the point’s inside), or None if the
+        index is empty — or, with a `count`, a list of the `count` nearest
+        keys, nearest first
+        """
+        found = self._nearest(point, count)
+        if count == 1:
+            return found[0] if found else None
+        return found
+
+    def _nearest(self, point, count):
+        if not self.items or count < 1:
+            return []
+        px, py = point
+        pc, pr = math.floor(px / self.cw), math.floor(py / self.ch)
+        if self.extent is None:
+            cs = [c for c, r in self.cells]
+            rs = [r for c, r in self.cells]
+            self.extent = (min(cs), max(cs), min(rs), max(rs))
+        c0, c1, r0, r1 = self.extent
+        # rings of cells around the point’s cell, outwards (skipping those
+        # that can’t hold anything), until nothing outside the rings could
+        # be any nearer than what’s been found
+        ring = max(c0 - pc, pc - c1, r0 - pr, pr - r1, 0)
+        cw, ch = self.cw, self.ch
+        ex0, ey0, ex1, ey1 = c0 * cw, r0 * ch, (c1 + 1) * cw, (r1 + 1) * ch
+        items, cells = self.items, self.cells
+        seen, best = set(), []
+        while True:
+            for c in range(max(pc - ring, c0), min(pc + ring, c1) + 1):
+                edge = c == pc - ring or c == pc + ring
+                for r in (range(max(pr - ring, r0), min(pr + ring, r1) + 1) if edge else (pr - ring, pr + ring)):
+                    for key in cells.get((c, r), ()):
+                        if key not in seen:
+                            seen.add(key)
+                            x, y, w, h, _ = items[key]
+                            best.append((_distance(px, py, x, y, w, h), len(seen), key))
+            # what’s left to search is the part of the index outside the
+            # rings so far, i.e. up to four slabs of it
+            bx0, by0, bx1, by1 = (pc - ring) * cw, (pr - ring) * ch, (pc + ring + 1) * cw, (pr + ring + 1) * ch
+            slabs = [s for s in [(ex0, ey0, bx0 - ex0, ey1 - ey0), (bx1, ey0, ex1 - bx1, ey1 - ey0),
+                (ex0, ey0, ex1 - ex0, by0 - ey0), (ex0, by1, ex1 - ex0, ey1 - by1)] if s[2] > 0 and s[3] > 0]
+            if not slabs:
+                break
+            if len(best) >= count:
+                best.sort()
+                del best[count:]
+                if best[-1][0] <= min(_distance(px, py, *s) for s in slabs):
+                    break
+            ring += 1
+        best.sort()
+        return [key for _, _, key in best[:count]]
+
+
+def _sorted(keys):
+    try:
+        return sorted(keys)
+    except TypeError:
+        return keys
+
 
 if __name__ == "__main__":
     print(Rect([50, 50, 500, 500]).flip(Rect([0, 0, 1000, 1000])))
\ No newline at end of file
@@ -0,0 +1,335 @@
+"""
+Layout as a tree of `Box`es, instead of a chain of `divide`s: each box has a
+size (along its parent’s edge) and can be split, from one of its own edges,
+into child boxes — so
+
+```
+left, rest = page.divide(200, "minx")
+_, rest = rest.divide(20, "minx", forcePixel=True)
+middle, right = rest.divide(0.5, "minx")
+```
+
+is
+
+```
+layout = Box(edge="minx", leading=[20, 0], children=[
+    Box(200, name="left"),
+    Box(0.5, name="middle"),
+    Box(name="right")])
+layout.solve(page)["middle"]
+```
+
+and gets exactly the same rects (a single `leading` goes between every
+pair of children, so `leading=20` would put 20 between middle & right as
+well, where the chain has none). Sizes work as they do with `divide` — a
+number of pixels, or (if less than 1) a percentage of whatever the boxes
+before it (flexible ones aside) and the leadings have left — or, with no
+size, a box is flexible, and shares what’s left over after all that with any
+other flexible boxes (by `flex`, so `Box(flex=2)` gets twice as much as
+`Box()`)
+
+Solved rects are kept on the boxes, so solving again (i.e. on the next frame)
+only re-solves the boxes that changed (a box’s `size`, `flex`, `edge`,
+`leading` or `children` were set) or that are in a rect that changed, along
+with everything inside them
+"""
+from furniture import geometry
+from furniture.geometry import Rect, Edge, txt_to_edge, _rect, _perc_to_pix
+
+_MAXY, _MAXX, _MINY, _MINX, _CENTERY, _CENTERX = Edge.MaxY, Edge.MaxX, Edge.MinY, Edge.MinX, Edge.CenterY, Edge.CenterX
+
+
+class Box():
+    """
+    A node in a layout tree: `size` is how much of its parent it takes up
+    (pixels, a percentage, or None for flexible), `edge` is where its
+    `children` are laid out from (like `divide`, so `Edge.MaxY` is top-down;
+    with a center edge, the children are centered, as a block, and can’t be
+    flexible), and `leading` is the space between them, in pixels — a
+    single number, or one per gap
+    """
+    def __init__(self, size=None, edge=Edge.MinX, children=None, leading=0, flex=1, name=None):
+        self.name = name
+        self.parent = None
+        self.rect = None
+        self._size = size
+        self._flex = flex
+        self._edge = txt_to_edge(edge)
+        self._leading = leading
+        self._children = []
+        self._solved = None # the rect this box’s children were last solved in
+        self._changed = True # this box’s children need to be re-solved
+        self._stale = True # something inside this box needs to be re-solved
+        self._names = None
+        self.children = children or []
+
+    def __repr__(self):
+        return "<furn-Box{} {}>".format(" " + self.name if self.name else "", self.rect)
+
+    def _invalidate(self):
+        # this box’s own split is out of date, and so is every box around it
+        self._changed = True
+        box = self
+        while box is not None and not box._stale:
+            box._stale = True
+            box = box.parent
+
+    def _invalidate_parent(self):
+        if self.parent is not None:
+            self.parent._invalidate()
+
+    @property
+    def size(self):
+        return self._size
+
+    @size.setter
+    def size(self, value):
+        if value != self._size:
+            self._size = value
+            self._invalidate_parent()
+
+    @property
+    def flex(self):
+        return self._flex
+
+    @flex.setter
+    def flex(self, value):
+        if value != self._flex:
+            self._flex = value
+            self._invalidate_parent()
+
+    @property
+    def edge(self):
+        return self._edge
+
+    @edge.setter
+    def edge(self, value):
+        value = txt_to_edge(value)
+        if value is not self._edge:
+            self._edge = value
+            self._invalidate()
+
+    @property
+    def leading(self):
+        return self._leading
+
+    @leading.setter
+    def leading(self, value):
+        if value != self._leading:
+            self._leading = value
+            self._invalidate()
+
+    @property
+    def children(self):
+        return tuple(self._children)
+
+    @children.setter
+    def children(self, children):
+        for child in self._children:
+            child.parent = None
+        self._children = list(children)
+        for child in self._children:
+            child.parent = self
+        self._forget_names()
+        self._invalidate()
+
+    def append(self, child):
+        child.parent = self
+        self._children.append(child)
+        self._forget_names()
+        self._invalidate()
+        return child
+
+    def remove(self, child):
+        self._children.remove(child)
+        child.parent = None
+        self._forget_names()
+        self._invalidate()
+
+    def _forget_names(self):
+        box = self
+        while box is not None:
+            box._names = None
+            box = box.parent
+
+    def walk(self):
+        """
+        This box and every box inside it, depth-first
+        """
+        yield self
+        for child in self._children:
+            yield from child.walk()
+
+    def find(self, name):
+        """
+        The (first) box in this tree with the given name
+        """
+        if self._names is None:
+            self._names = {}
+            for box in self.walk():
+                if box.name is not None:
+                    self._names.setdefault(box.name, box)
+        return self._names[name]
+
+    def __getitem__(self, name):
+        return self.find(name).rect
+
+    def rects(self):
+        """
+        The solved rect of every named box, by name
+        """
+        return {box.name: box.rect for box in self.walk() if box.name is not None}
+
+    def solve(self, rect):
+        """
+        Lay this tree out in `rect` (anything x, y, w, h), returning this
+        box, now with a `.rect` on every box in it
+        """
+        x, y, w, h = rect
+        self._solve(x, y, w, h)
+        return self
+
+    def _solve(self, x, y, w, h):
+        solved = (x, y, w, h)
+        if solved != self._solved:
+            self._solved = solved
+            self.rect = _rect(x, y, w, h)
+        elif not self._stale:
+            return
+        elif not self._changed:
+            # only something further in has changed
+            for child in self._children:
+                child._solve(*child._solved)
+            self._stale = False
+            return
+        if self._children:
+            for child, r in zip(self._children, self._split(x, y, w, h)):
+                child._solve(*r)
+        self._changed = False
+        self._stale = False
+
+    def _split(self, x, y, w, h):
+        children = self._children
+        if not children:
+            return []
+        edge = self._edge
+        leading = self._leading
+        n = len(children)
+        leadings = list(leading)[:n - 1] if hasattr(leading, "__iter__") else [leading] * (n - 1)
+        leadings += [0] * (n - 1 - len(leadings))
+        vertical = edge is _MINY or edge is _MAXY or edge is _CENTERY
+        o, d = (y, h) if vertical else (x, w)
+
+        if edge is _CENTERX or edge is _CENTERY:
+            spans = self._center(o, d, leadings)
+        else:
+            spans = self._spans(o, d, leadings)
+
+        if vertical:
+            return [(x, p, w, s) for p, s in spans]
+        else:
+            return [(p, y, s, h) for p, s in spans]
+
+    def _amounts(self, d, leadings):
+        # the size of every child, as the equivalent `divide` chain would
+        # have it (flexible children being whatever’s left at the end)
+        children = self._children
+        amounts = [None] * len(children)
+        flexible = []
+        r = d
+        for k, child in enumerate(children):
+            if child._size is None:
+                flexible.append(k)
+            else:
+                a = _perc_to_pix(r, r, child._size, self._edge)
+                amounts[k] = a
+                r = r - a
+            if k < len(leadings):
+                r = r - leadings[k]
+        if flexible:
+            total = sum(children[k]._flex for k in flexible)
+            for k in flexible:
+                amounts[k] = r * children[k]._flex / total
+        return amounts, flexible
+
+    def _spans(self, o, d, leadings):
+        edge = self._edge
+        minyismaxy = geometry.MINYISMAXY
+        forward = edge is _MINX or (edge is _MINY and not minyismaxy) or (edge is _MAXY and minyismaxy)
+        # usually it’s just a `divide` chain (with, at most, a flexible box
+        # at the end), which is worked out in a single pass
+        children = self._children
+        last = len(children) - 1
+        spans = []
+        p, r = o, d
+        for k, child in enumerate(children):
+            size = child._size
+            if size is None:
+                if k < last:
+                    return self._shared(o, d, leadings, forward)
+                spans.append((p if forward else o, r))
+                break
+            a = size if size >= 1.0 else r + size if size < 0 else r * size
+            if forward:
+                spans.append((p, a))
+                p = p + a
+            else:
+                spans.append((o + r - a, a))
+            r = r - a
+            if k < last:
+                gap = leadings[k]
+                if forward:
+                    p = p + gap
+                r = r - gap
+        return spans
+
+    def _shared(self, o, d, leadings, forward):
+        # flexible boxes before the end share what the others leave, so
+        # every other box’s size is needed first
+        amounts, flexible = self._amounts(d, leadings)
+        last = len(amounts) - 1
+        spans = []
+        p, r = o, d
+        for k, a in enumerate(amounts):
+            if k == last and flexible and flexible[-1] == last:
+                # the remainder, as the end of a `divide` chain
+                spans.append((p if forward else o, r))
+                break
+            if forward:
+                spans.append((p, a))
+                p = p + a
+            else:
+                spans.append((o + r - a, a))
+            r = r - a
+            if k < last:
+                gap = leadings[k]
+                if forward:
+                    p = p + gap
+                r = r - gap
+        return spans
+
+    def _center(self, o, d, leadings):
+        if any(child._size is None for child in self._children):
+            raise ValueError("children of a box with a center edge can’t be flexible")
+        amounts = [_perc_to_pix(d, d, child._size, self._edge) for child in self._children]
+        total = sum(amounts) + sum(leadings)
+        p = o + (d - total) / 2
+        spans = []
+        for k, a in enumerate(amounts):
+            spans.append((p, a))
+            p = p + a
+            if k < len(leadings):
+                p = p + leadings[k]
+        return spans
+
+
+if __name__ == "__main__":
+    page = Rect((0, 0, 1000, 500))
+    layout = Box(edge="maxy", children=[
+        Box(50, name="header"),
+        Box(edge="minx", leading=10, children=[
+            Box(200, name="sidebar"),
+            Box(name="body")])])
+    print(layout.solve(page).rects())
+    layout.find("sidebar").size = 300
+    print(layout.solve(page).rects())
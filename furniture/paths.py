@@ -0,0 +1,326 @@
+"""
+Paths kept in flat typed arrays — a byte per segment, a point count per
+segment, and every point’s coordinates in one `array("d")` — rather than as
+drawBot’s `BezierPath` (or a list of lists), so many frames’ worth of them
+can be held in memory cheaply, transformed & measured in bulk (with numpy,
+when it’s installed), and sent between processes as bytes
+
+An `ArrayPath` is a pen, and can be drawn to any other pen, so it can be used
+wherever a `BezierPath` is drawn into or out of, i.e. as `frame.bps[layer].bp`
+with `Animation(..., compactPaths=True)`
+"""
+import sys
+import math
+import struct
+from array import array
+
+# segment codes, as in `furniture.backend._SEGMENTS`, plus "o" for a
+# qCurveTo of only off-curve points (that ends with None)
+_NAMES = {ord("m"): "moveTo", ord("l"): "lineTo", ord("c"): "curveTo", ord("q"): "qCurveTo",
+    ord("z"): "closePath", ord("e"): "endPath"}
+_M, _L, _C, _Q, _Z, _E, _O = (ord(c) for c in "mlcqzeo")
+_KAPPA = 4 * (math.sqrt(2) - 1) / 3
+_MAGIC = b"fpth"
+_HEADER = struct.Struct("<4sII")
+
+
+def _numpy():
+    try:
+        import numpy
+        return numpy
+    except ImportError:
+        return None
+
+
+def _little(values):
+    # the array’s bytes, little-endian
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class ArrayPath():
+    """
+    A path as flat arrays: `codes` (a byte per segment, see `_NAMES`),
+    `counts` (the number of points in each segment) and `coords` (x, y, x,
+    y, ...) — that’s drawn into like a pen (or like a `BezierPath`, with
+    `rect`, `oval` & `text`), drawn out of with `drawToPen`, and can be
+    `transform`ed (in place, like a `BezierPath`), measured (`bounds`) and
+    turned into bytes (`tobytes`, `ArrayPath.frombytes`, and pickling);
+    given a `glyphSet` (like a fontTools pen), components drawn into it are
+    decomposed from that
+    """
+    __slots__ = ("codes", "counts", "coords", "glyphSet")
+
+    def __init__(self, codes=b"", counts=(), coords=(), glyphSet=None):
+        self.codes = bytearray(codes)
+        self.counts = array("H", counts)
+        self.coords = array("d", coords)
+        self.glyphSet = glyphSet
+
+    def __repr__(self):
+        return "<furniture.ArrayPath {} segments, {} points>".format(len(self.codes), len(self.coords) // 2)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __eq__(self, other):
+        return (isinstance(other, ArrayPath) and self.codes == other.codes
+            and self.counts == other.counts and self.coords == other.coords)
+
+    def nbytes(self):
+        return len(self.codes) + self.counts.itemsize * len(self.counts) + self.coords.itemsize * len(self.coords)
+
+    def copy(self):
+        path = self.__class__.__new__(self.__class__)
+        ArrayPath.__init__(path, self.codes, self.counts, self.coords, self.glyphSet)
+        return path
+
+    # the pen protocol
+
+    def _add(self, code, pts):
+        self.codes.append(code)
+        self.counts.append(len(pts))
+        for pt in pts:
+            self.coords.extend(pt)
+
+    def moveTo(self, pt):
+        self.codes.append(_M)
+        self.counts.append(1)
+        self.coords.extend(pt)
+
+    def lineTo(self, pt):
+        self.codes.append(_L)
+        self.counts.append(1)
+        self.coords.extend(pt)
+
+    def curveTo(self, *pts):
+        self.codes.append(_C)
+        self.counts.append(len(pts))
+        coords = self.coords
+        for pt in pts:
+            coords.extend(pt)
+
+    def qCurveTo(self, *pts):
+        if pts and pts[-1] is None:
+            self._add(_O, pts[:-1])
+        else:
+            self._add(_Q, pts)
+
+    def closePath(self):
+        self._add(_Z, ())
+
+    def endPath(self):
+        self._add(_E, ())
+
+    def addComponent(self, glyphName, transformation):
+        # only contours are kept, so a component is drawn in as its glyph’s
+        # contours (transformed), if there’s a glyph set to find it in
+        if self.glyphSet is None:
+            from furniture.backend import BackendError
+            raise BackendError("Components can only be drawn to an ArrayPath with a glyphSet to decompose them from, i.e. ArrayPath(glyphSet=ttfont.getGlyphSet())")
+        from fontTools.pens.transformPen import TransformPen
+        self.glyphSet[glyphName].draw(TransformPen(self, transformation))
+
+    def drawToPen(self, pen, transform=None):
+        """
+        Draw to another pen — with the points transformed by an affine
+        `transform`, (xx, xy, yx, yy, dx, dy), if there is one
+        """
+        coords = self.coords
+        xs, ys = coords[0::2], coords[1::2]
+        if transform is None:
+            pts = list(zip(xs, ys))
+        else:
+            xx, xy, yx, yy, dx, dy = transform
+            pts = [(xx * x + yx * y + dx, xy * x + yy * y + dy) for x, y in zip(xs, ys)]
+        calls = {code: getattr(pen, name) for code, name in _NAMES.items()}
+        k = 0
+        for code, n in zip(self.codes, self.counts):
+            if code == _O:
+                pen.qCurveTo(*pts[k:k + n], None)
+            else:
+                calls[code](*pts[k:k + n])
+            k += n
+
+    def appendPath(self, other):
+        """
+        Add the segments of another `ArrayPath` (or, slower, any path)
+        """
+        if isinstance(other, ArrayPath):
+            self.codes.extend(other.codes)
+            self.counts.extend(other.counts)
+            self.coords.extend(other.coords)
+        else:
+            other.drawToPen(self)
+
+    @property
+    def segments(self):
+        """
+        The segments as `[code, x, y, ...]` lists, like a headless backend’s
+        `RecordingPath` (so an `ArrayPath` can be drawn by any backend)
+        """
+        coords = self.coords
+        segments = []
+        k = 0
+        for code, n in zip(self.codes, self.counts):
+            segments.append(["q" if code == _O else chr(code), *coords[k:k + 2 * n]])
+            k += 2 * n
+        return segments
+
+    # drawBot-style drawing
+
+    def rect(self, x, y, w, h):
+        self.moveTo((x, y))
+        self.lineTo((x + w, y))
+        self.lineTo((x + w, y + h))
+        self.lineTo((x, y + h))
+        self.closePath()
+
+    def oval(self, x, y, w, h):
+        rx, ry = w / 2, h / 2
+        cx, cy = x + rx, y + ry
+        kx, ky = rx * _KAPPA, ry * _KAPPA
+        self.moveTo((cx, y))
+        self.curveTo((cx + kx, y), (x + w, cy - ky), (x + w, cy))
+        self.curveTo((x + w, cy + ky), (cx + kx, y + h), (cx, y + h))
+        self.curveTo((cx - kx, y + h), (x, cy + ky), (x, cy))
+        self.curveTo((x, cy - ky), (cx - kx, y), (cx, y))
+        self.closePath()
+
+    def text(self, txt, offset=(0, 0), font=None, fontSize=10):
+        """
+        Some text, either a drawBot `FormattedString`, or a string in a
+        `font` at a `fontSize` (shaped through `furniture.textcache`)
+        """
+        if isinstance(txt, str):
+            from furniture.textcache import cache
+            cache.draw(self, txt, font, fontSize, offset or (0, 0))
+        else:
+            import drawBot
+            bp = drawBot.BezierPath()
+            bp.text(txt, offset)
+            bp.drawToPen(self)
+
+    # transforming, in place (& vectorized, with numpy)
+
+    def transform(self, matrix, center=(0, 0)):
+        """
+        Transform every point by an affine `matrix`, (xx, xy, yx, yy, dx,
+        dy), around `center`
+        """
+        xx, xy, yx, yy, dx, dy = matrix
+        cx, cy = center
+        if cx or cy:
+            # translate to the center, transform, and translate back
+            dx, dy = dx + cx - (xx * cx + yx * cy), dy + cy - (xy * cx + yy * cy)
+        np = _numpy()
+        if np is not None and self.coords:
+            pts = np.frombuffer(self.coords, dtype=float).reshape(-1, 2)
+            x, y = pts[:, 0].copy(), pts[:, 1].copy()
+            pts[:, 0] = xx * x + yx * y + dx
+            pts[:, 1] = xy * x + yy * y + dy
+            del pts # so the array can be resized again
+        else:
+            c = self.coords
+            xs, ys = c[0::2], c[1::2]
+            c[0::2] = array("d", [xx * x + yx * y + dx for x, y in zip(xs, ys)])
+            c[1::2] = array("d", [xy * x + yy * y + dy for x, y in zip(xs, ys)])
+
+    def translate(self, x=0, y=0):
+        self.transform((1, 0, 0, 1, x, y))
+
+    def scale(self, x=1, y=None, center=(0, 0)):
+        self.transform((x, 0, 0, x if y is None else y, 0, 0), center)
+
+    def rotate(self, angle, center=(0, 0)):
+        a = math.radians(angle)
+        c, s = math.cos(a), math.sin(a)
+        self.transform((c, s, -s, c, 0, 0), center)
+
+    # measuring
+
+    def controlPointBounds(self):
+        """
+        (xMin, yMin, xMax, yMax) of every point, on- or off-curve, or None
+        if there aren’t any
+        """
+        c = self.coords
+        if not c:
+            return None
+        np = _numpy()
+        if np is not None:
+            pts = np.frombuffer(c, dtype=float).reshape(-1, 2)
+            (x0, y0), (x1, y1) = pts.min(axis=0).tolist(), pts.max(axis=0).tolist()
+            del pts
+            return x0, y0, x1, y1
+        xs, ys = c[0::2], c[1::2]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    def bounds(self):
+        """
+        (xMin, yMin, xMax, yMax) of the path itself, or None if it’s empty
+        — which is `controlPointBounds` unless a curve bulges beyond its
+        on-curve points, in which case it’s worked out exactly, by fontTools
+        """
+        cpb = self.controlPointBounds()
+        if cpb is None or all(code in (_M, _L, _Z, _E) for code in set(self.codes)):
+            return cpb
+        # the last point of each segment is on-curve (but not for "o"s)
+        ends, k = [], -1
+        for code, n in zip(self.codes, self.counts):
+            k += n
+            if n and code != _O:
+                ends.append(k)
+        c = self.coords
+        xs, ys = [c[2 * k] for k in ends], [c[2 * k + 1] for k in ends]
+        if ends and (min(xs), min(ys), max(xs), max(ys)) == cpb:
+            return cpb
+        from fontTools.pens.boundsPen import BoundsPen
+        pen = BoundsPen(None)
+        self.drawToPen(pen)
+        return pen.bounds
+
+    # bytes
+
+    def tobytes(self):
+        return (_HEADER.pack(_MAGIC, len(self.codes), len(self.coords))
+            + bytes(self.codes) + _little(self.counts) + _little(self.coords))
+
+    @classmethod
+    def frombytes(cls, data):
+        magic, n, m = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not an ArrayPath")
+        k = _HEADER.size
+        path = cls()
+        path.codes = bytearray(data[k:k + n])
+        k += n
+        path.counts.frombytes(data[k:k + 2 * n])
+        k += 2 * n
+        path.coords.frombytes(data[k:k + 8 * m])
+        if sys.byteorder == "big":
+            path.counts.byteswap()
+            path.coords.byteswap()
+        return path
+
+    def __reduce__(self):
+        return (self.__class__.frombytes, (self.tobytes(),))
+
+    @classmethod
+    def fromPath(cls, path):
+        """
+        Any path (anything with a `drawToPen`), as an `ArrayPath`
+        """
+        array_path = cls()
+        path.drawToPen(array_path)
+        return array_path
+
+
+if __name__ == "__main__":
+    p = ArrayPath()
+    p.rect(0, 0, 100, 100)
+    p.oval(50, 50, 100, 100)
+    p.rotate(45, center=(50, 50))
+    print(p, p.bounds(), p.controlPointBounds(), len(p.tobytes()), ArrayPath.frombytes(p.tobytes()) == p)
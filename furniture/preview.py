@@ -0,0 +1,259 @@
+"""
+Streaming frames to the viewer (`furniture/viewer.html`, by way of the relay
+in `furniture.viewer`) as they’re drawn, i.e. by `Animation.storyboard(...,
+preview=True)` or `furniture preview example.py -s 0:60`
+
+Consecutive frames are mostly the same, so each is sent as what changed
+since the last frame sent, either as
+
+- "ops": its `DisplayList`, minus the ops it shares with the last frame at
+  the start & the end (so a frame that only moves one thing sends only the
+  ops that draw that thing), for the viewer to draw itself — this needs a
+  recording backend (headless or raster)
+- "tiles": its pixels, as pngs of only the tiles that changed — this works
+  with any backend that has `pixels` (drawBot or raster), or by rasterizing
+  a headless page
+
+Every `keyframe`-th frame is sent whole, so a viewer that connects (or
+misses a frame) partway through catches up, and the viewer keeps every frame
+it’s been sent, so scrubbing back through them doesn’t re-render anything
+"""
+import json
+import struct
+from furniture import backend
+from furniture.backend import DisplayList
+from furniture.viewer import tag_frame, untag_frame
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def diff_ops(previous, ops):
+    """
+    How many ops `ops` shares with `previous` at its start (head) and its
+    end (tail) — everything in between is what changed
+    """
+    limit = min(len(previous), len(ops))
+    head = 0
+    while head < limit and previous[head] == ops[head]:
+        head += 1
+    tail = 0
+    while tail < limit - head and previous[-1 - tail] == ops[-1 - tail]:
+        tail += 1
+    return head, tail
+
+
+def patch_ops(previous, head, tail, ops):
+    """
+    The inverse of `diff_ops`, i.e. what the viewer does with an ops message
+    """
+    return previous[:head] + ops + previous[len(previous) - tail:]
+
+
+def dirty_tiles(previous, pixels, tile=64):
+    """
+    The (x, y, w, h) rects (top-left origin) of the `tile`-sized tiles that
+    differ between two (h, w) uint32 pixel arrays, with neighboring dirty
+    tiles in a row joined into one rect
+    """
+    h, w = pixels.shape
+    rows, cols = range(0, h, tile), range(0, w, tile)
+    if previous is None or previous.shape != pixels.shape:
+        grid = np.ones((len(rows), len(cols)), dtype=bool)
+    else:
+        changed = previous != pixels
+        grid = np.logical_or.reduceat(changed, np.arange(0, h, tile), axis=0)
+        grid = np.logical_or.reduceat(grid, np.arange(0, w, tile), axis=1)
+    rects = []
+    for r, c0, c1 in _runs(grid):
+        y, x = rows[r], cols[c0]
+        rects.append((x, y, min(c1 * tile, w) - x, min(y + tile, h) - y))
+    return rects
+
+
+def _runs(grid):
+    # (row, first, end) of each run of True in a 2d bool array
+    padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = grid
+    edges = np.diff(padded, axis=1)
+    starts, ends = np.nonzero(edges == 1), np.nonzero(edges == -1)
+    return zip(starts[0].tolist(), starts[1].tolist(), ends[1].tolist())
+
+
+def encode_tiles(header, pngs):
+    """
+    A tiles message: the length of its json header (4 bytes, big-endian),
+    the header, and then the pngs, one after the other
+    """
+    header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    return struct.pack(">I", len(header)) + header + b"".join(pngs)
+
+
+def decode_tiles(message):
+    """
+    A tiles message as its header and its pngs
+    """
+    size, = struct.unpack(">I", message[:4])
+    header = json.loads(message[4:4 + size].decode("utf-8"))
+    pngs, offset = [], 4 + size
+    for *_, length in header["tiles"]:
+        pngs.append(message[offset:offset + length])
+        offset += length
+    return header, pngs
+
+
+class PreviewStream():
+    """
+    Sends frames to a viewer, as they’re drawn
+
+    - `connection` is anything with a `send` (of str, for text messages, or
+    bytes, for binary ones), i.e. a `furniture.viewer.PreviewConnection`
+    - `mode` is "ops" or "tiles" (see above), or None, to pick "ops" if the
+    current backend records display lists, and "tiles" if it doesn’t
+    - `keyframe` is how often (in frames sent) a frame is sent whole
+    - `tile` is the size (in pixels) of the tiles pixels are diffed in
+    """
+    def __init__(self, connection, mode=None, keyframe=30, tile=64, level=1):
+        if mode is None:
+            mode = "ops" if hasattr(backend.current(), "page") else "tiles"
+        if mode not in ("ops", "tiles"):
+            raise ValueError("Unknown preview mode " + repr(mode) + ", must be ops or tiles")
+        if mode == "tiles" and np is None:
+            raise ImportError("numpy was not found, so frames can’t be previewed as tiles")
+        self.connection = connection
+        self.mode = mode
+        self.keyframe = keyframe
+        self.tile = tile
+        self.level = level
+        self.count = 0
+        self.last = None # (index, size, ops or pixels) of the last frame sent
+        self.canvas = None
+        self.bytes = 0
+
+    def send(self, i, page=None):
+        """
+        Send frame `i`, which is the current backend’s current page, unless
+        a `DisplayList` is given as `page`; returns the message sent
+        """
+        base = None
+        if self.last and self.count % self.keyframe:
+            base = self.last[0]
+        if self.mode == "ops":
+            message = self.ops_message(i, base, page or self.current_page())
+        else:
+            message = self.tiles_message(i, base, page)
+        self.connection.send(message)
+        self.count += 1
+        self.bytes += len(message)
+        return message
+
+    def current_page(self):
+        page = getattr(backend.current(), "page", None)
+        if page is None:
+            raise ValueError("Previewing display-list ops needs a recording backend "
+                "(headless or raster); with drawBot, preview tiles instead")
+        return page
+
+    def ops_message(self, i, base, page):
+        size = list(page.size)
+        ops = json.loads(json.dumps(page.ops))
+        if base is not None and self.last[1] == size:
+            head, tail = diff_ops(self.last[2], ops)
+        else:
+            base, head, tail = None, 0, 0
+        self.last = (i, size, ops)
+        return tag_frame(json.dumps(dict(type="ops", i=i, base=base, size=size,
+            head=head, tail=tail, ops=ops[head:len(ops) - tail]), separators=(",", ":")), base is None)
+
+    def pixels(self, page=None):
+        # the frame as a premultiplied (h, w, 4) uint8 array
+        from furniture.raster import rasterize
+
+        b = backend.current()
+        if page is None:
+            try:
+                data = b.pixels()
+                return np.frombuffer(data, dtype=np.uint8).reshape(int(b.height()), int(b.width()), 4)
+            except backend.BackendError:
+                page = self.current_page()
+        self.canvas = rasterize(page, canvas=self.canvas)
+        return self.canvas.buffer
+
+    def tiles_message(self, i, base, page):
+        from furniture.raster import encode_png, unpremultiply
+
+        rgba = self.pixels(page)
+        pixels = rgba.view(np.uint32).reshape(rgba.shape[:2])
+        h, w = pixels.shape
+        if base is not None and self.last[1] != [w, h]:
+            base = None
+        rects = dirty_tiles(None if base is None else self.last[2], pixels, self.tile)
+        pngs = [encode_png(unpremultiply(rgba[y:y + th, x:x + tw]), self.level, threads=1)
+            for x, y, tw, th in rects]
+        self.last = (i, [w, h], pixels.copy())
+        header = dict(type="tiles", i=i, base=base, size=[w, h],
+            tiles=[[*rect, len(png)] for rect, png in zip(rects, pngs)])
+        return tag_frame(encode_tiles(header, pngs), base is None)
+
+
+def _decode_png(data):
+    # only pngs from `furniture.raster.encode_png` (i.e. rgba, all rows
+    # sub-filtered), which is all a tiles message has in it
+    import zlib
+
+    w, h = struct.unpack(">II", data[16:24])
+    idat, offset = b"", 8
+    while offset < len(data):
+        length, = struct.unpack(">I", data[offset:offset + 4])
+        if data[offset + 4:offset + 8] == b"IDAT":
+            idat += data[offset + 8:offset + 8 + length]
+        offset += length + 12
+    rows = np.frombuffer(zlib.decompress(idat), dtype=np.uint8).reshape(h, w * 4 + 1)
+    return np.cumsum(rows[:, 1:].reshape(h, w, 4), axis=1, dtype=np.uint8)
+
+
+class FrameCache():
+    """
+    What the viewer does with a stream of previews, in python (i.e. for
+    checking a stream, or for a viewer of your own): every frame that can be
+    reconstructed is kept in `frames`, by index — as a `DisplayList` (for
+    ops) or a straight-alpha (h, w, 4) uint8 array (for tiles)
+    """
+    def __init__(self):
+        self.frames = {}
+
+    def receive(self, message):
+        """
+        Reconstruct a frame from a message, returning its index (or None,
+        if it’s a diff against a frame that isn’t here)
+        """
+        kind, message = untag_frame(message)
+        if kind is None:
+            if message == "CLEAR":
+                self.frames = {}
+            return None
+        if isinstance(message, str):
+            m = json.loads(message)
+            if m["base"] is None:
+                ops = m["ops"]
+            elif m["base"] in self.frames:
+                ops = patch_ops(self.frames[m["base"]].ops, m["head"], m["tail"], m["ops"])
+            else:
+                return None
+            self.frames[m["i"]] = DisplayList(m["size"], ops)
+            return m["i"]
+
+        header, pngs = decode_tiles(message)
+        w, h = header["size"]
+        if header["base"] is None:
+            image = np.zeros((h, w, 4), dtype=np.uint8)
+        elif header["base"] in self.frames:
+            image = self.frames[header["base"]].copy()
+        else:
+            return None
+        for (x, y, tw, th, _), png in zip(header["tiles"], pngs):
+            image[y:y + th, x:x + tw] = _decode_png(png)
+        self.frames[header["i"]] = image
+        return header["i"]
@@ -0,0 +1,604 @@
+"""
+A rasterizing backend, for getting pixels (i.e. png frames) without drawBot:
+pages are recorded as `DisplayList`s, like the headless backend, and then
+scanline-filled (with anti-aliasing) into a numpy RGBA buffer
+
+Only what furniture itself draws is supported — rects, ovals, polygons,
+lines, `BezierPath`s (i.e. `frame.bps`), fills, strokes, and transforms —
+and text, when its font is a font file, which is shaped (and cached) by
+`furniture.textcache`; text in any other font is skipped, since there’s
+nothing to find it with (so for a burn-in counter, use `burn="Font.ttf"`)
+"""
+import os
+import math
+import zlib
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from furniture.backend import RecordingBackend
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_IDENTITY = (1, 0, 0, 1, 0, 0)
+
+# bezier circle approximation
+_KAPPA = 4 * (math.sqrt(2) - 1) / 3
+
+
+def _multiply(t1, t2):
+    # t1 applied after t2, as (xx, xy, yx, yy, dx, dy)
+    a1, b1, c1, d1, e1, f1 = t1
+    a2, b2, c2, d2, e2, f2 = t2
+    return (a2*a1 + b2*c1, a2*b1 + b2*d1,
+            c2*a1 + d2*c1, c2*b1 + d2*d1,
+            e2*a1 + f2*c1 + e1, e2*b1 + f2*d1 + f1)
+
+
+def _color(args):
+    # drawBot’s fill/stroke arguments: None, gray, gray+alpha, rgb, or rgba
+    if not args or args[0] is None:
+        return None
+    if len(args) == 1 and isinstance(args[0], (tuple, list)):
+        args = args[0]
+    if len(args) == 1:
+        return (args[0], args[0], args[0], 1)
+    if len(args) == 2:
+        return (args[0], args[0], args[0], args[1])
+    if len(args) == 3:
+        return (args[0], args[1], args[2], 1)
+    return tuple(args[:4])
+
+
+# curves flattened into at most this many lines are cheaper to do in plain
+# python than with numpy (i.e. text, at most sizes)
+_SMALL = 16
+
+
+def _flatten_cubic(p0, p1, p2, p3, tolerance):
+    dd = max(math.hypot(p0[0] - 2*p1[0] + p2[0], p0[1] - 2*p1[1] + p2[1]),
+        math.hypot(p1[0] - 2*p2[0] + p3[0], p1[1] - 2*p2[1] + p3[1]))
+    n = max(1, int(math.ceil(math.sqrt(0.75 * dd / tolerance))))
+    if n <= _SMALL:
+        pts = []
+        for k in range(1, n + 1):
+            t = k / n
+            mt = 1 - t
+            a, b, c, d = mt*mt*mt, 3*mt*mt*t, 3*mt*t*t, t*t*t
+            pts.append((a*p0[0] + b*p1[0] + c*p2[0] + d*p3[0], a*p0[1] + b*p1[1] + c*p2[1] + d*p3[1]))
+        return pts
+    t = np.arange(1, n + 1) / n
+    mt = 1 - t
+    a, b, c, d = mt*mt*mt, 3*mt*mt*t, 3*mt*t*t, t*t*t
+    xs = a*p0[0] + b*p1[0] + c*p2[0] + d*p3[0]
+    ys = a*p0[1] + b*p1[1] + c*p2[1] + d*p3[1]
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def _flatten_quadratic(p0, p1, p2, tolerance):
+    dd = math.hypot(p0[0] - 2*p1[0] + p2[0], p0[1] - 2*p1[1] + p2[1])
+    n = max(1, int(math.ceil(math.sqrt(0.5 * dd / tolerance))))
+    if n <= _SMALL:
+        pts = []
+        for k in range(1, n + 1):
+            t = k / n
+            mt = 1 - t
+            a, b, c = mt*mt, 2*mt*t, t*t
+            pts.append((a*p0[0] + b*p1[0] + c*p2[0], a*p0[1] + b*p1[1] + c*p2[1]))
+        return pts
+    t = np.arange(1, n + 1) / n
+    mt = 1 - t
+    a, b, c = mt*mt, 2*mt*t, t*t
+    xs = a*p0[0] + b*p1[0] + c*p2[0]
+    ys = a*p0[1] + b*p1[1] + c*p2[1]
+    return list(zip(xs.tolist(), ys.tolist()))
+
+
+def flatten(segments, transform=_IDENTITY, tolerance=0.1):
+    """
+    `RecordingPath` segments as a list of closed polygons (lists of points),
+    transformed, with curves flattened to within `tolerance` units of the
+    transformed outline
+    """
+    xx, xy, yx, yy, dx, dy = transform
+
+    def tr(x, y):
+        return (x*xx + y*yx + dx, x*xy + y*yy + dy)
+
+    polygons = []
+    current = None
+    for code, *vs in segments:
+        pts = [tr(vs[k], vs[k + 1]) for k in range(0, len(vs), 2)]
+        if code == "m":
+            current = [pts[0]]
+            polygons.append(current)
+        elif code == "o":
+            # a whole contour of off-curve points, with implied on-curve
+            # points between every pair of them, all the way round
+            n = len(pts)
+            mids = [((pts[k][0] + pts[(k + 1) % n][0]) / 2, (pts[k][1] + pts[(k + 1) % n][1]) / 2) for k in range(n)]
+            polygon = [mids[-1]]
+            for k in range(n):
+                polygon.extend(_flatten_quadratic(mids[k - 1], pts[k], mids[k], tolerance))
+            polygons.append(polygon)
+            current = None
+        elif current is None:
+            continue
+        elif code == "l":
+            current.append(pts[0])
+        elif code == "c":
+            current.extend(_flatten_cubic(current[-1], *pts, tolerance))
+        elif code == "q":
+            # truetype-style, with implied on-curve points between off-curves
+            start = current[-1]
+            for k in range(len(pts) - 2):
+                mid = ((pts[k][0] + pts[k + 1][0]) / 2, (pts[k][1] + pts[k + 1][1]) / 2)
+                current.extend(_flatten_quadratic(start, pts[k], mid, tolerance))
+                start = mid
+            if len(pts) >= 2:
+                current.extend(_flatten_quadratic(start, pts[-2], pts[-1], tolerance))
+            elif pts:
+                current.append(pts[-1])
+        elif code in ("z", "e"):
+            current = None
+    return [p for p in polygons if len(p) > 2]
+
+
+def _stroke_polygons(polygons, width, closed=True):
+    # each segment as a quad, all wound the same way, so they union under
+    # the nonzero rule (joins are left as-is, i.e. no miters)
+    quads = []
+    hw = width / 2
+    for poly in polygons:
+        pts = poly + [poly[0]] if closed else poly
+        for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+            length = math.hypot(x1 - x0, y1 - y0)
+            if length == 0:
+                continue
+            nx, ny = -(y1 - y0) / length * hw, (x1 - x0) / length * hw
+            quads.append([(x0 - nx, y0 - ny), (x1 - nx, y1 - ny), (x1 + nx, y1 + ny), (x0 + nx, y0 + ny)])
+    return quads
+
+
+def _rect_segments(x, y, w, h):
+    return [["m", x, y], ["l", x + w, y], ["l", x + w, y + h], ["l", x, y + h], ["z"]]
+
+
+def _oval_segments(x, y, w, h):
+    rx, ry = w / 2, h / 2
+    cx, cy = x + rx, y + ry
+    kx, ky = rx * _KAPPA, ry * _KAPPA
+    return [["m", cx, y],
+        ["c", cx + kx, y, x + w, cy - ky, x + w, cy],
+        ["c", x + w, cy + ky, cx + kx, y + h, cx, y + h],
+        ["c", cx - kx, y + h, x, cy + ky, x, cy],
+        ["c", x, cy - ky, cx - kx, y, cx, y],
+        ["z"]]
+
+
+_DARKEN = {}
+
+
+def _darkener(keep):
+    """
+    A table of every pair of 8-bit channels (as a uint16) times keep / 255,
+    rounded down exactly — so darkening pixels is one lookup per two channels
+    """
+    table = _DARKEN.get(keep)
+    if table is None:
+        v = np.arange(256, dtype=np.uint16) * keep
+        v += 1 + (v >> 8)
+        v >>= 8
+        pairs = np.arange(65536)
+        table = (v[pairs & 255] | (v[pairs >> 8] << 8)).astype(np.uint16)
+        if len(_DARKEN) > 64:
+            _DARKEN.clear()
+        _DARKEN[keep] = table
+    return table
+
+
+class Canvas():
+    """
+    A premultiplied 8-bit RGBA buffer (top row first), which polygons are
+    filled into with exact horizontal coverage and `samples` sub-scanlines
+    per pixel row
+
+    Coverage is kept sparse — as runs of pixels with the same coverage —
+    so the cost of a fill grows with the outline, not the area: fully
+    covered runs are stored (or blended) a row-slice at a time, and only
+    the anti-aliased edge pixels are blended one by one
+    """
+    def __init__(self, width, height, samples=4):
+        if np is None:
+            raise ImportError("numpy was not found, so pages can’t be rasterized")
+        self.width = int(round(width))
+        self.height = int(round(height))
+        self.samples = samples
+        self.buffer = np.zeros((self.height, self.width, 4), dtype=np.uint8)
+        self.pixels = self.buffer.view(np.uint32).reshape(self.height, self.width)
+        self.pairs = self.buffer.view(np.uint16).reshape(self.height, self.width * 2)
+
+    def _darken(self, r0, r1, c0, c1, table, packed):
+        # a block of pixels times keep / 255 (see `_darkener`), plus a color
+        block = self.pairs[r0:r1, 2 * c0:2 * c1]
+        np.take(table, block, out=block, mode="clip")
+        self.pixels[r0:r1, c0:c1] += packed
+
+    def runs(self, polygons, evenOdd=False):
+        """
+        Coverage of `polygons` (in drawBot coordinates, i.e. y-up) as runs
+        of pixels, i.e. arrays of row, first column, last column + 1, and
+        coverage (0-1), with zero-coverage runs left out — or None if the
+        polygons don’t touch the canvas
+        """
+        S, W, H = self.samples, self.width, self.height
+        pts = [np.asarray(p, dtype=np.float64) for p in polygons]
+        if not pts:
+            return None
+        start = np.concatenate(pts)
+        end = np.concatenate([np.roll(p, -1, axis=0) for p in pts])
+        x0, y0 = start[:, 0], H - start[:, 1]
+        x1, y1 = end[:, 0], H - end[:, 1]
+
+        sloped = y0 != y1
+        x0, y0, x1, y1 = x0[sloped], y0[sloped], x1[sloped], y1[sloped]
+        direction = np.where(y1 > y0, 1, -1)
+        ymin, ymax = np.minimum(y0, y1), np.maximum(y0, y1)
+
+        # the sub-scanlines (at y = (j + 0.5) / S) each edge crosses
+        lo = np.clip(np.ceil(ymin * S - 0.5), 0, H * S).astype(np.int64)
+        hi = np.clip(np.ceil(ymax * S - 0.5), 0, H * S).astype(np.int64)
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return None
+        edge = np.repeat(np.arange(len(counts)), counts)
+        j = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + lo[edge]
+        y = (j + 0.5) / S
+        x = x0[edge] + (y - y0[edge]) * (x1[edge] - x0[edge]) / (y1[edge] - y0[edge])
+
+        # every closed outline crosses a scanline a net-zero number of
+        # times, so a running sum of directions (sorted by scanline, then x)
+        # is the winding number to the right of each crossing
+        order = np.lexsort((x, j))
+        j, x = j[order], np.clip(x[order], 0, W)
+        winding = np.cumsum(direction[edge][order])
+        inside = (winding % 2 == 1) if evenOdd else (winding != 0)
+        inside[-1] = False
+        k = np.nonzero(inside)[0]
+        if len(k) == 0:
+            return None
+        row = j[k] // S
+        xa, xb = x[k], x[k + 1]
+
+        # each span, box-filtered, is a change in coverage at the pixels
+        # its ends fall in (and the ones after); summing the changes per
+        # row gives runs of constant coverage between them
+        ia, ib = np.floor(xa).astype(np.int64), np.floor(xb).astype(np.int64)
+        fa, fb = xa - ia, xb - ib
+        stride = W + 2
+        base = row * stride
+        w = 1 / S
+        keys = np.concatenate([base + ia, base + ia + 1, base + ib, base + ib + 1])
+        weights = np.concatenate([(1 - fa) * w, fa * w, (fb - 1) * w, -fb * w])
+        keys, inverse = np.unique(keys, return_inverse=True)
+        coverage = np.cumsum(np.bincount(inverse, weights))
+
+        rows, first = keys[:-1] // stride, keys[:-1] % stride
+        last = np.where(keys[1:] // stride == rows, keys[1:] % stride, W)
+        last = np.minimum(last, W)
+        coverage = np.clip(coverage[:-1], 0, 1)
+        keep = (coverage > 1 / 512) & (first < last)
+        return rows[keep], first[keep], last[keep], coverage[keep]
+
+    def fill(self, polygons, color, evenOdd=False):
+        runs = self.runs(polygons, evenOdd)
+        if runs is None or color is None or color[3] <= 0:
+            return
+        rows, first, last, coverage = runs
+        a = min(1, color[3])
+        premultiplied = np.array([min(1, max(0, v)) * a for v in color[:3]] + [a]) * 255
+
+        # fully covered runs: stored when opaque, otherwise blended as
+        # dst * (1 - a) (rounded down) + color, which can’t carry from one
+        # channel into the next, so the color can be added to whole pixels
+        packed = (premultiplied + 0.5).astype(np.uint8).view(np.uint32)[0]
+        full = coverage > 1 - 1 / 510
+        rs, fs, ls = rows[full], first[full], last[full]
+        if len(rs):
+            # (joining touching runs, split where a span edge changed nothing)
+            new = np.ones(len(rs), dtype=bool)
+            new[1:] = (rs[1:] != rs[:-1]) | (fs[1:] != ls[:-1])
+            ends = np.append(np.nonzero(new)[0][1:] - 1, len(rs) - 1)
+            rs, fs, ls = rs[new], fs[new], ls[ends]
+        keep = 255 - int(premultiplied[3] + 0.5)
+        if keep and len(rs) and len(np.unique(rs)) == len(rs):
+            # (at most) one run per row, i.e. a convex-ish shape, so blend
+            # it in bands of rows (small enough to stay in cache): the
+            # columns every row of a band covers in place, and the rest of
+            # the band around them masked back in
+            table = _darkener(keep)
+            r0, r1 = rs.min(), rs.max() + 1
+            c1 = ls.max()
+            starts, ends = np.full(r1 - r0, c1), np.full(r1 - r0, c1)
+            starts[rs - r0], ends[rs - r0] = fs, ls
+            for r in range(r0, r1, 16):
+                e = min(r + 16, r1)
+                s, t = starts[r - r0:e - r0], ends[r - r0:e - r0]
+                covered = t > s
+                if not covered.any():
+                    continue
+                outer0, outer1 = int(s[covered].min()), int(t[covered].max())
+                inner0, inner1 = int(s.max()), int(t.min())
+                if inner0 < inner1:
+                    self._darken(r, e, inner0, inner1, table, packed)
+                    sides = ((outer0, inner0), (inner1, outer1))
+                else:
+                    sides = ((outer0, outer1),)
+                for x0, x1 in sides:
+                    if x0 < x1:
+                        cols = np.arange(x0, x1)
+                        mask = (cols >= s[:, None]) & (cols < t[:, None])
+                        blended = np.take(table, self.pairs[r:e, 2 * x0:2 * x1]).view(np.uint32) + packed
+                        np.copyto(self.pixels[r:e, x0:x1], blended, where=mask)
+        elif keep:
+            table = _darkener(keep)
+            for r, f, l in zip(rs.tolist(), fs.tolist(), ls.tolist()):
+                self._darken(r, r + 1, f, l, table, packed)
+        elif len(rs):
+            # rows of the same run are stored as one block
+            new = np.ones(len(rs), dtype=bool)
+            new[1:] = (rs[1:] != rs[:-1] + 1) | (fs[1:] != fs[:-1]) | (ls[1:] != ls[:-1])
+            starts = np.nonzero(new)[0]
+            stops = np.append(starts[1:], len(rs))
+            for k0, k1 in zip(starts.tolist(), stops.tolist()):
+                self.pixels[rs[k0]:rs[k1 - 1] + 1, fs[k0]:ls[k0]] = packed
+
+        # the rest, i.e. anti-aliased edges, pixel by pixel
+        partial = ~full
+        if partial.any():
+            lengths = last[partial] - first[partial]
+            n = int(lengths.sum())
+            starts = rows[partial] * self.width + first[partial]
+            k = np.arange(n) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+            cov = np.repeat(coverage[partial] * a, lengths)[:, None]
+            flat = self.buffer.reshape(-1, 4)
+            dst = flat[k].astype(np.float64)
+            flat[k] = (dst * (1 - cov) + premultiplied / a * cov + 0.5).astype(np.uint8)
+
+    def rgba(self, premultiplied=True):
+        """
+        The buffer as an (h, w, 4) uint8 array, either as is (premultiplied,
+        like drawBot’s bitmaps), or with the color divided back out of any
+        translucent pixels (as png expects)
+        """
+        if premultiplied:
+            return self.buffer
+        return unpremultiply(self.buffer)
+
+    def png(self, level=1, threads=None):
+        return encode_png(self.rgba(premultiplied=False), level, threads)
+
+
+def unpremultiply(rgba):
+    """
+    A premultiplied (h, w, 4) uint8 array with the color divided back out
+    of any translucent pixels (or the array itself, if it’s all opaque)
+    """
+    alpha = rgba[..., 3]
+    if alpha.min() == 255:
+        return rgba
+    buf = rgba.astype(np.float32)
+    scale = 255 / np.maximum(alpha, 1)
+    for c in range(3):
+        buf[..., c] *= scale
+    np.minimum(buf, 255, out=buf)
+    buf += 0.5
+    return buf.astype(np.uint8)
+
+
+def _deflate(data, level, last):
+    # run-length matching only, which is all sub-filtered rows of flat color
+    # need, and much faster than a full search on noisy (i.e. photo) rows
+    c = zlib.compressobj(level, zlib.DEFLATED, -15, 8, zlib.Z_RLE)
+    return c.compress(data) + c.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def encode_png(rgba, level=1, threads=None):
+    """
+    An (h, w, 4) uint8 array as png bytes, with each row "sub"-filtered
+    (i.e. stored as the difference from the pixel to its left), which costs
+    one vectorized subtraction and compresses flat color much better
+
+    The pixel data is deflated in bands on `threads` threads (by default one
+    per cpu, since zlib doesn’t hold the GIL), each band ending on a byte
+    boundary so they join into one stream, as pigz does
+    """
+    h, w, _ = rgba.shape
+    rows = np.empty((h, w * 4 + 1), dtype=np.uint8)
+    rows[:, 0] = 1
+    flat = rgba.reshape(h, w * 4)
+    rows[:, 1:5] = flat[:, :4]
+    np.subtract(flat[:, 4:], flat[:, :-4], out=rows[:, 5:])
+    data = memoryview(rows.reshape(-1))
+
+    threads = threads or os.cpu_count() or 1
+    bands = max(1, min(threads, h // 64))
+    edges = [len(data) * k // bands for k in range(bands + 1)]
+    pieces = [data[edges[k]:edges[k + 1]] for k in range(bands)]
+    if bands == 1:
+        deflated = [_deflate(pieces[0], level, True)]
+    else:
+        with ThreadPoolExecutor(bands) as pool:
+            deflated = list(pool.map(_deflate, pieces, [level] * bands, [k == bands - 1 for k in range(bands)]))
+    stream = (b"\x78\x01" + b"".join(deflated)
+        + struct.pack(">I", zlib.adler32(data) & 0xffffffff))
+
+    def chunk(kind, data):
+        return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+    return (b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 6, 0, 0, 0))
+        + chunk(b"IDAT", stream)
+        + chunk(b"IEND", b""))
+
+
+def rasterize(page, samples=4, tolerance=0.1, canvas=None):
+    """
+    A `DisplayList` as a `Canvas` — drawn into `canvas`, cleared, if given
+    and the right size (reusing a canvas from frame to frame skips
+    allocating, i.e. page-faulting in, a fresh buffer every time)
+    """
+    if canvas is not None and (canvas.width, canvas.height) == (int(round(page.size[0])), int(round(page.size[1]))):
+        canvas.buffer.fill(0)
+        canvas.samples = samples
+    else:
+        canvas = Canvas(*page.size, samples=samples)
+    state = dict(fill=(0, 0, 0, 1), stroke=None, strokeWidth=1, transform=_IDENTITY,
+        font=None, fontSize=10, lineHeight=None)
+    stack = []
+
+    def paint(segments, closed=True):
+        paint_polygons(flatten(segments, state["transform"], tolerance), closed)
+
+    def paint_polygons(polygons, closed=True):
+        if state["fill"] and closed:
+            canvas.fill(polygons, state["fill"])
+        if state["stroke"] and state["strokeWidth"]:
+            # stroke width scales with the transform (well, its average scale)
+            xx, xy, yx, yy = state["transform"][:4]
+            width = state["strokeWidth"] * math.sqrt(abs(xx * yy - xy * yx))
+            canvas.fill(_stroke_polygons(polygons, width, closed), state["stroke"])
+
+    def paint_text(txt, x, y, width=None, align=None):
+        # lines of text, the first with its baseline at y, or (in a box of
+        # `width`) aligned within it
+        font, size = state["font"], state["fontSize"]
+        if not font or not os.path.exists(font):
+            return
+        from furniture.textcache import cache
+        leading = state["lineHeight"] or size * 1.2
+        polygons = []
+        for k, line in enumerate(str(txt).split("\n")):
+            if not line:
+                continue
+            outline = cache.outline(line, font, size)
+            dx = 0
+            if align in ("center", "right"):
+                dx = ((width or 0) - outline.advance) / (2 if align == "center" else 1)
+            t = _multiply(state["transform"], (1, 0, 0, 1, x + dx, y - k * leading))
+            polygons.extend(flatten(outline.segments, t, tolerance))
+        # every line at once
+        paint_polygons(polygons)
+
+    for op in page.ops:
+        name, args, kwargs = op[0], op[1], op[2] if len(op) > 2 else {}
+        if name == "save":
+            stack.append(dict(state))
+        elif name == "restore":
+            state = stack.pop()
+        elif name == "fill":
+            state["fill"] = _color(args)
+        elif name == "stroke":
+            state["stroke"] = _color(args)
+        elif name == "strokeWidth":
+            state["strokeWidth"] = args[0]
+        elif name == "translate":
+            x, y = (list(args) + [0, 0])[:2]
+            state["transform"] = _multiply(state["transform"], (1, 0, 0, 1, x, y))
+        elif name == "rotate":
+            angle = math.radians(args[0])
+            cx, cy = kwargs.get("center", args[1] if len(args) > 1 else (0, 0))
+            c, s = math.cos(angle), math.sin(angle)
+            t = _multiply(state["transform"], (1, 0, 0, 1, cx, cy))
+            t = _multiply(t, (c, s, -s, c, 0, 0))
+            state["transform"] = _multiply(t, (1, 0, 0, 1, -cx, -cy))
+        elif name == "scale":
+            sx = args[0]
+            sy = args[1] if len(args) > 1 and args[1] is not None else kwargs.get("y", sx)
+            if sy is None:
+                sy = sx
+            cx, cy = kwargs.get("center", (0, 0))
+            t = _multiply(state["transform"], (1, 0, 0, 1, cx, cy))
+            t = _multiply(t, (sx, 0, 0, sy, 0, 0))
+            state["transform"] = _multiply(t, (1, 0, 0, 1, -cx, -cy))
+        elif name == "rect":
+            paint(_rect_segments(*args[:4]))
+        elif name == "oval":
+            paint(_oval_segments(*args[:4]))
+        elif name == "polygon":
+            pts = args
+            segments = [["m", *pts[0]]] + [["l", *pt] for pt in pts[1:]]
+            paint(segments, kwargs.get("close", True))
+        elif name == "line":
+            (ax, ay), (bx, by) = args[:2]
+            paint([["m", ax, ay], ["l", bx, by]], closed=False)
+        elif name == "drawPath":
+            paint(args[0])
+        elif name == "font":
+            state["font"] = args[0]
+            if len(args) > 1:
+                state["fontSize"] = args[1]
+        elif name == "fontSize":
+            state["fontSize"] = args[0]
+        elif name == "lineHeight":
+            state["lineHeight"] = args[0]
+        elif name == "text":
+            x, y = args[1] if len(args) > 1 else kwargs.get("position", (0, 0))
+            paint_text(args[0], x, y, align=kwargs.get("align"))
+        elif name == "textBox":
+            x, y, w, h = args[1] if len(args) > 1 else kwargs["box"]
+            # the first baseline an ascender (roughly) below the top
+            paint_text(args[0], x, y + h - state["fontSize"] * 0.8, w, kwargs.get("align", args[2] if len(args) > 2 else None))
+        else:
+            raise ValueError("Can’t rasterize " + repr(name))
+    return canvas
+
+
+class RasterBackend(RecordingBackend):
+    """
+    The headless backend, plus pixels: `saveImage` to a `.png` path
+    rasterizes the current page (while `.json`/`.fdl` still save the display
+    lists), and `pixels` gives it as premultiplied RGBA bytes, like drawBot’s
+
+    - `samples` is the number of sub-scanlines per pixel row (i.e. vertical anti-aliasing)
+    - `level` is the zlib compression level for pngs (1 is fastest)
+    """
+    name = "raster"
+
+    def __init__(self, samples=4, level=1):
+        super().__init__()
+        if np is None:
+            raise ImportError("numpy was not found, so the raster backend can’t be used")
+        self.samples = samples
+        self.level = level
+        self.canvas = None
+
+    def rasterize(self):
+        if self.page is None:
+            self.newPage()
+        self.canvas = rasterize(self.page, samples=self.samples, canvas=self.canvas)
+        return self.canvas
+
+    def saveImage(self, path):
+        if path.endswith(".png"):
+            with open(path, "wb") as f:
+                f.write(self.rasterize().png(self.level))
+        else:
+            super().saveImage(path)
+
+    def pixels(self):
+        return self.rasterize().buffer.tobytes()
+
+
+if __name__ == "__main__":
+    from furniture.backend import load_display_lists
+    import sys
+
+    # rasterize a saved display list, i.e. python -m furniture.raster 0.fdl 0.png
+    page = load_display_lists(sys.argv[1])[0]
+    with open(sys.argv[2], "wb") as f:
+        f.write(rasterize(page).png())
@@ -1,17 +1,11 @@
 import argparse
-import tempfile
-import importlib
-from importlib.machinery import SourceFileLoader
 import os
 import sys
 import json
-from furniture.animation import Animation
+from furniture import backend
 
-try:
-    from fontTools.misc.cliTools import makeOutputFileName
-except:
-    print("fontTools not installed")
-    pass
+# furniture.animation (& fontTools) are imported only once they’re needed,
+# so `-h` and `render --server` start quickly
 
 def str2bool(v):
     if v.lower() in ('yes', 'true', 't', 'y', '1'):
@@ -29,6 +23,31 @@ def is_valid_file(parser, arg):
         return arg
 
 
+def prepare_folder(animation, src_path, folder=None):
+    """
+    The folder to render `src_path` into (by default, `<name>_frames` next to
+    it), with a subfolder for each layer (or for ufos, or ttfs)
+    """
+    if folder == None:
+        src_prefix = os.path.basename(src_path).replace(".py", "")
+        folder = f"{os.path.dirname(src_path)}/{src_prefix}_frames"
+    else:
+        folder = os.path.realpath(folder)
+    if not os.path.exists(folder):
+        os.mkdir(folder)
+
+    for layer in animation.layers:
+        if animation.fmt not in ("ufo", "ttf"):
+            subfolder = folder + "/" + layer
+            if not os.path.exists(subfolder):
+                os.mkdir(subfolder)
+    if animation.fmt in ("ufo", "ttf"):
+        font_folder = folder + "/" + animation.fmt + "s"
+        if not os.path.exists(font_folder):
+            os.mkdir(font_folder)
+    return folder
+
+
 def main():
     parser = argparse.ArgumentParser(
         prog="furniture-renderer",
@@ -36,7 +55,7 @@ def main():
     )
 
     parser.add_argument("action", type=str)
-    parser.add_argument("file", type=lambda x: is_valid_file(parser, x), metavar="FILE")
+    parser.add_argument("file", type=lambda x: is_valid_file(parser, x), metavar="FILE", nargs="?")
     parser.add_argument("-s", "--slice", type=str, default="")
     parser.add_argument("-f", "--folder", type=str, default=None)
     parser.add_argument("-l", "--layer", type=str, default=None)
@@ -44,29 +63,66 @@ def main():
     parser.add_argument("-a", "--audio", type=str2bool, default=True)
     parser.add_argument("-c", "--compile", type=str, default=None)
     parser.add_argument("-so", "--stdout", type=str, default=None)
+    parser.add_argument("-j", "--jobs", type=int, default=1)
+    parser.add_argument("-sp", "--single-pass", type=str2bool, default=False)
+    parser.add_argument("-i", "--incremental", type=str2bool, default=False)
+    parser.add_argument("-ci", "--cache-inputs", type=str2bool, default=False)
+    parser.add_argument("-p", "--pipe", type=str, default=None)
+    parser.add_argument("-b", "--backend", type=str, default=None)
+    parser.add_argument("-sv", "--server", type=str, nargs="?", default=None, const="default")
+    parser.add_argument("-st", "--stats", type=str2bool, default=False)
+    parser.add_argument("-pr", "--profile", type=str, default=None)
+    parser.add_argument("-sg", "--stream-glyphs", type=str2bool, default=False)
+    parser.add_argument("-pm", "--preview-mode", type=str, default=None)
+    parser.add_argument("-va", "--viewer-address", type=str, default=None)
+    parser.add_argument("-ad", "--address", type=str, default="localhost:8009")
+    parser.add_argument("-ch", "--chunk", type=int, default=10)
+    parser.add_argument("-to", "--timeout", type=float, default=60)
     args = parser.parse_args()
 
+    if args.action == "serve":
+        from furniture.server import RenderServer, SOCKET
+        if args.backend:
+            backend.use(args.backend)
+        server = RenderServer(SOCKET if args.server in (None, "default") else args.server)
+        return server.serve_forever()
+
+    if args.action == "work":
+        # render chunks for a `furniture coordinate` (with its FILE, unless given one)
+        from furniture.shard import work
+        if args.backend:
+            backend.use(args.backend)
+        work(args.address, os.path.realpath(args.file) if args.file else None, args.folder, jobs=args.jobs, log=args.verbose)
+        return
+
+    if not args.file:
+        parser.error("A FILE is needed for " + args.action)
+
+    if args.server and args.action == "render":
+        # hand the job to a running `furniture serve`
+        from furniture.server import submit, SOCKET
+        if args.compile:
+            parser.error("--compile can’t be combined with --server, render without --server to compile")
+        job = dict(file=os.path.realpath(args.file), slice=args.slice, layer=args.layer,
+            folder=os.path.realpath(args.folder) if args.folder else None, backend=args.backend,
+            jobs=args.jobs, singlePass=args.single_pass, incremental=args.incremental,
+            cacheInputs=args.cache_inputs, pipe=args.pipe, stats=args.stats, profile=args.profile,
+            streamGlyphs=args.stream_glyphs)
+        try:
+            result = submit(job, SOCKET if args.server == "default" else args.server)
+        except Exception:
+            if args.audio:
+                os.system("afplay /System/Library/Sounds/Sosumi.aiff ")
+            raise
+        if args.audio:
+            os.system("afplay /System/Library/Sounds/Pop.aiff ")
+        print("(render:server) {} frames, {:.3f}s load{}, {:.3f}s render, {:.3f}s total".format(
+            result["frames"], result["load"], " (reloaded)" if result["reloaded"] else "", result["render"], result["total"]))
+        return
+
     sl = slice(*map(lambda x: int(x.strip()) if x.strip() else None, args.slice.split(':')))
 
-    src_prefix = os.path.basename(args.file).replace(".py", "")
-    src_dirname = os.path.realpath(os.path.dirname(args.file))
     src_path = os.path.realpath(args.file)
-    folder = args.folder
-    if folder == None:
-        folder = f"{src_dirname}/{src_prefix}_frames"
-        if not os.path.exists(folder):
-            os.mkdir(folder)
-    else:
-        folder = os.path.realpath(folder)
-        if not os.path.exists(folder):
-            os.mkdir(folder)
-
-    with open(args.file, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    
-    # act like the app
-    lines.insert(0, "from drawBot import *\n")
-    lines.insert(1, "__file__ = '{}'\n".format(src_path))
 
     if args.stdout:
         logpath = os.path.realpath(args.stdout)
@@ -77,64 +133,81 @@ def main():
         sys.stdout = open(logpath, "a")
         sys.stderr = open(logpath, "a")
     
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".py", encoding="utf-8") as temp:
-        temp.write("".join(lines))
-        temp.flush()
-        mod = os.path.basename(temp.name)
-        dirname = os.path.dirname(temp.name)
-        src = SourceFileLoader(mod, temp.name).load_module()
-        animation = None
-        for k, obj in src.__dict__.items():
-            if isinstance(obj, Animation):
-                animation = obj
-        
-        if not animation:
-            raise Exception("No furniture.animation.Animation object found in src file")
-
-        for layer in animation.layers:
-            if animation.fmt != "ufo":
-                subfolder = folder + "/" + layer
-                if not os.path.exists(subfolder):
-                    os.mkdir(subfolder)
-
-        if args.action == "render":
-            try:
+    if args.backend:
+        backend.use(args.backend)
+
+    from furniture.animation import load_animation
+    animation = load_animation(src_path)
+    if not animation:
+        raise Exception("No furniture.animation.Animation object found in src file")
+
+    folder = prepare_folder(animation, src_path, args.folder)
+    ufo_folder = folder + "/ufos"
+
+    if args.action == "render":
+        try:
+            layers = [args.layer] if args.layer else None
+            profile = None
+            if args.profile:
+                # i.e. -pr 10:20 runs the callback under cProfile for frames 10 to 19
+                profile = range(*slice(*[int(x.strip()) if x.strip() else None for x in args.profile.split(":")]).indices(animation.length))
+            animation.render(indicesSlice=sl, folder=folder, log=args.verbose, workers=args.jobs, source=src_path, singlePass=args.single_pass, incremental=args.incremental, cacheInputs=args.cache_inputs, pipe=args.pipe, layers=layers, stats=args.stats, profile=profile, streamGlyphs=args.stream_glyphs)
+            if args.audio:
+                os.system("afplay /System/Library/Sounds/Pop.aiff ")
+
+            if args.compile:
                 if animation.fmt == "ufo":
-                    ufo_folder = folder + "/ufos"
-                    if not os.path.exists(ufo_folder):
-                        os.mkdir(ufo_folder)
-
-                animation.render(indicesSlice=sl, folder=folder, log=args.verbose)
-                if args.audio:
-                    os.system("afplay /System/Library/Sounds/Pop.aiff ")
-                
-                if args.compile:
-                    if animation.fmt == "ufo":
-                        ttf_folder = folder + "/ttfs"
-                        if not os.path.exists(ttf_folder):
-                            os.mkdir(ttf_folder)
-                        # needs to support layers
-                        for layer in animation.layers:
-                            ttf_name = makeOutputFileName(ttf_folder + "/" + animation.name + "_" + layer, extension=".ttf")
-                            ufo_path = ufo_folder + "/" + animation.name + "_" + layer + ".ufo"
-                            fontmake_cmd = f"fontmake --output-path {ttf_name} -o ttf -u {ufo_path}"
-                            print(fontmake_cmd)
-                            os.system(fontmake_cmd)
-                        os.system("afplay /System/Library/Sounds/Bottle.aiff ")
-                    else:
-                        print("Compliation not supported")
-                        os.system("afplay /System/Library/Sounds/Basso.aiff ")
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                if args.audio:
-                    os.system("afplay /System/Library/Sounds/Sosumi.aiff ")
-        
-        if args.action == "info":
-            print("-----")
-            info = dict(animation.__dict__)
-            del info["fn"]
-            print(json.dumps(info))
+                    from fontTools.misc.cliTools import makeOutputFileName
+                    from furniture.ttf import compile_ufos
+                    ttf_folder = folder + "/ttfs"
+                    if not os.path.exists(ttf_folder):
+                        os.mkdir(ttf_folder)
+                    # every layer at once, in-process (well, a process per layer)
+                    jobs = []
+                    for layer in layers or animation.layers:
+                        ttf_name = makeOutputFileName(ttf_folder + "/" + animation.name + "_" + layer, extension=".ttf")
+                        ufo_path = ufo_folder + "/" + animation.name + "_" + layer + ".ufo"
+                        jobs.append((ufo_path, ttf_name))
+                    for ttf_name in compile_ufos(jobs, workers=args.jobs if args.jobs > 1 else None):
+                        print("(compile)", ttf_name)
+                    os.system("afplay /System/Library/Sounds/Bottle.aiff ")
+                elif animation.fmt == "ttf":
+                    print("(compile) Already compiled, since fmt is ttf")
+                else:
+                    print("Compliation not supported")
+                    os.system("afplay /System/Library/Sounds/Basso.aiff ")
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            if args.audio:
+                os.system("afplay /System/Library/Sounds/Sosumi.aiff ")
+
+    if args.action == "coordinate":
+        # hand chunks of frames out to `furniture work` processes, on this machine or others
+        from furniture.shard import Coordinator
+        layers = [args.layer] if args.layer else None
+        coordinator = Coordinator(animation, src_path, folder, range(*sl.indices(animation.length)), layers=layers,
+            chunk=args.chunk, timeout=args.timeout, address=args.address, log=args.verbose)
+        if coordinator.serve():
+            return 1
+
+    if args.action == "preview":
+        # stream frames to the viewer as they’re drawn, without saving them
+        from furniture.viewer import previewer, WEBSOCKET_ADDR
+        from furniture.preview import PreviewStream
+        with previewer(args.viewer_address or WEBSOCKET_ADDR) as connection:
+            stream = PreviewStream(connection, mode=args.preview_mode)
+            for i in range(*sl.indices(animation.length)):
+                backend.newDrawing()
+                animation.storyboard(i, preview=stream)
+            backend.endDrawing()
+        print("(preview) {} frames as {}, {:,} bytes sent".format(stream.count, stream.mode, stream.bytes))
+
+    if args.action == "info":
+        print("-----")
+        info = dict(animation.__dict__)
+        del info["fn"]
+        print(json.dumps(info, default=repr))
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,150 @@
+"""
+A long-lived render process, so quick renders (i.e. `-s 10:12`) don’t pay
+for starting python, importing drawBot/fontTools, and loading the source
+file every time: `furniture serve` keeps all that warm (along with a pool of
+worker processes, for `-j`), and takes render jobs over a unix socket, from
+`furniture render example.py --server`
+
+A job is a line of json, i.e. `{"file": "/path/to/example.py", "slice":
+"10:12", "layer": "fg", "folder": null, "jobs": 1, "backend": null}` (with
+absolute paths, since the server has its own working directory), and the
+reply is a line of json with how long the job took, or the error it raised
+
+A job without a `backend` is rendered with the one the server was started
+with, whatever the job before it used
+"""
+import os
+import sys
+import json
+import time
+import socket
+import traceback
+
+SOCKET = os.path.expanduser("~/.furniture.sock")
+
+
+class RenderServer():
+    """
+    Renders jobs one at a time (drawBot isn’t thread-safe), reloading a
+    source file only when its mtime has changed since it was last loaded
+    (with the same backend, since a source file is loaded with the current
+    backend’s drawing functions)
+    """
+    def __init__(self, path=SOCKET):
+        from furniture import backend
+
+        self.path = path
+        self.backend = backend.current().name # for jobs that don’t name one
+        self.animations = {}
+        self.pools = {}
+
+    def load(self, path):
+        """
+        The animation in `path`, and whether it had to be (re)loaded
+        """
+        from furniture import backend
+        from furniture.animation import load_animation
+
+        mtime = os.path.getmtime(path)
+        key = (path, backend.current().name)
+        cached = self.animations.get(key)
+        if cached and cached[0] == mtime:
+            return cached[1], False
+        animation = load_animation(path)
+        if not animation:
+            raise Exception("No furniture.animation.Animation object found in " + path)
+        self.animations[key] = (mtime, animation)
+        return animation, True
+
+    def pool(self, workers):
+        # workers reload sources themselves, also by mtime, so a pool
+        # outlives any number of edits to the files it renders — but they
+        # inherit the backend they were spawned with, so there’s a pool per backend
+        key = (workers, os.environ.get("FURNITURE_BACKEND"))
+        if key not in self.pools:
+            import multiprocessing
+            ctx = multiprocessing.get_context("spawn")
+            self.pools[key] = ctx.Pool(workers)
+        return self.pools[key]
+
+    def render(self, job):
+        from furniture import backend
+        from furniture.renderer import prepare_folder
+
+        name = job.get("backend") or self.backend
+        if backend.current().name != name:
+            backend.use(name)
+        t0 = time.perf_counter()
+        src_path = os.path.realpath(job["file"])
+        animation, reloaded = self.load(src_path)
+        t1 = time.perf_counter()
+
+        sl = slice(*[int(x.strip()) if x.strip() else None for x in job.get("slice", "").split(":")])
+        # i.e. "10:20", like the slice (and resolved against the animation’s length by `render`)
+        profile = slice(*[int(x.strip()) if x.strip() else None for x in job["profile"].split(":")]) if job.get("profile") else None
+        folder = prepare_folder(animation, src_path, job.get("folder"))
+        layers = [job["layer"]] if job.get("layer") else None
+        workers = job.get("jobs", 1)
+        animation.render(indicesSlice=sl, folder=folder, source=src_path, layers=layers,
+            pool=self.pool(workers) if workers > 1 and not job.get("pipe") else None,
+            singlePass=job.get("singlePass", False), incremental=job.get("incremental", False),
+            cacheInputs=job.get("cacheInputs", False), pipe=job.get("pipe"), stats=job.get("stats", False),
+            profile=profile, streamGlyphs=job.get("streamGlyphs", False))
+        t2 = time.perf_counter()
+
+        return dict(file=src_path, reloaded=reloaded,
+            frames=len(range(*sl.indices(animation.length))),
+            load=t1 - t0, render=t2 - t1, total=t2 - t0)
+
+    def handle(self, conn):
+        with conn, conn.makefile("rwb") as f:
+            try:
+                job = json.loads(f.readline())
+                if job.get("action") == "shutdown":
+                    result = dict(shutdown=True)
+                else:
+                    result = self.render(job)
+            except Exception as e:
+                traceback.print_exc()
+                result = dict(error=traceback.format_exc())
+            f.write((json.dumps(result) + "\n").encode("utf-8"))
+            f.flush()
+        return not result.get("shutdown")
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen()
+        print("(serve)", self.path)
+        try:
+            while True:
+                conn, _ = server.accept()
+                if not self.handle(conn):
+                    break
+        finally:
+            server.close()
+            os.unlink(self.path)
+            for pool in self.pools.values():
+                pool.terminate()
+
+
+def submit(job, path=SOCKET):
+    """
+    Send a job to a running `RenderServer` and return its timing (or raise
+    the error it hit)
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path)
+        with s.makefile("rwb") as f:
+            f.write((json.dumps(job) + "\n").encode("utf-8"))
+            f.flush()
+            result = json.loads(f.readline())
+    if "error" in result:
+        raise Exception("Render failed on the server:\n" + result["error"])
+    return result
+
+
+if __name__ == "__main__":
+    RenderServer(sys.argv[1] if len(sys.argv) > 1 else SOCKET).serve_forever()
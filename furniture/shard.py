@@ -0,0 +1,364 @@
+"""
+Rendering one animation on many machines: `furniture coordinate example.py`
+splits the frames into chunks and hands them out, over TCP, to any number of
+`furniture work --address <host>:<port>` processes (each of which can render
+its chunks with `-j` processes of its own), then checks that every frame’s
+file is there once they’re done
+
+Every worker writes into the same frames folder, so it has to be somewhere
+they can all see (i.e. a network share) — and the same goes for the source
+file, unless a worker is given its own copy (`furniture work example.py`)
+
+Like `furniture.server`, every request is a line of json, and so is every
+reply — a worker asks for the `next` chunk (and is told to `wait` while the
+last chunks are still out, or that it’s `done`), sends a `heartbeat` every so
+often while it renders, and says when it’s `finished` (or `failed`). A chunk
+is only leased to a worker for `timeout` seconds past its last heartbeat,
+so the chunks of a worker that dies (or loses its connection) go back in the
+queue, for someone else; and any frames that are missing at the end are
+rendered again, up to `attempts` times. A worker that can’t reach the
+coordinator (before it’s started, or when the network drops) keeps trying,
+with backoff, for `patience` seconds before it gives up
+"""
+import os
+import sys
+import json
+import time
+import socket
+import threading
+import traceback
+import socketserver
+from collections import deque
+
+ADDRESS = "localhost:8009"
+
+
+def parse_address(address):
+    host, _, port = (address or ADDRESS).rpartition(":")
+    return host or "localhost", int(port)
+
+
+def runs(indices, size):
+    """
+    Frame indices as (start, stop) chunks of at most `size` frames, split
+    wherever the indices aren’t contiguous
+    """
+    chunks = []
+    for i in sorted(indices):
+        if chunks and chunks[-1][1] == i and chunks[-1][1] - chunks[-1][0] < size:
+            chunks[-1][1] = i + 1
+        else:
+            chunks.append([i, i + 1])
+    return [tuple(c) for c in chunks]
+
+
+def frame_files(animation, folder, indices, layers):
+    """
+    Every file a render of these frames should leave in `folder`, by frame
+    """
+    files = {}
+    if animation.fmt == "ufo":
+        for layer in layers:
+            writer = animation.glyphWriter(folder + "/ufos", layer)
+            for i in indices:
+                files.setdefault(i, []).append(writer.glyphs + "/" + writer.filename("frame_" + str(i)))
+    else:
+        for layer in layers:
+            for i in indices:
+                files.setdefault(i, []).append(f"{folder}/{layer}/{i}.{animation.fmt}")
+    return files
+
+
+def request(address, message, timeout=30):
+    with socket.create_connection(parse_address(address), timeout=timeout) as s:
+        with s.makefile("rwb") as f:
+            f.write((json.dumps(message) + "\n").encode("utf-8"))
+            f.flush()
+            return json.loads(f.readline())
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            message = json.loads(self.rfile.readline())
+            reply = self.server.coordinator.handle(message)
+        except Exception:
+            reply = dict(error=traceback.format_exc())
+        self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class Coordinator():
+    """
+    Hands out `chunk`-frame chunks of `indices` to workers (leased for
+    `timeout` seconds at a time) until every frame of every layer has been
+    rendered into `folder`, or has been tried `attempts` times
+    """
+    def __init__(self, animation, source, folder, indices, layers=None, chunk=10, timeout=30, attempts=3, address=ADDRESS, log=True):
+        if animation.fmt == "ttf" or not animation.fmt:
+            raise ValueError("Only image & ufo renders can be sharded, not " + repr(animation.fmt))
+        self.animation = animation
+        self.source = source
+        self.folder = folder
+        self.indices = list(indices)
+        self.layers = layers or animation.layers
+        self.chunk = chunk
+        self.timeout = timeout
+        self.attempts = attempts
+        self.address = address
+        self.log = log
+        self.lock = threading.Lock()
+        self.chunks = {} # id -> dict(start, stop, tries)
+        self.pending = deque()
+        self.leases = {} # id -> [worker, deadline]
+        self.finished = set()
+        self.failed = set()
+        self.workers = {} # worker -> dict(chunks, frames, seconds)
+        self.done = False
+        self.missing = []
+        self.queue(self.indices)
+
+    def print(self, *args):
+        if self.log:
+            print("(shard)", *args, flush=True)
+
+    def queue(self, indices):
+        for start, stop in runs(indices, self.chunk):
+            k = len(self.chunks)
+            self.chunks[k] = dict(start=start, stop=stop, tries=0)
+            self.pending.append(k)
+
+    def expire(self):
+        now = time.monotonic()
+        for k, (worker, deadline) in list(self.leases.items()):
+            if deadline < now:
+                del self.leases[k]
+                self.print("chunk", self.describe(k), "timed out on", worker)
+                self.retry(k)
+
+    def retry(self, k):
+        if k in self.finished:
+            # someone else already rendered it
+            return
+        if self.chunks[k]["tries"] < self.attempts:
+            self.pending.appendleft(k)
+        else:
+            self.print("chunk", self.describe(k), "failed", self.attempts, "times, giving up on it")
+            self.failed.add(k)
+
+    def describe(self, k):
+        return "{start}:{stop}".format(**self.chunks[k])
+
+    def handle(self, message):
+        with self.lock:
+            action = message.get("action")
+            worker = message.get("worker", "?")
+            k = message.get("chunk")
+            self.expire()
+            if action == "next":
+                return self.next(worker)
+            elif action == "heartbeat":
+                lease = self.leases.get(k)
+                if lease and lease[0] == worker:
+                    lease[1] = time.monotonic() + self.timeout
+                return dict(ok=True, cancel=k in self.finished)
+            elif action == "finished":
+                # only this worker’s lease — if the chunk timed out on it and
+                # went to another worker, that one’s still writing the same
+                # files, so it keeps its lease (holding off the final check)
+                # until it reports too
+                if self.leases.get(k, [None])[0] == worker:
+                    del self.leases[k]
+                if k not in self.finished:
+                    self.finished.add(k)
+                    self.failed.discard(k)
+                    stats = self.workers.setdefault(worker, dict(chunks=0, frames=0, seconds=0))
+                    stats["chunks"] += 1
+                    stats["frames"] += self.chunks[k]["stop"] - self.chunks[k]["start"]
+                    stats["seconds"] += message.get("seconds", 0)
+                    self.print("chunk", self.describe(k), "finished by", worker,
+                        "({}/{})".format(len(self.finished), len(self.chunks)))
+                return dict(ok=True)
+            elif action == "failed":
+                if self.leases.get(k, [None])[0] == worker:
+                    del self.leases[k]
+                    self.print("chunk", self.describe(k), "failed on", worker + ":\n" + message.get("error", ""))
+                    self.retry(k)
+                return dict(ok=True)
+            return dict(error="Unknown action " + repr(action))
+
+    def next(self, worker):
+        if self.done:
+            return dict(done=True)
+        while self.pending and self.pending[0] in self.finished:
+            # finished by a worker it had timed out on
+            self.pending.popleft()
+        if not self.pending:
+            return dict(wait=1)
+        k = self.pending.popleft()
+        chunk = self.chunks[k]
+        chunk["tries"] += 1
+        self.leases[k] = [worker, time.monotonic() + self.timeout]
+        self.workers.setdefault(worker, dict(chunks=0, frames=0, seconds=0))
+        self.print("chunk", self.describe(k), "to", worker)
+        return dict(chunk=k, start=chunk["start"], stop=chunk["stop"], file=self.source,
+            folder=self.folder, layers=self.layers, heartbeat=self.timeout / 3)
+
+    def verify(self):
+        """
+        Frames (of the finished chunks) missing any of their files
+        """
+        indices = [i for k in self.finished for i in range(self.chunks[k]["start"], self.chunks[k]["stop"])]
+        files = frame_files(self.animation, self.folder, indices, self.layers)
+        return sorted(i for i, paths in files.items() if not all(os.path.exists(p) for p in paths))
+
+    def settled(self):
+        # every chunk’s finished or given up on, and none are out
+        return not self.pending and not self.leases
+
+    def serve(self):
+        """
+        Coordinate until every frame’s rendered (or given up on), returning
+        the frames that never made it
+        """
+        server = _Server(parse_address(self.address), _Handler)
+        server.coordinator = self
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.print("{} frames in {} chunks, waiting for workers on {}:{}".format(
+            len(self.indices), len(self.chunks), *server.server_address))
+        started = time.monotonic()
+        checks = 0
+        try:
+            while True:
+                time.sleep(0.25)
+                with self.lock:
+                    self.expire()
+                    if not self.settled():
+                        continue
+                    missing = self.verify()
+                    if missing and checks < self.attempts:
+                        checks += 1
+                        self.print(len(missing), "frames missing their files, rendering them again")
+                        self.queue(missing)
+                        continue
+                    failed = [i for k in self.failed for i in range(self.chunks[k]["start"], self.chunks[k]["stop"])]
+                    self.missing = sorted(set(missing) | set(failed))
+                    self.done = True
+                    break
+
+            if self.animation.fmt == "ufo":
+                # the workers wrote the glyphs, so this only writes the plists
+                for layer in self.layers:
+                    self.animation.glyphWriter(self.folder + "/ufos", layer).save()
+
+            wall = time.monotonic() - started
+            for worker, stats in sorted(self.workers.items()):
+                self.print("{}: {chunks} chunks, {frames} frames, {seconds:.2f}s".format(worker, **stats))
+            self.print("{} frames in {:.2f}s, {} missing".format(len(self.indices), wall, len(self.missing)))
+            if self.missing:
+                self.print("missing:", ", ".join(f"{a}:{b}" for a, b in runs(self.missing, len(self.missing))))
+            # long enough for polling workers to hear that it’s done
+            time.sleep(1.5)
+        finally:
+            server.shutdown()
+            server.server_close()
+        return self.missing
+
+
+def _heartbeat(address, worker, k, interval, stop):
+    while not stop.wait(interval):
+        try:
+            request(address, dict(action="heartbeat", worker=worker, chunk=k))
+        except OSError:
+            pass
+
+
+def _persist(address, message, patience, name):
+    """
+    `request`, retried (with backoff) for up to `patience` seconds while the
+    coordinator can’t be reached — returning None if it never could be
+    """
+    waited, delay = 0, 1
+    while True:
+        try:
+            return request(address, message)
+        except OSError as e:
+            if waited >= patience:
+                print("(work) {} gave up on {} after {}s: {}".format(name, address, waited, e), flush=True)
+                return None
+            pause = min(delay, patience - waited)
+            print("(work) {} can’t reach {} ({}), retrying in {}s".format(name, address, e, pause), flush=True)
+            time.sleep(pause)
+            waited += pause
+            delay = min(delay * 2, 8)
+
+
+def work(address=ADDRESS, source=None, folder=None, jobs=1, name=None, log=True, patience=30):
+    """
+    Render chunks for a `Coordinator` until it’s done — loading the source
+    file it names (or `source`, if given) and rendering into the folder it
+    names (or `folder`) — and, whenever the coordinator can’t be reached
+    (before it’s started, or if the network drops), retrying for up to
+    `patience` seconds before giving up
+    """
+    from furniture.animation import load_animation
+    from furniture.renderer import prepare_folder
+
+    name = name or "{}:{}".format(socket.gethostname(), os.getpid())
+    animation, pool = None, None
+    rendered = 0
+    try:
+        while True:
+            reply = _persist(address, dict(action="next", worker=name), patience, name)
+            if reply is None:
+                break
+
+            if "error" in reply:
+                raise Exception("Coordinator error:\n" + reply["error"])
+            if reply.get("done"):
+                break
+            if reply.get("wait"):
+                time.sleep(reply["wait"])
+                continue
+
+            if animation is None:
+                src_path = os.path.realpath(source or reply["file"])
+                animation = load_animation(src_path)
+                if not animation:
+                    raise Exception("No furniture.animation.Animation object found in " + src_path)
+                target = prepare_folder(animation, src_path, folder or reply["folder"])
+                if jobs > 1:
+                    import multiprocessing
+                    pool = multiprocessing.get_context("spawn").Pool(jobs)
+
+            k = reply["chunk"]
+            stop = threading.Event()
+            threading.Thread(target=_heartbeat, args=(address, name, k, reply["heartbeat"], stop), daemon=True).start()
+            t = time.perf_counter()
+            try:
+                animation.render(indicesSlice=slice(reply["start"], reply["stop"]), folder=target, source=src_path,
+                    layers=reply["layers"], workers=jobs, pool=pool, log=log, stats=False,
+                    streamGlyphs=animation.fmt == "ufo", saveFonts=False) # the coordinator saves the ufos
+                message = dict(action="finished", seconds=time.perf_counter() - t)
+                rendered += reply["stop"] - reply["start"]
+            except Exception:
+                traceback.print_exc()
+                message = dict(action="failed", error=traceback.format_exc())
+            finally:
+                stop.set()
+            message.update(worker=name, chunk=k)
+            _persist(address, message, patience, name)
+    finally:
+        if pool:
+            pool.terminate()
+    print("(work) {} rendered {} frames".format(name, rendered))
+    return rendered
+
+
+if __name__ == "__main__":
+    work(sys.argv[1] if len(sys.argv) > 1 else ADDRESS)
@@ -1,11 +1,8 @@
 import sys
 import os
 import importlib
-try:
-    from drawBot import savedState
-    import drawBot as db
-except:
-    pass
+from furniture import backend
+from furniture.backend import savedState
 
 
 def add_importable(path):
@@ -30,16 +27,16 @@ class PreparedStateManager():
         self.style = style
 
     def __enter__(self):
-        db.save()
+        backend.save()
         for k, v in self.style.items():
-            db.fill(None)
-            db.stroke(None)
-            db.strokeWidth(1)
-            getattr(db, k)(*v)
+            backend.fill(None)
+            backend.stroke(None)
+            backend.strokeWidth(1)
+            getattr(backend, k)(*v)
         return self
 
     def __exit__(self, type, value, traceback):
-        db.restore()
+        backend.restore()
 
 
 def preparedState(**kwargs):
@@ -51,14 +48,14 @@ def preparedState(**kwargs):
 
 
 if __name__ == "__main__":
-    db.newDrawing()
+    backend.newDrawing()
     with preparedState(fill=(0, 1, 0)):
-        db.fill(None)
-        db.stroke(None)
-        db.strokeWidth(1)
-        db.rect(0, 0, 100, 100)
-    db.saveImage("~/Desktop/preparedstate.png")
-    db.endDrawing()
+        backend.fill(None)
+        backend.stroke(None)
+        backend.strokeWidth(1)
+        backend.rect(0, 0, 100, 100)
+    backend.saveImage("~/Desktop/preparedstate.png")
+    backend.endDrawing()
 
     add_importable("~/Type/grafutils")
     print(reimport("furniture.animation"))
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Where the time goes in a render: every frame (of every layer) is timed, split
+into phases —
+
+- `fn`: the animation’s callback
+- `burn`: the burn-in box
+- `bps`: drawing `frame.bps` onto the page
+- `save`: `saveImage` (or writing pixels to a pipe)
+- `glyphs`: inserting `frame.bps` into a ufo
+
+— and the timings are written as `render.stats.json` & `render.stats.csv`
+into the frames folder (next to each layer’s folder), with a summary of
+percentiles and the slowest frames printed at the end. `fn` can also be run
+under cProfile, for some range of frames, in which case the (merged) profile
+is saved as `render.prof`, i.e. for `python -m pstats` or snakeviz
+"""
+import os
+import io
+import csv
+import json
+import math
+import time
+import pstats
+import cProfile
+import contextlib
+
+PHASES = ["fn", "burn", "bps", "save", "glyphs"]
+
+
+def percentile(values, p):
+    """
+    The nearest-rank `p`th percentile of some (sorted) values
+    """
+    if not values:
+        return 0
+    return values[min(len(values), max(1, math.ceil(p / 100 * len(values)))) - 1]
+
+
+class FrameTimer():
+    """
+    The phase timings of one frame (of one layer, or of several in a single
+    pass), as `AnimationFrame.draw` goes; phases can happen more than once
+    per frame (i.e. `bps` per layer), and add up
+    """
+    def __init__(self, i, layer, profiler=None):
+        self.i = i
+        self.layer = layer
+        self.profiler = profiler
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.skipped = False
+        self.start = time.perf_counter()
+        self.total = None
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        profiler = self.profiler if name == "fn" else None
+        if profiler:
+            profiler.enable()
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - t
+            if profiler:
+                profiler.disable()
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+
+    def record(self):
+        return dict(i=self.i, layer=self.layer, total=self.total, skipped=self.skipped, **self.phases)
+
+
+class RenderStats():
+    """
+    The timings of every frame in a render (as dicts, see `FrameTimer.record`),
+    and — if `profile` is a range (or slice, or any collection) of frame
+    indices — a cProfile of `fn` for those frames; a slice is resolved
+    against the animation’s `length`, so it can be open-ended (i.e. `10:`)
+    """
+    def __init__(self, profile=None, length=None):
+        if isinstance(profile, slice):
+            if length is None and (profile.stop is None or profile.stop < 0 or (profile.start or 0) < 0):
+                raise ValueError("An open-ended (or negative) profile slice needs the animation’s length, i.e. RenderStats(profile, animation.length)")
+            profile = range(*profile.indices(length if length is not None else profile.stop))
+        self.profile = profile
+        self.profiler = cProfile.Profile() if profile is not None else None
+        self.profiled = False
+        self.records = []
+        self.profiles = [] # saved by other processes, to merge into this one’s
+
+    def frame(self, i, layer):
+        profiling = self.profiler is not None and i in self.profile
+        self.profiled = self.profiled or profiling
+        return FrameTimer(i, layer, self.profiler if profiling else None)
+
+    def add(self, timer):
+        timer.finish()
+        self.records.append(timer.record())
+
+    def merge(self, records, profile=None):
+        """
+        Add records (and a saved profile) from a parallel worker
+        """
+        self.records.extend(records)
+        if profile:
+            self.profiles.append(profile)
+
+    def dump_profile(self, path):
+        """
+        Save this process’s profile, if there is one (and anything was
+        profiled), returning where it went
+        """
+        if not self.profiled:
+            return None
+        self.profiler.dump_stats(path)
+        return path
+
+    def summary(self, wall=None, slowest=5):
+        frames = [r for r in self.records if not r["skipped"]]
+        lines = []
+        if wall:
+            lines.append("(stats) {} frames ({} skipped) in {:.2f}s, {:.1f} frames/s".format(
+                len(self.records), len(self.records) - len(frames), wall, len(self.records) / wall if wall else 0))
+        lines.append("{:<8} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "phase", "total", "mean", "p50", "p90", "p99", "max"))
+        for phase in ["total"] + PHASES:
+            values = sorted(r[phase] for r in frames)
+            if not values or not values[-1]:
+                continue
+            lines.append("{:<8} {:>9.2f}s {:>8.1f}ms {:>8.1f}ms {:>8.1f}ms {:>8.1f}ms {:>8.1f}ms".format(
+                phase, sum(values), sum(values) / len(values) * 1e3,
+                *[percentile(values, p) * 1e3 for p in (50, 90, 99)], values[-1] * 1e3))
+        for r in sorted(frames, key=lambda r: r["total"], reverse=True)[:slowest]:
+            phases = ", ".join("{} {:.1f}ms".format(p, r[p] * 1e3) for p in PHASES if r[p] >= 0.0001)
+            lines.append("slow: {:04d} ({}) {:.1f}ms — {}".format(r["i"], r["layer"], r["total"] * 1e3, phases))
+        return "\n".join(lines)
+
+    def save(self, folder, wall=None):
+        """
+        Write the timings (json & csv) and any profile into `folder`,
+        returning the json’s path
+        """
+        records = sorted(self.records, key=lambda r: (r["layer"], r["i"]))
+        path = folder + "/render.stats.json"
+        with open(path, "w") as f:
+            json.dump(dict(wall=wall, phases=PHASES, frames=records), f)
+        with open(folder + "/render.stats.csv", "w", newline="") as f:
+            writer = csv.DictWriter(f, ["i", "layer", "total", "skipped"] + PHASES)
+            writer.writeheader()
+            writer.writerows(records)
+
+        profiles = self.profiles + [p for p in [self.dump_profile(folder + "/render.main.prof")] if p]
+        if profiles:
+            stats = pstats.Stats(*profiles, stream=io.StringIO())
+            stats.dump_stats(folder + "/render.prof")
+            for p in profiles:
+                os.remove(p)
+        return path
+
+    def top(self, folder, limit=15):
+        """
+        The top of the saved profile, by cumulative time
+        """
+        if not os.path.exists(folder + "/render.prof"):
+            return None
+        out = io.StringIO()
+        pstats.Stats(folder + "/render.prof", stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
@@ -0,0 +1,284 @@
+"""
+Shaped text, kept from frame to frame: the outline of a string (in some
+font, at some size, with some variations & features) is shaped once, kept
+compactly, and then just drawn — moved, scaled, etc. by a transform — every
+time it’s asked for again, i.e.
+
+```
+from furniture.textcache import text
+
+def draw(frame):
+    text(frame.bps["default"].bp, "Hello", "MyFont-Regular", 1000, (100, -100))
+```
+
+instead of building a `FormattedString` and calling `bp.text(...)` on every
+frame. The cache is least-recently-used, and capped by (roughly) how much
+memory its outlines (`furniture.paths.ArrayPath`s) take up; each process
+(i.e. each parallel render worker) has its own. Without drawBot, the
+contours of each glyph (in each font, at each variation location) are kept
+too, in a cache of their own, capped the same way
+
+Text is shaped by drawBot, when that’s the backend, or else — given the path
+to a font file — with fontTools (and uharfbuzz, if it’s installed, for
+kerning & features; without it, glyphs are just laid out by their advances)
+"""
+import os
+from collections import OrderedDict
+
+from furniture import backend
+from furniture.paths import ArrayPath
+
+_OVERHEAD = 200 # bytes, per outline, beyond its path data
+
+
+class Outline(ArrayPath):
+    """
+    A shaped string’s outline (a `furniture.paths.ArrayPath`), and its
+    advance width
+    """
+    __slots__ = ("advance",)
+
+    def __init__(self, codes=b"", counts=(), coords=(), advance=0):
+        super().__init__(codes, counts, coords)
+        self.advance = advance
+
+    def __repr__(self):
+        return "<furniture.Outline {} segments, {} bytes>".format(len(self.codes), self.nbytes())
+
+    def nbytes(self):
+        return super().nbytes() + _OVERHEAD
+
+    def copy(self):
+        return Outline(self.codes, self.counts, self.coords, self.advance)
+
+    def __reduce__(self):
+        return (_outline, (self.tobytes(), self.advance))
+
+
+def _outline(data, advance):
+    outline = Outline.frombytes(data)
+    outline.advance = advance
+    return outline
+
+
+def _shape_drawbot(txt, font, fontSize, variations, features, pen):
+    import drawBot
+    fs = drawBot.FormattedString(txt, font=font, fontSize=fontSize,
+        fontVariations=dict(variations or {}), openTypeFeatures=dict(features or {}))
+    bp = drawBot.BezierPath()
+    bp.text(fs, (0, 0))
+    bp.drawToPen(pen)
+    return fs.size()[0]
+
+
+_FONTS = {}
+
+
+def _calls_nbytes(calls):
+    # roughly what a recording pen’s calls take up: a tuple per call, and
+    # per point
+    return _OVERHEAD + sum(64 + 64 * len(args) for _, args in calls)
+
+
+class _GlyphCache():
+    """
+    Each glyph’s decomposed contours, as pen calls, by (font, location,
+    glyph name) — least recently used first out once they add up to more
+    than `maxBytes`, since an animated variable font can be at a new
+    location on every frame
+    """
+    def __init__(self, maxBytes=16 * 1024 * 1024):
+        self.maxBytes = maxBytes
+        self.calls = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.calls)
+
+    def get(self, glyphset, key):
+        calls = self.calls.get(key)
+        if calls is not None:
+            self.calls.move_to_end(key)
+            return calls
+        from fontTools.pens.recordingPen import DecomposingRecordingPen
+        recording = DecomposingRecordingPen(glyphset)
+        glyphset[key[-1]].draw(recording)
+        calls = self.calls[key] = recording.value
+        self.bytes += _calls_nbytes(calls)
+        while self.bytes > self.maxBytes and len(self.calls) > 1:
+            _, evicted = self.calls.popitem(last=False)
+            self.bytes -= _calls_nbytes(evicted)
+        return calls
+
+    def clear(self):
+        self.calls.clear()
+        self.bytes = 0
+
+
+_GLYPHS = _GlyphCache()
+
+
+def _ttfont(path):
+    font = _FONTS.get(path)
+    if font is None:
+        from fontTools.ttLib import TTFont
+        font = _FONTS[path] = TTFont(path, lazy=True)
+    return font
+
+
+def _shape_fonttools(txt, font, fontSize, variations, features, pen):
+    from fontTools.pens.transformPen import TransformPen
+
+    if not os.path.exists(font):
+        raise ValueError("Text can only be shaped without drawBot from a font file, not " + repr(font))
+    ttfont = _ttfont(font)
+    glyphset = ttfont.getGlyphSet(location=dict(variations)) if variations else ttfont.getGlyphSet()
+    scale = fontSize / ttfont["head"].unitsPerEm
+
+    try:
+        import uharfbuzz as hb
+    except ImportError:
+        hb = None
+
+    if hb:
+        hbfont = hb.Font(hb.Face(hb.Blob.from_file_path(font)))
+        if variations:
+            hbfont.set_variations(dict(variations))
+        buf = hb.Buffer()
+        buf.add_str(txt)
+        buf.guess_segment_properties()
+        hb.shape(hbfont, buf, dict(features or {}))
+        glyphs = [(ttfont.getGlyphName(info.codepoint), pos.x_advance, pos.x_offset, pos.y_offset)
+            for info, pos in zip(buf.glyph_infos, buf.glyph_positions)]
+    else:
+        cmap = ttfont.getBestCmap()
+        names = [cmap.get(ord(c), ".notdef") for c in txt]
+        glyphs = [(name, glyphset[name].width, 0, 0) for name in names]
+
+    location = tuple(sorted(variations.items())) if variations else ()
+    x = 0
+    for name, advance, dx, dy in glyphs:
+        # each glyph is drawn out (components & all, since an outline is just
+        # contours) once, so new strings, like counters, only cost a layout
+        calls = _GLYPHS.get(glyphset, (font, location, name))
+        tpen = TransformPen(pen, (scale, 0, 0, scale, (x + dx) * scale, dy * scale))
+        for method, args in calls:
+            getattr(tpen, method)(*args)
+        x += advance
+    return x * scale
+
+
+def shape(txt, font, fontSize, variations=None, features=None, pen=None):
+    """
+    Shape a string, drawing its outline (at 0, 0) to `pen` (or into a new
+    `Outline`, which is returned), by drawBot if that’s the backend, or
+    fontTools if not
+    """
+    recording = pen is None
+    if recording:
+        pen = Outline()
+    if getattr(backend.current(), "name", None) == "drawbot":
+        advance = _shape_drawbot(txt, font, fontSize, variations, features, pen)
+    else:
+        advance = _shape_fonttools(txt, font, fontSize, variations, features, pen)
+    if recording:
+        pen.advance = advance
+        return pen
+    return advance
+
+
+def _key(txt, font, fontSize, variations, features):
+    return (font, fontSize,
+        tuple(sorted(variations.items())) if variations else (),
+        txt,
+        tuple(sorted(features.items())) if features else ())
+
+
+class TextCache():
+    """
+    Shaped outlines, by (font, size, variations, text, features), least
+    recently used first out once they add up to more than `maxBytes` —
+    `shaper` is a function like `shape` (which it defaults to)
+    """
+    def __init__(self, maxBytes=64 * 1024 * 1024, shaper=None):
+        self.maxBytes = maxBytes
+        self.shaper = shaper or shape
+        self.outlines = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return "<furniture.TextCache {} outlines, {:.1f}MB, {} hits, {} misses, {} evicted>".format(
+            len(self.outlines), self.bytes / 1024 / 1024, self.hits, self.misses, self.evictions)
+
+    def __len__(self):
+        return len(self.outlines)
+
+    def outline(self, txt, font, fontSize, variations=None, features=None):
+        """
+        The (cached) `Outline` of some text, shaping it if need be — it’s the
+        cache’s own, so it mustn’t be changed (i.e. `transform`ed in place);
+        `draw` returns a copy that can be
+        """
+        key = _key(txt, font, fontSize, variations, features)
+        outline = self.outlines.get(key)
+        if outline is not None:
+            self.hits += 1
+            self.outlines.move_to_end(key)
+            return outline
+
+        self.misses += 1
+        outline = self.shaper(txt, font, fontSize, variations, features)
+        self.outlines[key] = outline
+        self.bytes += outline.nbytes()
+        while self.bytes > self.maxBytes and len(self.outlines) > 1:
+            _, evicted = self.outlines.popitem(last=False)
+            self.bytes -= evicted.nbytes()
+            self.evictions += 1
+        return outline
+
+    def draw(self, pen, txt, font, fontSize, offset=(0, 0), transform=None, variations=None, features=None):
+        """
+        Draw some text to a pen (i.e. a `BezierPath`, like a layer’s
+        `frame.bps[layer].bp`) at `offset` — after `transform`, an affine
+        (xx, xy, yx, yy, dx, dy), if there is one — returning (a copy of) its
+        `Outline`
+        """
+        outline = self.outline(txt, font, fontSize, variations, features)
+        x, y = offset
+        if transform is not None:
+            xx, xy, yx, yy, dx, dy = transform
+            transform = (xx, xy, yx, yy, dx + x, dy + y)
+        elif x or y:
+            transform = (1, 0, 0, 1, x, y)
+        outline.drawToPen(pen, transform)
+        return outline.copy()
+
+    def clear(self):
+        self.outlines.clear()
+        self.bytes = 0
+        _GLYPHS.clear()
+
+
+cache = TextCache()
+
+
+def text(pen, txt, font, fontSize, offset=(0, 0), transform=None, variations=None, features=None):
+    """
+    `TextCache.draw`, with the module-wide cache
+    """
+    return cache.draw(pen, txt, font, fontSize, offset, transform, variations, features)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from fontTools.pens.recordingPen import RecordingPen
+
+    font = sys.argv[1]
+    t = time.perf_counter()
+    for i in range(1000):
+        text(RecordingPen(), "Hello, world", font, 100, (0, i))
+    print(cache, "{:.1f}ms".format((time.perf_counter() - t) * 1e3))
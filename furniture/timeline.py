@@ -0,0 +1,242 @@
+import math
+from array import array
+from bisect import bisect_right
+
+
+def linear(t):
+    return t
+
+
+def ease_in(t):
+    return t * t
+
+
+def ease_out(t):
+    return t * (2 - t)
+
+
+def ease_in_out(t):
+    return 2 * t * t if t < 0.5 else -1 + (4 - 2 * t) * t
+
+
+def ease_in_cubic(t):
+    return t * t * t
+
+
+def ease_out_cubic(t):
+    return (t - 1) ** 3 + 1
+
+
+def ease_in_out_cubic(t):
+    return 4 * t * t * t if t < 0.5 else (t - 1) * (2 * t - 2) * (2 * t - 2) + 1
+
+
+def sine_in_out(t):
+    return -(math.cos(math.pi * t) - 1) / 2
+
+
+def step(t):
+    return 0 if t < 1 else 1
+
+
+EASINGS = {
+    "linear": linear,
+    "ease_in": ease_in,
+    "ease_out": ease_out,
+    "ease_in_out": ease_in_out,
+    "ease_in_cubic": ease_in_cubic,
+    "ease_out_cubic": ease_out_cubic,
+    "ease_in_out_cubic": ease_in_out_cubic,
+    "sine_in_out": sine_in_out,
+    "step": step,
+}
+
+
+def txt_to_easing(easing):
+    """
+    An easing can be the name of one of the `EASINGS`, or any function
+    that maps a 0-1 value to a 0-1 value
+    """
+    if callable(easing):
+        return easing
+    try:
+        return EASINGS[easing]
+    except KeyError:
+        raise ValueError("Unknown easing " + repr(easing) + ", must be one of " + ", ".join(EASINGS))
+
+
+def lerp(a, b, t):
+    if isinstance(a, (tuple, list)):
+        return type(a)(lerp(x, y, t) for x, y in zip(a, b))
+    return a + (b - a) * t
+
+
+class Clip():
+    """
+    A named span of frames, from `start` up to (but not including) `end`
+    """
+    def __init__(self, name, start, end, easing="linear"):
+        self.name = name
+        self.start = start
+        self.end = end
+        self.easing = txt_to_easing(easing)
+
+    def __repr__(self):
+        return "<furniture.Clip {} {}-{}>".format(self.name, self.start, self.end)
+
+    def progress(self, i):
+        """
+        Eased 0-1 progress through the clip at frame `i` (0 before it starts,
+        1 after it ends), measured like `AnimationFrame.doneness`
+        """
+        if i < self.start:
+            return 0
+        if i >= self.end:
+            return 1
+        return self.easing((i - self.start) / (self.end - self.start))
+
+
+class Keyframes():
+    """
+    A named value, interpolated between `(frame, value)` keyframes (values
+    can be numbers, or tuples/lists of numbers, like colors); `easing` is
+    used for every segment, unless a keyframe gives its own as a third
+    item, i.e. `(frame, value, easing)`, for the segment that follows it
+    """
+    def __init__(self, name, keyframes, easing="linear"):
+        self.name = name
+        if not keyframes:
+            raise ValueError("Keyframes " + repr(name) + " needs at least one (frame, value) keyframe")
+        keyframes = sorted(keyframes, key=lambda kf: kf[0])
+        self.frames = [kf[0] for kf in keyframes]
+        self.values = [kf[1] for kf in keyframes]
+        self.easings = [txt_to_easing(kf[2] if len(kf) > 2 else easing) for kf in keyframes]
+
+    def __repr__(self):
+        return "<furniture.Keyframes {} {}>".format(self.name, self.frames)
+
+    def value(self, i):
+        k = bisect_right(self.frames, i) - 1
+        if k < 0:
+            return self.values[0]
+        if k >= len(self.frames) - 1:
+            return self.values[-1]
+        f0, f1 = self.frames[k], self.frames[k + 1]
+        return lerp(self.values[k], self.values[k + 1], self.easings[k]((i - f0) / (f1 - f0)))
+
+
+class Timeline():
+    """
+    Named clips & keyframes for an `Animation`, so a callback can ask
+    `frame.timeline` what’s happening at the current frame, rather than
+    working it out from `frame.doneness`; clips are kept in an interval
+    index — the set of active clips between each pair of consecutive clip
+    boundaries — so looking up a frame is a binary search, regardless of
+    how many clips there are
+
+    - `cache`=True precomputes every clip’s progress & every keyframed value
+    for every frame into arrays, before an animation renders or storyboards
+    (in each worker process, too, when rendering in parallel)
+    """
+    def __init__(self, cache=False):
+        self.clips = {}
+        self.keyframed = {}
+        self.cache = cache
+        self._bounds = None
+        self._segments = None
+        self._cached = None
+
+    def clip(self, name, start, end, easing="linear"):
+        clip = Clip(name, start, end, easing)
+        self.clips[name] = clip
+        self._bounds = None
+        self._cached = None
+        return clip
+
+    def keyframes(self, name, keyframes, easing="linear"):
+        track = Keyframes(name, keyframes, easing)
+        self.keyframed[name] = track
+        self._cached = None
+        return track
+
+    def _index(self):
+        # clips that start together are ordered longest-first, so the last
+        # active clip is always the most recent (& most specific) one
+        clips = sorted(self.clips.values(), key=lambda c: (c.start, -c.end))
+        bounds = sorted({c.start for c in clips} | {c.end for c in clips})
+        self._segments = [tuple(c for c in clips if c.start <= b < c.end) for b in bounds]
+        self._bounds = bounds
+
+    def active(self, i):
+        """
+        The clips active at frame `i`, in order of when they start
+        """
+        if self._bounds is None:
+            self._index()
+        k = bisect_right(self._bounds, i) - 1
+        if k < 0:
+            return ()
+        return self._segments[k]
+
+    def progress(self, name, i):
+        if self._cached and 0 <= i < self._cached[0]:
+            return self._cached[1][name][i]
+        return self.clips[name].progress(i)
+
+    def value(self, name, i):
+        if self._cached and 0 <= i < self._cached[0]:
+            return self._cached[2][name][i]
+        return self.keyframed[name].value(i)
+
+    def precompute(self, length):
+        """
+        Cache every clip’s progress (as an array of floats) and every
+        keyframed value for frames `0` to `length` (unless they already are)
+        """
+        if self._cached and self._cached[0] == length:
+            return
+        progress = {name: array("d", (clip.progress(i) for i in range(length))) for name, clip in self.clips.items()}
+        values = {}
+        for name, track in self.keyframed.items():
+            vs = [track.value(i) for i in range(length)]
+            if all(isinstance(v, (int, float)) for v in vs):
+                vs = array("d", vs)
+            values[name] = vs
+        self._cached = (length, progress, values)
+
+    def at(self, i):
+        return TimelineFrame(self, i)
+
+
+class TimelineFrame():
+    """
+    A `Timeline` as of a single frame — what’s available as `frame.timeline`
+    """
+    def __init__(self, timeline, i):
+        self.timeline = timeline
+        self.i = i
+
+    def __repr__(self):
+        return "<furniture.TimelineFrame {:04d} {}>".format(self.i, self.active())
+
+    def __contains__(self, name):
+        return any(c.name == name for c in self.timeline.active(self.i))
+
+    def active(self):
+        """
+        Names of the clips active at this frame
+        """
+        return [c.name for c in self.timeline.active(self.i)]
+
+    def current(self):
+        """
+        Name of the most recently started of the active clips, or None
+        """
+        active = self.timeline.active(self.i)
+        return active[-1].name if active else None
+
+    def progress(self, name):
+        return self.timeline.progress(name, self.i)
+
+    def value(self, name):
+        return self.timeline.value(name, self.i)
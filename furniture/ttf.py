@@ -0,0 +1,149 @@
+"""
+Compiling rendered frames into ttfs, in-process, with fontTools’
+`FontBuilder` — either from the ufos a render wrote (which is what
+`furniture-renderer render example.py -c ttf` does once it’s rendered), or,
+with `fmt="ttf"`, straight from the frames’ `frame.bps`, with no ufo in
+between; either way, the layers’ fonts are built at the same time, each in
+its own process
+
+Outlines are converted to quadratics (& reversed) as fontmake would, and each
+frame is mapped to a character, as in the ufos (frame 0 is "0", and so on)
+"""
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def build_ttf(glyphs, info, path):
+    """
+    Build & save a ttf, where `glyphs` is a dict of glyph name to `(unicode,
+    width, recording)` — a recording being a `furniture.paths.ArrayPath`,
+    or a fontTools `RecordingPen`’s `value` — and `info` is a dict of
+    ufo-style font info (i.e. `Animation.fontInfo`)
+    """
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.pens.cu2quPen import Cu2QuPen
+    from fontTools.pens.recordingPen import replayRecording
+
+    upm = info.get("unitsPerEm", 1000)
+    ascender, descender = info.get("ascender", upm), info.get("descender", 0)
+    names = list(glyphs)
+    outlines = {".notdef": TTGlyphPen(None).glyph()}
+    cmap = {}
+    for name in names:
+        unicode, width, recording = glyphs[name]
+        pen = TTGlyphPen(None)
+        cu2qu = Cu2QuPen(pen, max_err=upm / 1000, reverse_direction=True)
+        if hasattr(recording, "drawToPen"):
+            recording.drawToPen(cu2qu)
+        else:
+            replayRecording(recording, cu2qu)
+        outlines[name] = pen.glyph()
+        if unicode is not None:
+            cmap[unicode] = name
+
+    fb = FontBuilder(upm, isTTF=True)
+    fb.setupGlyphOrder([".notdef"] + names)
+    fb.setupCharacterMap(cmap)
+    fb.setupGlyf(outlines)
+    glyf = fb.font["glyf"]
+    metrics = {".notdef": (0, 0)}
+    for name in names:
+        metrics[name] = (int(round(glyphs[name][1])), getattr(glyf[name], "xMin", 0))
+    fb.setupHorizontalMetrics(metrics)
+    fb.setupHorizontalHeader(ascent=ascender, descent=descender)
+    family, style = info.get("familyName", "Animation"), info.get("styleName", "Regular")
+    fb.setupNameTable(dict(familyName=family, styleName=style,
+        version="Version {}.{:03d}".format(info.get("versionMajor", 1), info.get("versionMinor", 0))))
+    fb.setupOS2(sTypoAscender=ascender, sTypoDescender=descender, usWinAscent=ascender,
+        usWinDescent=abs(descender), sxHeight=info.get("xHeight", 0), sCapHeight=info.get("capHeight", 0))
+    fb.setupPost()
+    fb.font["head"].fontRevision = info.get("versionMajor", 1) + info.get("versionMinor", 0) / 1000
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    fb.save(path)
+    return path
+
+
+def read_ufo(path):
+    """
+    The glyphs (in glyph order, as for `build_ttf`) & font info of a ufo
+    """
+    from types import SimpleNamespace
+    from fontTools.ufoLib import UFOReader
+    from fontTools.pens.recordingPen import RecordingPen
+
+    reader = UFOReader(path, validate=False)
+    info = SimpleNamespace()
+    reader.readInfo(info)
+    glyphset = reader.getGlyphSet()
+    order = [n for n in reader.readLib().get("public.glyphOrder", []) if n in glyphset]
+    order += sorted(set(glyphset.keys()) - set(order))
+    glyphs = {}
+    for name in order:
+        glyph = glyphset[name]
+        pen = RecordingPen()
+        glyph.draw(pen)
+        glyphs[name] = (glyph.unicodes[0] if glyph.unicodes else None, glyph.width, pen.value)
+    return glyphs, vars(info)
+
+
+def compile_ufo(ufo_path, ttf_path):
+    """
+    A ufo as a ttf
+    """
+    return build_ttf(*read_ufo(ufo_path), ttf_path)
+
+
+def _run(fn, jobs, workers=None):
+    # one process per job (at most `workers`), unless there’s only one job
+    if workers == 1 or len(jobs) < 2:
+        return [fn(*job) for job in jobs]
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(min(len(jobs), workers or os.cpu_count() or 1), mp_context=ctx) as pool:
+        return list(pool.map(fn, *zip(*jobs)))
+
+
+def compile_ufos(paths, workers=None):
+    """
+    Compile `(ufo_path, ttf_path)`s, in parallel
+    """
+    return _run(compile_ufo, list(paths), workers)
+
+
+def build_ttfs(writers, workers=None):
+    """
+    Save `TTFWriter`s, in parallel
+    """
+    return _run(build_ttf, [(w.glyphs, w.info, w.path) for w in writers], workers)
+
+
+class TTFWriter():
+    """
+    A ttf (at `path`) that glyphs are collected into, as frames are drawn,
+    and that’s built when saved — can be rendered into like a
+    `furniture.ufo.GlyphWriter`, except that nothing’s on disk until then
+    (so an incremental render re-draws every frame)
+    """
+    def __init__(self, path, info=None):
+        self.path = path
+        self.info = info or {}
+        self.glyphs = {}
+
+    def __repr__(self):
+        return "<furniture.TTFWriter {}, {} glyphs>".format(self.path, len(self.glyphs))
+
+    def __contains__(self, name):
+        return False
+
+    def write(self, name, unicode, width, path):
+        from furniture.paths import ArrayPath
+        # kept (and sent back from parallel workers) as flat arrays
+        self.add(name, unicode, width, ArrayPath.fromPath(path))
+
+    def add(self, name, unicode, width, recording):
+        self.glyphs[name] = (unicode, width, recording)
+
+    def save(self):
+        return build_ttf(self.glyphs, self.info, self.path)
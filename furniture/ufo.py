@@ -0,0 +1,110 @@
+"""
+Writing frames into a ufo without keeping the font in memory: each frame’s
+glyph is written straight to its own `.glif` file in the ufo’s glyphs folder
+as soon as it’s drawn (by whichever process drew it, when rendering in
+parallel), and the plists that tie the ufo together (`contents.plist`,
+`fontinfo.plist`, etc.) are written once, by `GlyphWriter.save`, at the end
+
+Every file is written to a temporary file first and then moved into place,
+so nothing (another worker, or a font editor) ever reads one half-written
+"""
+import os
+import plistlib
+from types import SimpleNamespace
+
+
+def _replace(path, data):
+    # write next to `path` and then swap it in, which is atomic
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _write_plist(path, value):
+    _replace(path, plistlib.dumps(value))
+
+
+class GlyphWriter():
+    """
+    A ufo (at `path`) that glyphs are written into one `.glif` at a time;
+    `info` is what goes into `fontinfo.plist` — looks enough like a
+    `defcon.Font` (`name in writer`, `writer.save()`) to be rendered into
+    instead of one
+    """
+    def __init__(self, path, info=None):
+        self.path = path
+        self.info = info or {}
+        self.glyphs = path + "/glyphs"
+        os.makedirs(self.glyphs, exist_ok=True)
+
+    def __repr__(self):
+        return "<furniture.GlyphWriter {}>".format(self.path)
+
+    def filename(self, name):
+        from fontTools.ufoLib.filenames import userNameToFileName
+        return userNameToFileName(name, suffix=".glif")
+
+    def __contains__(self, name):
+        return os.path.exists(self.glyphs + "/" + self.filename(name))
+
+    def write(self, name, unicode, width, path):
+        """
+        Write a glyph, with the outline of `path` (anything with a
+        `drawToPen`, i.e. a `BezierPath`)
+        """
+        from fontTools.pens.pointPen import SegmentToPointPen
+        from fontTools.ufoLib.glifLib import writeGlyphToString
+
+        glyph = SimpleNamespace(width=width, unicodes=[unicode])
+        glif = writeGlyphToString(name, glyph, lambda pen: path.drawToPen(SegmentToPointPen(pen)))
+        _replace(self.glyphs + "/" + self.filename(name), glif.encode("utf-8"))
+
+    def contents(self):
+        """
+        Every glyph in the glyphs folder, by name — as already listed in
+        `contents.plist`, plus anything written since
+        """
+        try:
+            with open(self.glyphs + "/contents.plist", "rb") as f:
+                contents = plistlib.load(f)
+        except FileNotFoundError:
+            contents = {}
+        files = {f for f in os.listdir(self.glyphs) if f.endswith(".glif")}
+        contents = {name: f for name, f in contents.items() if f in files}
+        listed = set(contents.values())
+        for f in sorted(files - listed):
+            # only this writer’s glyphs aren’t listed yet, and their
+            # names (frame_N) are their filenames
+            contents[f[:-len(".glif")]] = f
+        return contents
+
+    def save(self):
+        _write_plist(self.path + "/metainfo.plist", dict(creator="com.github.stenson.furniture", formatVersion=3))
+        _write_plist(self.path + "/layercontents.plist", [["public.default", "glyphs"]])
+        info = {}
+        if os.path.exists(self.path + "/fontinfo.plist"):
+            with open(self.path + "/fontinfo.plist", "rb") as f:
+                info = plistlib.load(f)
+        info.update(self.info)
+        _write_plist(self.path + "/fontinfo.plist", info)
+        contents = self.contents()
+        _write_plist(self.glyphs + "/contents.plist", contents)
+
+        # glyphs already in the glyph order stay where they are, and new
+        # ones go on the end, in frame order
+        lib = {}
+        if os.path.exists(self.path + "/lib.plist"):
+            with open(self.path + "/lib.plist", "rb") as f:
+                lib = plistlib.load(f)
+        order = [name for name in lib.get("public.glyphOrder", []) if name in contents]
+        ordered = set(order)
+        order.extend(sorted((name for name in contents if name not in ordered), key=_frame_order))
+        lib["public.glyphOrder"] = order
+        _write_plist(self.path + "/lib.plist", lib)
+
+
+def _frame_order(name):
+    # frame_2 before frame_10
+    prefix, _, number = name.rpartition("_")
+    return (prefix, int(number)) if number.isdigit() else (name, -1)
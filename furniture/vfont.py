@@ -1,3 +1,45 @@
+"""
+Driving variable fonts with 0-1 values: each axis’s range is looked up once
+per font (and kept, by font name, in `AXES`), so an animation can scale &
+set every axis, for every glyph of every frame, without going back to the
+font file — or scale a whole frame range’s worth of values up front
+"""
+import os
+
+AXES = {} # font name (or path) -> axes, as from `listFontVariations`
+
+
+def _read_axes(font):
+    if os.path.exists(font):
+        # a font file, read with fontTools, no drawBot needed
+        from fontTools.ttLib import TTFont
+        ttfont = TTFont(font, lazy=True)
+        if "fvar" not in ttfont:
+            return {}
+        names = ttfont["name"]
+        return {a.axisTag: dict(
+            name=str(names.getDebugName(a.axisNameID) or a.axisTag),
+            minValue=a.minValue, defaultValue=a.defaultValue, maxValue=a.maxValue)
+            for a in ttfont["fvar"].axes}
+    from drawBot import listFontVariations
+    return dict(listFontVariations(font))
+
+
+def axes(font):
+    """
+    The axes of a font — by name (or path), or a `FormattedString`’s
+    current font — as `listFontVariations` would have them (a dict of axis
+    tags to dicts with `minValue`, `maxValue`, etc.); a font given by name
+    is only looked up the first time it’s asked for, but a `FormattedString`
+    is asked every time, since which font it’s in is its own business
+    """
+    if not isinstance(font, str):
+        return dict(font.listFontVariations())
+    found = AXES.get(font)
+    if found is None:
+        found = AXES[font] = _read_axes(font)
+    return found
+
 
 def scale_to_axis(axis, value, insetMin=1, insetMax=1):
     """
@@ -9,16 +51,69 @@ def scale_to_axis(axis, value, insetMin=1, insetMax=1):
     `insetMin` and `insetMax` let you specify an offset from the true
     min/max, in order to avoid a bug in the Apple font variation code;
     this defaults to 1 which is the most standard
+
+    `value` can also be an array (or list) of values, i.e. one per frame,
+    which are all scaled at once (with numpy) into an array
     """
     minv = axis.get("minValue", 0)
     maxv = axis.get("maxValue", 1000)
+    if hasattr(value, "__len__"):
+        import numpy as np
+        return np.clip(np.asarray(value, dtype=float) * (maxv - minv) + minv, minv + insetMin, maxv - insetMax)
     scaled = (value * (maxv - minv)) + minv
     return max(minv + insetMin, min(maxv - insetMax, scaled))
 
 
-def scaledFontVariations(fs, **kwargs):
-    for axis, value in kwargs.items():
-        axis_dict = fs.listFontVariations().get(axis)
-        scaled = scale_to_axis(axis_dict, value)
-        fs.fontVariations(**{axis:scaled})
-    return scaled
\ No newline at end of file
+def scaledVariations(font, insetMin=1, insetMax=1, **kwargs):
+    """
+    The 0-1 values given for each axis (by tag, i.e. `wght=0.5`), scaled to
+    the font’s axes, as a dict to set with `fontVariations(**...)`
+    """
+    found = axes(font)
+    return {axis: scale_to_axis(found[axis], value, insetMin, insetMax) for axis, value in kwargs.items()}
+
+
+def scaledFontVariations(fs, insetMin=1, insetMax=1, font=None, **kwargs):
+    """
+    Scale the 0-1 values given for each axis to the `FormattedString`’s
+    current font, and set them all, with a single `fontVariations` call —
+    returning the scaled values; given the name (or path) of the font the
+    `FormattedString` is in, as `font`, its axes are only looked up once
+    """
+    scaled = scaledVariations(font or fs, insetMin, insetMax, **kwargs)
+    fs.fontVariations(**scaled)
+    return scaled
+
+
+class FrameVariations():
+    """
+    Every frame’s axis values, scaled up front — `values` being, for each
+    axis, a 0-1 value per frame (i.e. an eased `doneness` for every frame
+    of the animation), scaled all at once into `array` (a row per frame, a
+    column per axis) — so `variations[frame.i]` is that frame’s dict for
+    `fontVariations(**...)`
+    """
+    def __init__(self, font, insetMin=1, insetMax=1, **values):
+        import numpy as np
+        found = axes(font)
+        self.axes = list(values)
+        self.array = np.stack([scale_to_axis(found[axis], values[axis], insetMin, insetMax)
+            for axis in self.axes], axis=1) if values else np.zeros((0, 0))
+        self._rows = self.array.tolist()
+
+    def __len__(self):
+        return len(self.array)
+
+    def __getitem__(self, i):
+        return dict(zip(self.axes, self._rows[i]))
+
+    def __repr__(self):
+        return "<furniture.FrameVariations {} frames, {}>".format(len(self), ", ".join(self.axes))
+
+
+if __name__ == "__main__":
+    wght = dict(minValue=100, defaultValue=400, maxValue=900)
+    print(scale_to_axis(wght, 0.5), scale_to_axis(wght, [0, 0.25, 0.5, 1]))
+    AXES["Example"] = dict(wght=wght, wdth=dict(minValue=50, maxValue=200))
+    print(scaledVariations("Example", wght=0.5, wdth=1))
+    print(FrameVariations("Example", wght=[i / 9 for i in range(10)], wdth=[1 - i / 9 for i in range(10)])[3])
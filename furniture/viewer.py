@@ -1,49 +1,335 @@
-from websocket import create_connection
+"""
+The viewer (`furniture/viewer.html`) and the renderer talk through a relay,
+`python -m furniture.viewer`, a websocket server that passes every message
+one client sends on to all the others
+"""
+import sys
+import base64
+import struct
+import asyncio
+import hashlib
+from collections import deque
 
 WEBSOCKET_PORT = 8008
 WEBSOCKET_ADDR = f"ws://localhost:{WEBSOCKET_PORT}"
 
 class PreviewConnection():
-    def __init__(self):
+    def __init__(self, address=WEBSOCKET_ADDR):
+        self.address = address
         self.ws = None
 
     def __enter__(self):
-        self.ws = create_connection(WEBSOCKET_ADDR)
+        from websocket import create_connection
+        self.ws = create_connection(self.address)
         self.ws.send("CLEAR")
         return self
 
     def __exit__(self, type, value, traceback):
         self.ws.close()
-    
+
     def send(self, content):
-        self.ws.send(content)
+        # bytes go as binary messages, i.e. preview tiles (see furniture.preview)
+        if isinstance(content, (bytes, bytearray)):
+            self.ws.send_binary(content)
+        else:
+            self.ws.send(content)
 
 
-def previewer():
-    return PreviewConnection()
+def previewer(address=WEBSOCKET_ADDR):
+    return PreviewConnection(address)
 
 
-if __name__ == "__main__":
-    from SimpleWebSocketServer import SimpleWebSocketServer, WebSocket
+_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+_TEXT, _BINARY, _CLOSE, _PING, _PONG = 0x1, 0x2, 0x8, 0x9, 0xA
+
+
+# preview frames (see `furniture.preview`) start with one of these tags, so
+# the relay can tell them apart without parsing them: a keyframe is a whole
+# frame, and a diff is only usable if the frame before it got through too
+KEYFRAME = "furniture:keyframe\n"
+DIFF = "furniture:diff\n"
+_TAGS = [(KEYFRAME, "key"), (DIFF, "diff"), (KEYFRAME.encode("ascii"), "key"), (DIFF.encode("ascii"), "diff")]
+
+
+def tag_frame(message, key):
+    """
+    A preview frame (text or binary), tagged as a keyframe or a diff
+    """
+    tag = KEYFRAME if key else DIFF
+    return (tag.encode("ascii") if isinstance(message, (bytes, bytearray)) else tag) + message
+
+
+def frame_kind(message):
+    """
+    "key" or "diff" for a preview frame, or None for anything else (like
+    "CLEAR"), which is never dropped
+    """
+    for tag, kind in _TAGS:
+        if type(tag) is type(message) and message.startswith(tag):
+            return kind
+    return None
+
+
+def untag_frame(message):
+    """
+    A message’s frame kind (see `frame_kind`) and the message without its tag
+    """
+    kind = frame_kind(message)
+    if kind is None:
+        return None, message
+    return kind, message[len(KEYFRAME if kind == "key" else DIFF):]
+
+
+def is_frame(message):
+    return frame_kind(message) is not None
+
+
+async def _handshake(reader, writer):
+    request = await reader.readuntil(b"\r\n\r\n")
+    headers = {}
+    for line in request.decode("latin-1").split("\r\n")[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+    key = headers.get("sec-websocket-key")
+    if not key:
+        writer.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        return False
+    accept = base64.b64encode(hashlib.sha1(key.encode("latin-1") + _GUID).digest())
+    writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+        b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+    return True
+
 
-    clients = []
+async def _read_frame(reader):
+    b0, b1 = await reader.readexactly(2)
+    length = b1 & 0x7F
+    if length == 126:
+        length, = struct.unpack(">H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack(">Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if b1 & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        # unmask 4 bytes at a time, as one big int
+        n = len(payload)
+        key = int.from_bytes(mask * (n // 4 + 1), "big") >> (8 * (4 - n % 4))
+        payload = (int.from_bytes(payload, "big") ^ key).to_bytes(n, "big") if n else b""
+    return bool(b0 & 0x80), b0 & 0x0F, payload
 
-    class SimpleChat(WebSocket):
-        def handleMessage(self):
-            for client in clients:
-                if client != self:
-                    # self.address[0]
-                    client.sendMessage(self.data)
 
-        def handleConnected(self):
-            print(self.address, 'connected')
-            clients.append(self)
+async def _read_message(reader, writer):
+    # the next whole text (str) or binary (bytes) message, answering pings
+    # along the way, or None once the client has closed
+    parts, kind = [], None
+    while True:
+        fin, opcode, payload = await _read_frame(reader)
+        if opcode == _CLOSE:
+            writer.write(_frame(_CLOSE, payload[:2]))
+            return None
+        elif opcode == _PING:
+            writer.write(_frame(_PONG, payload))
+            continue
+        elif opcode == _PONG:
+            continue
+        elif opcode in (_TEXT, _BINARY):
+            kind = opcode
+        parts.append(payload)
+        if fin:
+            data = b"".join(parts)
+            return data.decode("utf-8") if kind == _TEXT else data
 
-        def handleClose(self):
-            clients.remove(self)
-            print(self.address, 'closed')
 
+def _frame(opcode, payload):
+    n = len(payload)
+    if n < 126:
+        header = struct.pack(">BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack(">BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack(">BBQ", 0x80 | opcode, 127, n)
+    return header + payload
 
-    server = SimpleWebSocketServer('', WEBSOCKET_PORT, SimpleChat)
-    print(">>> Listening on", WEBSOCKET_PORT)
-    server.serveforever()
+
+class RelayClient():
+    """
+    One connection to the relay, with its own queue (of at most `limit`
+    messages) waiting to be sent to it, so a slow client only ever holds
+    itself up
+    """
+    def __init__(self, writer, limit):
+        self.writer = writer
+        self.address = writer.get_extra_info("peername")
+        self.limit = limit
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+        self.deepest = 0
+        self.waiting = False # for a keyframe, since a frame was dropped
+        self.closed = False
+
+    def put(self, message):
+        """
+        Queue a message — making room, if the queue is full, by dropping the
+        oldest preview frame waiting, along with the diffs queued after it
+        (which can’t be drawn without it), and then any more diffs until the
+        next keyframe. Anything else is never dropped, so a client whose
+        queue is full of nothing but that is too far behind, and is closed
+        """
+        if self.closed:
+            return
+        if len(self.queue) >= self.limit:
+            self.make_room()
+        kind = frame_kind(message)
+        if kind == "key":
+            self.waiting = False
+        elif kind == "diff" and self.waiting:
+            self.dropped += 1
+            return
+        if len(self.queue) >= self.limit:
+            print(self.address, "can’t keep up, closing")
+            self.closed = True
+            self.queue.clear()
+            self.writer.close()
+            return
+        self.queue.append(message)
+        self.deepest = max(self.deepest, len(self.queue))
+        self.ready.set()
+
+    def make_room(self):
+        # drop the oldest queued frame, then the diffs after it, up to the
+        # next keyframe
+        kept = deque()
+        state = "oldest"
+        for message in self.queue:
+            kind = frame_kind(message)
+            if kind and state == "oldest":
+                state = "diffs"
+            elif kind == "diff" and state == "diffs":
+                pass
+            else:
+                if kind == "key" and state == "diffs":
+                    state = "done"
+                kept.append(message)
+                continue
+            self.dropped += 1
+        if state == "diffs":
+            # there’s no keyframe queued since, so until one comes, the next
+            # diffs can’t be drawn either
+            self.waiting = True
+        self.queue = kept
+
+    async def send_forever(self):
+        try:
+            while True:
+                await self.ready.wait()
+                while self.queue:
+                    message = self.queue.popleft()
+                    if isinstance(message, str):
+                        self.writer.write(_frame(_TEXT, message.encode("utf-8")))
+                    else:
+                        self.writer.write(_frame(_BINARY, message))
+                    await self.writer.drain()
+                    self.sent += 1
+                self.ready.clear()
+        except ConnectionError:
+            pass # the reading side notices too, and cleans up
+
+    def metrics(self):
+        return dict(address=self.address, queued=len(self.queue), deepest=self.deepest,
+            sent=self.sent, dropped=self.dropped)
+
+
+class Relay():
+    """
+    A websocket server that passes each message a client sends on to all
+    the other clients, i.e. from `furniture preview` to any number of open
+    viewers — through a bounded queue per client (of `limit` messages), so a
+    slow browser tab can’t stall the renderer (which never waits on anyone),
+    and a fast renderer can’t pile up frames in memory: once a client’s
+    queue is full, its oldest preview frame is dropped to make room (along
+    with the diffs that depend on it, see `RelayClient.put`)
+
+    Text and binary (i.e. preview tiles) messages are both relayed, as is;
+    `metrics` has each client’s queue depth and how many frames it’s been
+    sent & has had dropped, and is printed every `interval` seconds (while
+    anything’s happening)
+    """
+    def __init__(self, host="", port=WEBSOCKET_PORT, limit=16, interval=5):
+        self.host = host
+        self.port = port
+        self.limit = limit
+        self.interval = interval
+        self.clients = []
+        self.received = 0
+        self.dropped = 0 # by clients that have since closed
+        self.server = None
+
+    def metrics(self):
+        clients = [c.metrics() for c in self.clients]
+        return dict(clients=clients, received=self.received,
+            dropped=self.dropped + sum(c["dropped"] for c in clients))
+
+    async def handle(self, reader, writer):
+        client = None
+        try:
+            if not await _handshake(reader, writer):
+                return
+            client = RelayClient(writer, self.limit)
+            self.clients.append(client)
+            sending = asyncio.ensure_future(client.send_forever())
+            print(client.address, "connected")
+            try:
+                while True:
+                    message = await _read_message(reader, writer)
+                    if message is None:
+                        break
+                    self.received += 1
+                    for other in self.clients:
+                        if other is not client:
+                            other.put(message)
+                    # let the clients’ senders have a go, between messages
+                    await asyncio.sleep(0)
+            finally:
+                sending.cancel()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if client:
+                self.clients.remove(client)
+                self.dropped += client.dropped
+                print(client.address, "closed")
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host or None, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.server
+
+    async def report_forever(self):
+        last = None
+        while True:
+            await asyncio.sleep(self.interval)
+            metrics = self.metrics()
+            if metrics != last and self.clients:
+                print("(relay) {} received, {} dropped;".format(metrics["received"], metrics["dropped"]),
+                    ", ".join("{address}: {queued} queued (max {deepest}), {sent} sent, {dropped} dropped"
+                        .format(**c) for c in metrics["clients"]))
+            last = metrics
+
+    async def serve_forever(self):
+        await self.start()
+        print(">>> Listening on", self.port)
+        reporting = asyncio.ensure_future(self.report_forever())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            reporting.cancel()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else WEBSOCKET_PORT
+    asyncio.run(Relay(port=port).serve_forever())